@@ -7,7 +7,7 @@ setup(
     package_dir={"": "src"},
     entry_points={"console_scripts": ["sessionizer = sessionizer.main:app"]},
     test_suite="tests",
-    package_data={"": ["tests/*"]},
+    package_data={"": ["tests/*"], "sessionizer": ["data/*.json"]},
     python_requires=">=3.10",
     install_requires=["typer", "rich"],
     author="Simon Opstrup Drue",
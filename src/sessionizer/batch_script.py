@@ -0,0 +1,101 @@
+from pathlib import Path
+from typing import List, Optional, Sequence, TypeVar
+
+from sessionizer.genomes import GENOME, get_genome
+from sessionizer.output import OutputWriter
+from sessionizer.regions import Region, sort_regions, unique_stems
+from sessionizer.track_elements import DataTrack, batch_argument
+
+
+T = TypeVar("T")
+
+
+def shard_regions(regions: Sequence[T], n_shards: int) -> List[Sequence[T]]:
+    """
+    Split sorted regions into at most n_shards contiguous, evenly sized shards.
+
+    Contiguous shards keep neighbouring regions in the same IGV instance, so each
+    instance reads the blocks of every file in order.
+    """
+    n_shards = max(1, min(n_shards, len(regions)))
+    shard_size, remainder = divmod(len(regions), n_shards)
+
+    shards = []
+    start = 0
+    for i in range(n_shards):
+        end = start + shard_size + (1 if i < remainder else 0)
+        shards.append(regions[start:end])
+        start = end
+    return shards
+
+
+def generate_batch_script(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    regions: Sequence[Region],
+    snapshot_dir: Path,
+    stems: Optional[Sequence[str]] = None,
+) -> str:
+    if stems is None:
+        stems = [stem for _, stem in unique_stems(regions)]
+    commands = ["new"]
+
+    # Add genome information
+    if genome == GENOME.CUSTOM:
+        commands.append(f"genome {batch_argument(genome_path)}")
+    else:
+        commands.append(f"genome {get_genome(genome).igv_name}")
+
+    # Load tracks
+    for track in tracks:
+        commands.extend(track.batch_commands())
+
+    # Take a snapshot of each region
+    commands.append(f"snapshotDirectory {batch_argument(snapshot_dir)}")
+    for region, stem in zip(regions, stems):
+        commands.append(f"goto {region.locus}")
+        commands.append(f"snapshot {stem}.png")
+
+    commands.append("exit")
+    return "\n".join(commands) + "\n"
+
+
+def write_batch_scripts(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    regions: List[Region],
+    output: Path,
+    snapshot_dir: Path,
+    shards: int = 1,
+    writer: Optional[OutputWriter] = None,
+) -> List[Path]:
+    """
+    Write IGV batch scripts taking snapshots of the regions.
+
+    Regions are ordered by chromosome and position. If more than one shard is
+    requested, the regions are split over shard scripts named <stem>_<n><suffix>,
+    which can be run by separate IGV instances in parallel.
+    """
+    # Snapshot names are unique over all shards, which share the directory
+    sorted_regions = sort_regions(regions)
+    stems = [stem for _, stem in unique_stems(sorted_regions)]
+    region_shards = shard_regions(sorted_regions, shards)
+    stem_shards = shard_regions(stems, shards)
+
+    if len(region_shards) == 1:
+        script_paths = [output]
+    else:
+        script_paths = [
+            output.with_name(f"{output.stem}_{i}{output.suffix}")
+            for i in range(1, len(region_shards) + 1)
+        ]
+
+    for script_path, shard, shard_stems in zip(script_paths, region_shards, stem_shards):
+        script = generate_batch_script(
+            genome, genome_path, tracks, shard, snapshot_dir.absolute(), shard_stems
+        )
+        (writer or OutputWriter()).write(script_path, [script])
+
+    return script_paths
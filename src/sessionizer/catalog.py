@@ -0,0 +1,278 @@
+import os
+import re
+import sqlite3
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sessionizer.genomes import guess_genome
+from sessionizer.metrics import stage
+from sessionizer.headers import (
+    parse_sam_header,
+    read_bam_header,
+    read_bigwig_chromosomes,
+    read_cram_header,
+    read_vcf_header,
+)
+from sessionizer.utils import get_file_type, get_index_extension
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    file_type TEXT NOT NULL,
+    has_index INTEGER NOT NULL,
+    genome TEXT
+);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_file_type ON files (file_type);
+CREATE TABLE IF NOT EXISTS samples (
+    path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE,
+    sample TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_sample ON samples (sample);
+CREATE INDEX IF NOT EXISTS samples_path ON samples (path);
+"""
+
+VCF_CONTIG_LENGTH_PATTERN = re.compile(r"^##contig=<.*?ID=([^,>]+).*?length=(\d+)")
+
+
+def inspect_file(path: Path) -> Tuple[List[str], Optional[str]]:
+    """
+    Read sample names and a genome hint from the header of a file.
+
+    Files with unreadable headers are catalogued without samples or genome.
+    """
+    name = path.name
+    samples: List[str] = []
+    references: List[Tuple[str, int]] = []
+    try:
+        if name.endswith((".bam", ".cram", ".sam")):
+            if name.endswith(".bam"):
+                text, references = read_bam_header(path)
+            else:
+                if name.endswith(".cram"):
+                    text = read_cram_header(path)
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        text = "".join(line for line in f if line.startswith("@"))
+                references = [
+                    (record["SN"], int(record["LN"]))
+                    for record in parse_sam_header(text, "@SQ")
+                ]
+            samples = [record["SM"] for record in parse_sam_header(text, "@RG") if "SM" in record]
+        elif get_file_type(name) == "variant":
+            for line in read_vcf_header(path):
+                if match := VCF_CONTIG_LENGTH_PATTERN.match(line):
+                    references.append((match.group(1), int(match.group(2))))
+                elif line.startswith("#CHROM"):
+                    samples = line.split("\t")[9:]
+        elif get_file_type(name) == "bigwig":
+            references = read_bigwig_chromosomes(path)
+    except (OSError, ValueError, EOFError, IndexError, KeyError, struct.error):
+        return [], None
+
+    return list(dict.fromkeys(samples)), guess_genome(references)
+
+
+class Catalog:
+    """
+    SQLite catalog of track files and their metadata.
+
+    Directories are scanned incrementally: only files that are new or whose size
+    or modification time changed are inspected again.
+    """
+
+    def __init__(self, path: Path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(CATALOG_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def scan(self, directories: Iterable[Path], threads: int = 8) -> Dict[str, int]:
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for directory in directories:
+                root = os.path.abspath(directory)
+                visited = set()
+                stack = [root]
+                while stack:
+                    current = stack.pop()
+                    visited.add(current)
+                    subdirectories, _ = self.scan_directory(current, executor, counts)
+                    stack.extend(subdirectories)
+
+                # Remove files in directories that no longer exist
+                # Directories below the root sort between the root followed by
+                # the separator and by the next character, a range the
+                # directory index serves; LIKE would treat _ and % as wildcards
+                prefix = root.rstrip(os.sep) + os.sep
+                prefix_end = prefix[:-1] + chr(ord(os.sep) + 1)
+                known = self.connection.execute(
+                    "SELECT DISTINCT directory FROM files"
+                    " WHERE directory = ? OR (directory >= ? AND directory < ?)",
+                    (root, prefix, prefix_end),
+                )
+                for (removed_directory,) in known.fetchall():
+                    if removed_directory not in visited:
+                        counts["removed"] += self.remove_directory(removed_directory)
+                self.connection.commit()
+
+        return counts
+
+    def remove_directory(self, directory: str) -> int:
+        return self.connection.execute(
+            "DELETE FROM files WHERE directory = ?", (directory,)
+        ).rowcount
+
+    def scan_directory(
+        self,
+        directory: str,
+        executor: ThreadPoolExecutor,
+        counts: Dict[str, int],
+        is_ready: Optional[Callable[[str, os.stat_result, Dict[str, os.DirEntry]], bool]] = None,
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Scan one directory and return its subdirectories and the changed files.
+
+        Files for which is_ready returns False, e.g. files that are still being
+        written, keep their previous catalog entry and are not reported as changed.
+        """
+        subdirectories = []
+        entries = {}
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    else:
+                        entries[entry.name] = entry
+        except OSError:
+            return [], []
+
+        known = {
+            path: (size, mtime_ns, bool(has_index))
+            for path, size, mtime_ns, has_index in self.connection.execute(
+                "SELECT path, size, mtime_ns, has_index FROM files WHERE directory = ?",
+                (directory,),
+            )
+        }
+
+        # Find new and changed track files
+        changed = []
+        for name, entry in entries.items():
+            file_type = get_file_type(name)
+            if file_type is None:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            index_extension = get_index_extension(name)
+            has_index = bool(index_extension) and name + index_extension in entries
+            previous = known.pop(entry.path, None)
+            if previous == (*signature, has_index):
+                counts["unchanged"] += 1
+                continue
+            if is_ready is not None and not is_ready(entry.path, stat, entries):
+                continue
+            counts["updated" if previous else "added"] += 1
+            if previous is not None and previous[:2] == signature:
+                # Only the index was added or removed, the header is unchanged
+                self.connection.execute(
+                    "UPDATE files SET has_index = ? WHERE path = ?",
+                    (has_index, entry.path),
+                )
+                continue
+            changed.append((entry.path, signature, file_type, has_index))
+
+        # Inspect headers of changed files concurrently
+        def inspect(file: tuple) -> Tuple[List[str], Optional[str]]:
+            with stage("read header", path=file[0]):
+                return inspect_file(Path(file[0]))
+
+        inspections = executor.map(inspect, changed)
+        for (path, signature, file_type, has_index), (samples, genome) in zip(
+            changed, inspections
+        ):
+            # Files without sample names in their header are catalogued under
+            # their file name stem, e.g. sample1 for sample1.bw
+            samples = samples or [os.path.basename(path).split(".", 1)[0]]
+
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+            self.connection.execute(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, directory, *signature, file_type, has_index, genome),
+            )
+            self.connection.executemany(
+                "INSERT INTO samples VALUES (?, ?)", [(path, s) for s in samples]
+            )
+
+        # Remove deleted files
+        for path in known:
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        counts["removed"] += len(known)
+
+        return subdirectories, [file[0] for file in changed] + list(known)
+
+    def get_directory_samples(self, directory: str) -> Dict[str, Set[str]]:
+        samples: Dict[str, Set[str]] = {}
+        for path, sample in self.connection.execute(
+            "SELECT files.path, samples.sample FROM files"
+            " JOIN samples ON samples.path = files.path WHERE files.directory = ?",
+            (directory,),
+        ):
+            samples.setdefault(path, set()).add(sample)
+        return samples
+
+    def list_samples(self) -> List[str]:
+        return [
+            sample
+            for (sample,) in self.connection.execute(
+                "SELECT DISTINCT sample FROM samples ORDER BY sample"
+            )
+        ]
+
+    def query(
+        self,
+        sample: Optional[str] = None,
+        file_types: Optional[List[str]] = None,
+        genome: Optional[str] = None,
+        indexed: bool = False,
+    ) -> List[Path]:
+        """
+        Return catalogued files matching all given criteria, ordered by path.
+
+        Files whose genome could not be recognized match any genome. With indexed,
+        files of indexed types (e.g. BAM, CRAM and bgzipped VCF) without an index
+        are left out.
+        """
+        sql = "SELECT DISTINCT files.path, files.has_index FROM files"
+        conditions = []
+        parameters: List = []
+        if sample is not None:
+            sql += " JOIN samples ON samples.path = files.path"
+            conditions.append("samples.sample = ?")
+            parameters.append(sample)
+        if file_types:
+            conditions.append(f"files.file_type IN ({', '.join('?' * len(file_types))})")
+            parameters.extend(file_types)
+        if genome is not None:
+            conditions.append("(files.genome = ? OR files.genome IS NULL)")
+            parameters.append(genome)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY files.path"
+
+        return [
+            Path(path)
+            for path, has_index in self.connection.execute(sql, parameters)
+            if not indexed or has_index or not get_index_extension(path)
+        ]
@@ -0,0 +1,205 @@
+import json
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sessionizer.filetypes import VCF_SUFFIXES
+from sessionizer.genomes import GENOME, get_genome
+from sessionizer.headers import (
+    parse_sam_header,
+    read_bam_header,
+    read_bigwig_chromosomes,
+    read_cram_header,
+    read_fai,
+    read_tabix_names,
+    read_vcf_contigs,
+)
+from sessionizer.metrics import stage
+from sessionizer.output import write_atomic
+from sessionizer.utils import get_cache_dir
+
+FASTA_SUFFIXES = [".fa", ".fasta", ".fna", ".FASTA", ".fa.gz", ".fasta.gz"]
+
+# Number of contig names shown per file in reports
+N_EXAMPLES = 3
+
+
+def read_contigs(path: Path) -> Optional[List[str]]:
+    """
+    Read contig names from the header or index of a file.
+
+    Only headers and indexes are read, never the data. Returns None for file
+    types without contig information.
+    """
+    name = path.name
+    if name.endswith(".bam"):
+        return [contig for contig, _ in read_bam_header(path)[1]]
+    if name.endswith(".cram"):
+        records = parse_sam_header(read_cram_header(path), "@SQ")
+        return [record["SN"] for record in records]
+    if name.endswith((".bw", ".bigwig")):
+        return [contig for contig, _ in read_bigwig_chromosomes(path)]
+    if name.endswith(".fai"):
+        return [contig for contig, _ in read_fai(path)]
+    if name.endswith(tuple(FASTA_SUFFIXES)):
+        fai = path.with_name(name + ".fai")
+        return [contig for contig, _ in read_fai(fai)] if fai.exists() else None
+    if name.endswith(tuple(VCF_SUFFIXES)):
+        contigs = read_vcf_contigs(path)
+        if contigs:
+            return contigs
+
+    # Fall back to the sequence names of a tabix index
+    tbi = path.with_name(name + ".tbi")
+    if tbi.exists():
+        return read_tabix_names(tbi)
+
+    return None
+
+
+class ContigCache:
+    """On-disk cache of contig names keyed by file path, size and modification time."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.changed = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def signature(file: Path) -> List[int]:
+        stat = file.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, file: Path) -> Optional[List[str]]:
+        entry = self.entries.get(str(file.absolute()))
+        if entry is not None and entry["signature"] == self.signature(file):
+            return entry["contigs"]
+        return None
+
+    def set(self, file: Path, contigs: List[str]):
+        with self.lock:
+            self.entries[str(file.absolute())] = {
+                "signature": self.signature(file),
+                "contigs": contigs,
+            }
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path, [json.dumps(self.entries)])
+
+
+def collect_contigs(
+    files: List[Path], cache: ContigCache, threads: int = 8
+) -> Dict[Path, Optional[List[str]]]:
+    # Read contig names concurrently, raising errors for unreadable headers
+    def read(file: Path) -> Optional[List[str]]:
+        contigs = cache.get(file)
+        if contigs is None:
+            with stage("read header", path=str(file)):
+                contigs = read_contigs(file)
+            if contigs is not None:
+                cache.set(file, contigs)
+        return contigs
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = {file: executor.submit(read, file) for file in files}
+
+    contigs = {}
+    for file, future in futures.items():
+        try:
+            contigs[file] = future.result()
+        except (OSError, ValueError, EOFError, IndexError, struct.error) as e:
+            raise ValueError(f"{file}: could not read contig names ({e})") from e
+    return contigs
+
+
+def toggle_chr_prefix(contig: str) -> str:
+    return contig[3:] if contig.startswith("chr") else f"chr{contig}"
+
+
+def find_contig_mismatches(
+    file_contigs: Dict[Path, Optional[List[str]]],
+    genome: GENOME,
+    genome_contigs: Optional[List[str]],
+) -> List[str]:
+    """
+    Report files whose contig names do not match the genome.
+
+    For custom genomes, contigs are compared against the names in the FASTA
+    index. For registry genomes, contigs are compared against the chromosome
+    aliases of the genome, e.g. 1 instead of chr1.
+    """
+    problems = []
+    aliases = {}
+    if genome != GENOME.CUSTOM:
+        aliases = get_genome(genome).chromosome_aliases
+    known_contigs = set(genome_contigs) if genome_contigs is not None else None
+
+    for file, contigs in file_contigs.items():
+        if not contigs:
+            continue
+
+        if known_contigs is not None:
+            missing = [contig for contig in contigs if contig not in known_contigs]
+            if not missing:
+                continue
+            problem = (
+                f"{file}: {len(missing)} of {len(contigs)} contigs are not in the genome"
+                f" ({', '.join(missing[:N_EXAMPLES])})"
+            )
+            renamed = [c for c in missing if toggle_chr_prefix(c) in known_contigs]
+            if renamed:
+                problem += (
+                    f", the file uses a different chromosome naming"
+                    f" (e.g. {renamed[0]} instead of {toggle_chr_prefix(renamed[0])})"
+                )
+            problems.append(problem)
+        else:
+            aliased = [contig for contig in contigs if contig in aliases]
+            if aliased:
+                problems.append(
+                    f"{file}: {len(aliased)} of {len(contigs)} contigs use a different"
+                    f" chromosome naming than {genome}"
+                    f" (e.g. {aliased[0]} instead of {aliases[aliased[0]]})"
+                )
+
+    return problems
+
+
+def check_contigs(
+    files: List[Path], genome: GENOME, genome_path: Optional[Path], threads: int = 8
+) -> List[str]:
+    """
+    Check that the contig names of all input files match the genome.
+
+    Headers are read concurrently and cached by file signature in the
+    sessionizer cache directory. A custom genome without a FASTA index is
+    reported as a problem. Returns a list of problems.
+    """
+    cache = ContigCache(get_cache_dir() / "contigs.json")
+
+    genome_contigs = None
+    if genome == GENOME.CUSTOM and genome_path is not None:
+        genome_contigs = collect_contigs([genome_path], cache)[genome_path]
+        if genome_contigs is None:
+            # Without the FASTA index there is nothing to compare against
+            return [
+                f"{genome_path}: could not read the genome contig names, the FASTA"
+                f" index {genome_path.name}.fai is missing"
+                " (create it with samtools faidx)"
+            ]
+
+    file_contigs = collect_contigs(files, cache, threads)
+    cache.save()
+
+    return find_contig_mismatches(file_contigs, genome, genome_contigs)
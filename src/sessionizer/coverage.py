@@ -0,0 +1,186 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sessionizer.headers import parse_sam_header, read_bam_header, read_cram_header
+from sessionizer.indexes import BaiReference, read_bai, read_crai
+from sessionizer.metrics import stage
+from sessionizer.output import write_atomic
+from sessionizer.tabix import LINEAR_INDEX_SHIFT
+from sessionizer.utils import get_cache_dir, get_index_extension
+
+# Bump when the coverage computation changes, so cached profiles are replaced
+COVERAGE_VERSION = 1
+
+# Coverage profile window, the window of the BAM linear index (16 kb)
+COVERAGE_WINDOW_SHIFT = LINEAR_INDEX_SHIFT
+
+# Typical compression of BGZF blocks of BAM records, used to combine the
+# compressed and uncompressed parts of virtual file offsets
+BGZF_COMPRESSION_RATIO = 3
+
+# First bin of each level of the BAM binning scheme, and the position shift of
+# the bins of the level
+BAI_LEVELS = [(0, 29), (1, 26), (9, 23), (73, 20), (585, 17), (4681, 14)]
+
+
+def get_chunk_size(start: int, end: int) -> int:
+    # Approximate uncompressed bytes between two virtual file offsets
+    compressed = (end >> 16) - (start >> 16)
+    uncompressed = (end & 0xFFFF) - (start & 0xFFFF)
+    return max(compressed * BGZF_COMPRESSION_RATIO + uncompressed, 0)
+
+
+def get_bin_windows(bin_id: int) -> Tuple[int, int]:
+    # First and end (exclusive) coverage window covered by a bin
+    for first_bin, shift in reversed(BAI_LEVELS):
+        if bin_id >= first_bin:
+            start = (bin_id - first_bin) << (shift - COVERAGE_WINDOW_SHIFT)
+            return start, start + (1 << (shift - COVERAGE_WINDOW_SHIFT))
+    raise ValueError(f"Invalid bin {bin_id}")
+
+
+def get_bai_window_sizes(reference: BaiReference, n_windows: int) -> List[float]:
+    """
+    Bytes of reads per coverage window of a reference.
+
+    Reads are indexed in the smallest bin containing them, so the chunks of a
+    bin are spread evenly over the windows of the bin. Windows beyond the linear
+    index have no reads.
+    """
+    if reference.intervals:
+        n_windows = min(n_windows, len(reference.intervals))
+    sizes = [0.0] * n_windows
+    for bin_id, chunks in reference.bins.items():
+        start, end = get_bin_windows(bin_id)
+        end = min(end, n_windows)
+        if start >= end:
+            continue
+        size = sum(get_chunk_size(*chunk) for chunk in chunks) / (end - start)
+        for window in range(start, end):
+            sizes[window] += size
+    return sizes
+
+
+def get_crai_window_sizes(
+    slices: List[Tuple[int, int, int, int]], reference_id: int, n_windows: int
+) -> List[float]:
+    # Bytes of slices per coverage window, spread over the bases of each slice
+    sizes = [0.0] * n_windows
+    for slice_reference, start, span, size in slices:
+        if slice_reference != reference_id or span <= 0:
+            continue
+        # Slice starts are 1-based
+        start -= 1
+        end = start + span
+        last_window = min((end - 1) >> COVERAGE_WINDOW_SHIFT, n_windows - 1)
+        for window in range(start >> COVERAGE_WINDOW_SHIFT, last_window + 1):
+            window_start = window << COVERAGE_WINDOW_SHIFT
+            window_end = window_start + (1 << COVERAGE_WINDOW_SHIFT)
+            overlap = min(end, window_end) - max(start, window_start)
+            sizes[window] += size * overlap / span
+    return sizes
+
+
+def get_index_coverage(path: Path) -> Dict[str, Tuple[int, List[float]]]:
+    """
+    Estimate the relative coverage of an alignment file per 16 kb window from
+    its index, without reading any alignments. Returns the length and window
+    values of each reference sequence.
+
+    BAM files use the chunks of the index bins, CRAM files the size and span of
+    the slices. The bytes per window are scaled so the mean of the windows with
+    reads is 1; the values are relative, as read lengths are not known.
+    """
+    window = 1 << COVERAGE_WINDOW_SHIFT
+    index = path.with_name(path.name + get_index_extension(path.name))
+    coverage = {}
+    if path.name.endswith(".bam"):
+        _, references = read_bam_header(path)
+        for (name, length), reference in zip(references, read_bai(index)):
+            n_windows = -(-length // window)
+            coverage[name] = (length, get_bai_window_sizes(reference, n_windows))
+    elif path.name.endswith(".cram"):
+        slices = read_crai(index)
+        sequences = parse_sam_header(read_cram_header(path), "@SQ")
+        for reference_id, sequence in enumerate(sequences):
+            length = int(sequence["LN"])
+            n_windows = -(-length // window)
+            sizes = get_crai_window_sizes(slices, reference_id, n_windows)
+            coverage[sequence["SN"]] = (length, sizes)
+    else:
+        raise ValueError(f"{path} is not an indexed alignment file.")
+
+    covered = [size for _, sizes in coverage.values() for size in sizes if size > 0]
+    mean = sum(covered) / len(covered) if covered else 1.0
+    return {
+        name: (length, [size / mean for size in sizes])
+        for name, (length, sizes) in coverage.items()
+    }
+
+
+def iter_bedgraph(coverage: Dict[str, Tuple[int, List[float]]]) -> Iterator[str]:
+    # Adjacent windows with the same rounded value are merged, windows without
+    # reads are left out
+    window = 1 << COVERAGE_WINDOW_SHIFT
+    yield "track type=bedGraph\n"
+    for name, (length, values) in coverage.items():
+        values = [round(value, 2) for value in values]
+        start = 0
+        for i in range(1, len(values) + 1):
+            if i < len(values) and values[i] == values[start]:
+                continue
+            if values[start]:
+                end = min(i * window, length)
+                yield f"{name}\t{start * window}\t{end}\t{values[start]:g}\n"
+            start = i
+
+
+def get_coverage_cache_path(path: Path) -> Optional[Path]:
+    # Cache file named by the path and signature of the file and its index,
+    # None if the index is missing
+    index_extension = get_index_extension(path.name)
+    if not index_extension:
+        return None
+    try:
+        data_stat = os.stat(path)
+        index_stat = os.stat(path.with_name(path.name + index_extension))
+    except OSError:
+        return None
+    key = "\0".join(
+        str(value)
+        for value in [
+            COVERAGE_VERSION,
+            os.path.abspath(path),
+            data_stat.st_size,
+            data_stat.st_mtime_ns,
+            index_stat.st_size,
+            index_stat.st_mtime_ns,
+        ]
+    )
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return get_cache_dir() / "coverage" / f"{path.name}.{digest}.bedgraph"
+
+
+def write_index_coverage(path: Path) -> Optional[Path]:
+    """
+    Write the index coverage of an alignment file as a bedGraph in the cache
+    directory, unless it is cached. Returns None if the file has no index.
+    """
+    cache_path = get_coverage_cache_path(path)
+    if cache_path is None or cache_path.exists():
+        return cache_path
+
+    with stage("coverage profile", path=str(path)):
+        coverage = get_index_coverage(path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(cache_path, iter_bedgraph(coverage))
+    return cache_path
+
+
+def write_index_coverages(paths: List[Path], threads: int = 8) -> List[Optional[Path]]:
+    """Write the index coverage of alignment files in parallel."""
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(write_index_coverage, paths))
@@ -1,8 +1,9 @@
+import json
 import xml.etree.ElementTree as ET
-from itertools import cycle
+from itertools import chain, cycle
 from pathlib import Path
-from typing import List
-from xml.dom import minidom
+from typing import Iterable, Iterator, List, Optional
+from xml.sax.saxutils import escape
 
 from sessionizer.colors import RGBColorOption
 from sessionizer.filetypes import (
@@ -11,7 +12,10 @@ from sessionizer.filetypes import (
     GTF_SUFFIXES,
     VCF_SUFFIXES,
 )
-from sessionizer.genomes import GENOME
+from sessionizer.genomes import GENOME, get_genome, is_local_gene_track
+from sessionizer.metrics import stage
+from sessionizer.output import OutputWriter
+from sessionizer.regions import Region
 from sessionizer.track_elements import (
     AlignmentColorByOption,
     AlignmentDisplayModeOption,
@@ -27,6 +31,28 @@ from sessionizer.track_elements import (
 )
 from sessionizer.utils import filter_files_by_filetype
 
+# Track options of create_tracks matching the command line defaults
+DEFAULT_TRACK_OPTIONS = dict(
+    names=[""],
+    heights=[0],
+    bam_group_by=[AlignmentGroupByOption.NONE],
+    bam_color_by=[AlignmentColorByOption.NONE],
+    bam_color_by_tag=[""],
+    bam_display_mode=[AlignmentDisplayModeOption.COLLAPSED],
+    bam_hide_small_indels=[False],
+    bam_small_indel_threshold=[0],
+    bam_show_coverage=[False],
+    bam_show_junctions=[False],
+    bw_ranges=[BigWigRangeOption(minimum=0, baseline=0, maximum=10)],
+    bw_color=[RGBColorOption.NONE],
+    bw_negative_color=[RGBColorOption.NONE],
+    bw_plot_type=[BigWigPlotTypeOption.BAR_CHART],
+    bw_auto_scale=[True],
+    vcf_show_genotypes=[False],
+    vcf_feature_visibility_window=[1000000],
+    gtf_display_mode=[GtfDisplayModeOption.COLLAPSED],
+)
+
 
 def hanlde_attribute(attribute: str, values: List, files: List, file_type: str) -> List:
     if len(values) not in [len(files), 1]:
@@ -36,15 +62,65 @@ def hanlde_attribute(attribute: str, values: List, files: List, file_type: str)
     return values * len(files) if len(values) == 1 else values
 
 
-def generate_xml(genome: GENOME, genome_path: Path, tracks: List[DataTrack]) -> str:
+# Characters escaped in attribute values, newlines and tabs would otherwise be
+# normalized to spaces by XML parsers
+XML_ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+
+
+def serialize_xml(root: ET.Element, comment: str = "") -> str:
+    """
+    Serialize an element tree as indented XML.
+
+    The output is byte-stable: attributes are written in insertion order with
+    fixed escaping and two space indentation, in the layout of minidom's
+    toprettyxml(), without depending on the minidom version.
+    """
+    lines = ['<?xml version="1.0" ?>\n']
+    if comment:
+        lines.append(f"<!--{comment}-->\n")
+
+    def write_element(element: ET.Element, indent: str):
+        attributes = "".join(
+            f' {key}="{escape(str(value), XML_ATTRIBUTE_ENTITIES)}"'
+            for key, value in element.attrib.items()
+        )
+        children = list(element)
+        if element.text:
+            text = escape(element.text)
+            lines.append(f"{indent}<{element.tag}{attributes}>{text}</{element.tag}>\n")
+        elif children:
+            lines.append(f"{indent}<{element.tag}{attributes}>\n")
+            for child in children:
+                write_element(child, indent + "  ")
+            lines.append(f"{indent}</{element.tag}>\n")
+        else:
+            lines.append(f"{indent}<{element.tag}{attributes}/>\n")
+
+    write_element(root, "")
+    return "".join(lines)
+
+
+def generate_xml(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    locus: str = "",
+    panels: Optional[List[List[DataTrack]]] = None,
+    comment: str = "",
+    resources: Iterable[Path] = (),
+) -> str:
     # Initialize session xml
     root = ET.Element("Session")
 
     # Add genome information
-    if genome in [GENOME.HG38, GENOME.HG19, GENOME.T2T]:
-        root.set("genome", genome.get_igv_name())
-    elif genome == GENOME.CUSTOM:
+    if genome == GENOME.CUSTOM:
         root.set("genome", str(genome_path))
+    else:
+        root.set("genome", get_genome(genome).igv_name)
+
+    # Add initial locus
+    if locus:
+        root.set("locus", locus)
 
     # Add resources
     resources_element = ET.SubElement(root, "Resources")
@@ -53,10 +129,27 @@ def generate_xml(genome: GENOME, genome_path: Path, tracks: List[DataTrack]) ->
     for track in tracks:
         track.add_resource(resources_element)
 
+    # Add resources without track, e.g. sample information
+    for path in resources:
+        ET.SubElement(resources_element, "Resource", path=str(path))
+
+    # Add local gene track files, e.g. mirrors, which IGV only loads as
+    # resources; URLs and track ids are resolved by IGV as before
+    gene_ids = []
+    if genome != GENOME.CUSTOM:
+        gene_ids = get_genome(genome).resolve_gene_tracks()
+    for gene_id in gene_ids:
+        if is_local_gene_track(gene_id):
+            ET.SubElement(resources_element, "Resource", path=gene_id)
+
     # Add data tracks
-    main_panel_elem = ET.SubElement(root, "Panel", name="DataPanel")
-    for track in tracks:
-        track.add_track(main_panel_elem)
+    if panels is None:
+        panels = [tracks]
+    for i, panel_tracks in enumerate(panels, start=1):
+        panel_name = "DataPanel" if i == 1 else f"DataPanel{i}"
+        panel_elem = ET.SubElement(root, "Panel", name=panel_name)
+        for track in panel_tracks:
+            track.add_track(panel_elem)
 
     # Add feature tracks
     feature_panel = ET.SubElement(root, "Panel", name="FeaturePanel")
@@ -70,20 +163,6 @@ def generate_xml(genome: GENOME, genome_path: Path, tracks: List[DataTrack]) ->
         name="Reference sequence",
     )
     # Add genes
-    gene_ids = []
-
-    if genome == "hg19":
-        gene_ids = ["hg19_genes"]
-    elif genome == "hg38":
-        gene_ids = [
-            "https://hgdownload.soe.ucsc.edu/goldenPath/hg38/database/ncbiRefSeq.txt.gz",
-        ]
-    elif genome == "t2t":
-        gene_ids = [
-            "https://hgdownload.soe.ucsc.edu/hubs/GCA/009/914/755/GCA_009914755.4/bbi/GCA_009914755.4_T2T-CHM13v2.0.catLiftOffGenesV1/catLiftOffGenesV1.bb",
-            "https://hgdownload.soe.ucsc.edu/hubs/GCA/009/914/755/GCA_009914755.4/bbi/GCA_009914755.4_T2T-CHM13v2.0.augustus.bb",
-        ]
-
     if gene_ids:
         for gene_id in gene_ids:
             ET.SubElement(
@@ -94,22 +173,161 @@ def generate_xml(genome: GENOME, genome_path: Path, tracks: List[DataTrack]) ->
             )
 
     # Panel layout
-    ET.SubElement(root, "PanelLayout", dividerFractions="0.80")
+    # Data panels share the upper 80% of the window
+    divider_fractions = ",".join(
+        f"{0.8 * i / len(panels):.2f}" for i in range(1, len(panels) + 1)
+    )
+    ET.SubElement(root, "PanelLayout", dividerFractions=divider_fractions)
 
     # Create XML string
-    xml_str = ET.tostring(root, encoding="utf-8")
+    with stage("serialize xml"):
+        return serialize_xml(root, comment=comment)
 
-    # Prettify XML using minidom
-    xml_str = minidom.parseString(xml_str).toprettyxml(indent="  ")
-    return xml_str
 
+def iter_session_xml(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    locus: str = "",
+    regions: Iterable[Region] = (),
+    panels: Optional[List[List[DataTrack]]] = None,
+    comment: str = "",
+    resources: Iterable[Path] = (),
+) -> Iterator[str]:
+    """
+    Generate the session XML in chunks.
 
-def generate_igv_session(
+    Regions of interest are streamed into a <Regions> block one at a time, so
+    large region sets are never held in memory or passed through the XML tree.
+    """
+    xml_str = generate_xml(
+        genome,
+        genome_path,
+        tracks,
+        locus=locus,
+        panels=panels,
+        comment=comment,
+        resources=resources,
+    )
+    head, tail = xml_str.rsplit("</Session>", 1)
+    yield head
+
+    regions = iter(regions)
+    first_region = next(regions, None)
+    if first_region is not None:
+        yield "  <Regions>\n"
+        for region in chain([first_region], regions):
+            # IGV stores regions with 0-based start coordinates
+            chromosome = escape(region.chrom, {'"': "&quot;"})
+            description = escape(region.name, {'"': "&quot;"})
+            yield (
+                f'    <Region chromosome="{chromosome}" start="{region.start - 1}" '
+                f'end="{region.end}" description="{description}"/>\n'
+            )
+        yield "  </Regions>\n"
+
+    yield "</Session>"
+    yield tail
+
+
+def write_session_xml(
+    output: Path,
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    locus: str = "",
+    regions: Iterable[Region] = (),
+    panels: Optional[List[List[DataTrack]]] = None,
+    comment: str = "",
+    resources: Iterable[Path] = (),
+    writer: Optional[OutputWriter] = None,
+) -> bool:
+    # Written atomically, returns False if an unchanged session was skipped
+    with stage("write session", path=str(output)):
+        return (writer or OutputWriter()).write(
+            output,
+            iter_session_xml(
+                genome,
+                genome_path,
+                tracks,
+                locus=locus,
+                regions=regions,
+                panels=panels,
+                comment=comment,
+                resources=resources,
+            ),
+        )
+
+
+def iter_session_json(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    locus: str = "",
+    regions: Iterable[Region] = (),
+) -> Iterator[str]:
+    """
+    Generate an igv.js session in JSON in chunks.
+
+    Tracks are serialized from the same track objects as the XML session, and
+    regions of interest are streamed one at a time.
+    """
+    if genome == GENOME.CUSTOM:
+        genome_config: object = {
+            "id": genome_path.name,
+            "name": genome_path.name,
+            "fastaURL": str(genome_path),
+            "indexURL": f"{genome_path}.fai",
+        }
+    else:
+        genome_config = get_genome(genome).igv_name
+    yield f'{{"genome": {json.dumps(genome_config)}'
+    if locus:
+        yield f', "locus": {json.dumps(locus)}'
+
+    yield ', "tracks": ['
+    for i, track in enumerate(tracks):
+        yield (", " if i else "") + json.dumps(track.igvjs_config())
+    yield "]"
+
+    regions = iter(regions)
+    first_region = next(regions, None)
+    if first_region is not None:
+        yield ', "roi": [{"name": "Regions of interest", "features": ['
+        for i, region in enumerate(chain([first_region], regions)):
+            # igv.js uses 0-based start coordinates
+            feature = {
+                "chr": region.chrom,
+                "start": region.start - 1,
+                "end": region.end,
+                "name": region.name,
+            }
+            yield (", " if i else "") + json.dumps(feature)
+        yield "]}]"
+
+    yield "}\n"
+
+
+def write_session_json(
+    output: Path,
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    locus: str = "",
+    regions: Iterable[Region] = (),
+    writer: Optional[OutputWriter] = None,
+) -> bool:
+    with stage("write json session", path=str(output)):
+        return (writer or OutputWriter()).write(
+            output,
+            iter_session_json(genome, genome_path, tracks, locus=locus, regions=regions),
+        )
+
+
+def create_tracks(
     files: List[Path],
     names: List[str],
     heights: List[int],
-    genome: GENOME,
-    genome_path: Path,
     bam_group_by: List[AlignmentGroupByOption],
     bam_color_by: List[AlignmentColorByOption],
     bam_color_by_tag: List[str],
@@ -126,7 +344,7 @@ def generate_igv_session(
     vcf_show_genotypes: List[bool],
     vcf_feature_visibility_window: List[int],
     gtf_display_mode: List[GtfDisplayModeOption],
-):
+) -> List[DataTrack]:
     # If names list is empty, set it to empty strings
     if names == [""]:
         names = [""] * len(files)
@@ -310,4 +528,54 @@ def generate_igv_session(
                 )
             )
 
-    return generate_xml(genome, genome_path, tracks)
+    return tracks
+
+
+def generate_igv_session(
+    files: List[Path],
+    names: List[str],
+    heights: List[int],
+    genome: GENOME,
+    genome_path: Path,
+    bam_group_by: List[AlignmentGroupByOption],
+    bam_color_by: List[AlignmentColorByOption],
+    bam_color_by_tag: List[str],
+    bam_display_mode: List[AlignmentDisplayModeOption],
+    bam_hide_small_indels: List[bool],
+    bam_small_indel_threshold: List[int],
+    bam_show_coverage: List[bool],
+    bam_show_junctions: List[bool],
+    bw_ranges: List[BigWigRangeOption],
+    bw_color: List[RGBColorOption],
+    bw_negative_color: List[RGBColorOption],
+    bw_plot_type: List[BigWigPlotTypeOption],
+    bw_auto_scale: List[bool],
+    vcf_show_genotypes: List[bool],
+    vcf_feature_visibility_window: List[int],
+    gtf_display_mode: List[GtfDisplayModeOption],
+):
+    with stage("create tracks"):
+        tracks = create_tracks(
+            files=files,
+            names=names,
+            heights=heights,
+            bam_group_by=bam_group_by,
+            bam_color_by=bam_color_by,
+            bam_color_by_tag=bam_color_by_tag,
+            bam_display_mode=bam_display_mode,
+            bam_hide_small_indels=bam_hide_small_indels,
+            bam_small_indel_threshold=bam_small_indel_threshold,
+            bam_show_coverage=bam_show_coverage,
+            bam_show_junctions=bam_show_junctions,
+            bw_ranges=bw_ranges,
+            bw_color=bw_color,
+            bw_negative_color=bw_negative_color,
+            bw_plot_type=bw_plot_type,
+            bw_auto_scale=bw_auto_scale,
+            vcf_show_genotypes=vcf_show_genotypes,
+            vcf_feature_visibility_window=vcf_feature_visibility_window,
+            gtf_display_mode=gtf_display_mode,
+        )
+
+    with stage("generate xml"):
+        return generate_xml(genome, genome_path, tracks)
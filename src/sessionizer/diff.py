@@ -0,0 +1,241 @@
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from sessionizer.metrics import stage
+
+# Attributes of a track, including the attributes of child elements such as
+# DataRange as "DataRange.maximum" and the panel the track is in
+TrackAttributes = Dict[str, str]
+
+
+@dataclass
+class SessionContent:
+    """
+    Semantic content of an IGV session.
+
+    Attributes:
+    - attributes: Attributes of the Session element, e.g. genome and locus.
+    - resources: Resource paths.
+    - tracks: Attributes of each track by id.
+    - regions: Regions of interest as (chromosome, start, end, description).
+
+    """
+
+    attributes: Dict[str, str] = field(default_factory=dict)
+    resources: Set[str] = field(default_factory=set)
+    tracks: Dict[str, TrackAttributes] = field(default_factory=dict)
+    regions: Set[Tuple[str, str, str, str]] = field(default_factory=set)
+
+
+@dataclass
+class SessionDiff:
+    """
+    Differences between two versions of an IGV session.
+
+    Attributes:
+    - attributes: Changed Session attributes as (old, new), None if absent.
+    - added_resources, removed_resources: Resource paths.
+    - added_tracks, removed_tracks: Track ids.
+    - changed_tracks: Changed attributes as (old, new) per track id.
+    - added_regions, removed_regions: Number of regions of interest.
+
+    """
+
+    attributes: Dict[str, Tuple[Optional[str], Optional[str]]] = field(
+        default_factory=dict
+    )
+    added_resources: List[str] = field(default_factory=list)
+    removed_resources: List[str] = field(default_factory=list)
+    added_tracks: List[str] = field(default_factory=list)
+    removed_tracks: List[str] = field(default_factory=list)
+    changed_tracks: Dict[str, Dict[str, Tuple[Optional[str], Optional[str]]]] = field(
+        default_factory=dict
+    )
+    added_regions: int = 0
+    removed_regions: int = 0
+
+    def __bool__(self):
+        return bool(
+            self.attributes
+            or self.added_resources
+            or self.removed_resources
+            or self.added_tracks
+            or self.removed_tracks
+            or self.changed_tracks
+            or self.added_regions
+            or self.removed_regions
+        )
+
+
+def read_session_content(path: Path) -> SessionContent:
+    """
+    Read the resources, tracks and regions of a session.
+
+    The XML is parsed incrementally and each track is discarded once its
+    attributes are collected, so the tree of large sessions is never built.
+    """
+    content = SessionContent()
+    panel = ""
+    track_depth = 0
+    with stage("read session", path=str(path)):
+        for event, element in ET.iterparse(path, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == "Session":
+                    content.attributes = dict(element.attrib)
+                elif tag == "Panel":
+                    panel = element.get("name", "")
+                elif tag == "Track":
+                    track_depth += 1
+                continue
+
+            if tag == "Resource":
+                content.resources.add(element.get("path", ""))
+            elif tag == "Region":
+                content.regions.add(
+                    tuple(
+                        element.get(key, "")
+                        for key in ["chromosome", "start", "end", "description"]
+                    )
+                )
+            elif tag == "Track":
+                track_depth -= 1
+                track = {"panel": panel, **element.attrib}
+                for child in element.iter():
+                    if child is not element:
+                        for key, value in child.attrib.items():
+                            track[f"{child.tag}.{key}"] = value
+                # Tracks without id are matched by name, repeated ids by order
+                track_id = element.get("id") or element.get("name", "")
+                key, n = track_id, 1
+                while key in content.tracks:
+                    n += 1
+                    key = f"{track_id}#{n}"
+                content.tracks[key] = track
+            elif track_depth > 0:
+                # Child elements of tracks are cleared with their track
+                continue
+
+            if tag != "Session":
+                element.clear()
+
+    return content
+
+
+def diff_attributes(
+    old: Dict[str, str], new: Dict[str, str]
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    return {
+        key: (old.get(key), new.get(key))
+        for key in sorted(old.keys() | new.keys())
+        if old.get(key) != new.get(key)
+    }
+
+
+def diff_sessions(old: Path, new: Path) -> SessionDiff:
+    """Compare two sessions, matching resources by path and tracks by id."""
+    old_content = read_session_content(old)
+    new_content = read_session_content(new)
+
+    diff = SessionDiff(
+        attributes=diff_attributes(old_content.attributes, new_content.attributes),
+        added_resources=sorted(new_content.resources - old_content.resources),
+        removed_resources=sorted(old_content.resources - new_content.resources),
+        added_tracks=[
+            key for key in new_content.tracks if key not in old_content.tracks
+        ],
+        removed_tracks=[
+            key for key in old_content.tracks if key not in new_content.tracks
+        ],
+        added_regions=len(new_content.regions - old_content.regions),
+        removed_regions=len(old_content.regions - new_content.regions),
+    )
+    for key, attributes in new_content.tracks.items():
+        if key in old_content.tracks:
+            changes = diff_attributes(old_content.tracks[key], attributes)
+            if changes:
+                diff.changed_tracks[key] = changes
+
+    return diff
+
+
+def format_diff(diff: SessionDiff) -> List[str]:
+    lines = []
+    for key, (old, new) in diff.attributes.items():
+        lines.append(f"~ session {key}: {old} -> {new}")
+    lines.extend(f"+ resource {path}" for path in diff.added_resources)
+    lines.extend(f"- resource {path}" for path in diff.removed_resources)
+    lines.extend(f"+ track {key}" for key in diff.added_tracks)
+    lines.extend(f"- track {key}" for key in diff.removed_tracks)
+    for key, changes in diff.changed_tracks.items():
+        lines.append(f"~ track {key}")
+        for attribute, (old, new) in changes.items():
+            lines.append(f"    {attribute}: {old} -> {new}")
+    if diff.added_regions:
+        lines.append(f"+ {diff.added_regions} regions")
+    if diff.removed_regions:
+        lines.append(f"- {diff.removed_regions} regions")
+    return lines
+
+
+def list_sessions(directory: Path) -> Set[str]:
+    # Session paths relative to the directory
+    return {
+        os.path.relpath(os.path.join(root, name), directory)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.endswith(".xml")
+    }
+
+
+def diff_session_pair(names: Tuple[Path, Path]) -> SessionDiff:
+    # Module level, so the pairs can be sent to worker processes
+    return diff_sessions(*names)
+
+
+def diff_directories(
+    old_dir: Path, new_dir: Path, threads: int = 8
+) -> Tuple[Dict[str, SessionDiff], List[str], List[str]]:
+    """
+    Compare the sessions of two directories in parallel.
+
+    Parsing is pure Python and holds the GIL, so the sessions are parsed in
+    worker processes, in chunks to limit the overhead per session. Returns the
+    diffs of the sessions in both directories by relative path, and the sessions
+    only in the new and only in the old directory.
+    """
+    old_sessions = list_sessions(old_dir)
+    new_sessions = list_sessions(new_dir)
+    common = sorted(old_sessions & new_sessions)
+    pairs = [(old_dir / name, new_dir / name) for name in common]
+
+    if threads <= 1 or len(pairs) <= 1:
+        diffs: List[SessionDiff] = [diff_session_pair(pair) for pair in pairs]
+    else:
+        workers = min(threads, len(pairs))
+        chunk_size = max(1, len(pairs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            diffs = list(executor.map(diff_session_pair, pairs, chunksize=chunk_size))
+
+    return (
+        dict(zip(common, diffs)),
+        sorted(new_sessions - old_sessions),
+        sorted(old_sessions - new_sessions),
+    )
+
+
+def format_summary(
+    diffs: Dict[str, SessionDiff], added: List[str], removed: List[str]
+) -> List[str]:
+    changed = [diff for diff in diffs.values() if diff]
+    return [
+        f"Sessions: {len(diffs)} compared, {len(diffs) - len(changed)} unchanged, "
+        f"{len(changed)} changed, {len(added)} added, {len(removed)} removed",
+        f"Tracks: {sum(len(diff.added_tracks) for diff in changed)} added, "
+        f"{sum(len(diff.removed_tracks) for diff in changed)} removed, "
+        f"{sum(len(diff.changed_tracks) for diff in changed)} changed",
+    ]
@@ -0,0 +1,185 @@
+import os
+import re
+import stat
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from sessionizer.filetypes import FILE_TYPE_SUFFIXES
+from sessionizer.metrics import count, count_syscall
+from sessionizer.remote import RemotePath, is_url
+
+# Suffixes of the files found in directories
+TRACK_SUFFIXES = tuple(
+    suffix for suffixes in FILE_TYPE_SUFFIXES.values() for suffix in suffixes
+)
+
+GLOB_MAGIC = re.compile(r"[*?[]")
+
+# Key identifying a file independent of the path, (device, inode)
+FileKey = Tuple[int, int]
+
+
+def read_files_from(path: Path) -> Iterator[str]:
+    """Read input paths from a file, one per line, or from stdin if path is -."""
+    if str(path) == "-":
+        lines: Iterable[str] = sys.stdin
+        yield from (line.strip() for line in lines if line.strip())
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from (line.strip() for line in f if line.strip())
+
+
+def translate_glob(pattern: str) -> re.Pattern:
+    # Glob pattern as a regular expression; ** matches any number of
+    # directories, * and ? match within a path component
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            chars = pattern[i + 1 : end].replace("\\", "\\\\")
+            parts.append(f"[^{chars[1:]}]" if chars.startswith("!") else f"[{chars}]")
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile("".join(parts) + r"\Z")
+
+
+def split_glob(pattern: str) -> Tuple[str, Optional[int]]:
+    """
+    Directory to search for a glob pattern, the path components before the
+    first one with wildcards, and the depth of the matching files below it,
+    None if the pattern has ** and matches at any depth.
+    """
+    components = pattern.split("/")
+    first = next(i for i, c in enumerate(components) if GLOB_MAGIC.search(c))
+    root = "/".join(components[:first]) or ("/" if pattern.startswith("/") else "")
+    depth = None if "**" in pattern else len(components) - first
+    return root, depth
+
+
+def scan_directory(directory: str) -> Tuple[List[Tuple[str, FileKey]], List[str]]:
+    # Track files with their keys and subdirectories of a directory, sorted by
+    # name; symlinked directories are not followed
+    files = []
+    directories = []
+    try:
+        count_syscall("stat")
+        device = os.stat(directory or ".").st_dev
+        count_syscall("scandir")
+        with os.scandir(directory or ".") as it:
+            for entry in it:
+                path = os.path.join(directory, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(path)
+                elif entry.name.endswith(TRACK_SUFFIXES):
+                    if entry.is_symlink():
+                        count_syscall("stat")
+                        try:
+                            entry_stat = entry.stat()
+                        except OSError:
+                            continue
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                    else:
+                        key = (device, entry.inode())
+                    files.append((path, key))
+    except OSError:
+        pass
+    count("directories scanned")
+    return sorted(files), sorted(directories)
+
+
+def walk_files(
+    executor: ThreadPoolExecutor, root: str, depth: Optional[int] = None
+) -> Iterator[Tuple[str, FileKey]]:
+    """
+    Yield the track files below a directory, with their keys.
+
+    Subdirectories are scanned concurrently ahead of the files being yielded,
+    while the files are yielded in a stable order: the files of a directory,
+    then the files of its subdirectories, in order of name. Files deeper than
+    depth levels below the root are not searched.
+    """
+    stack: List[Tuple[Future, int]] = [(executor.submit(scan_directory, root), 1)]
+    while stack:
+        future, level = stack.pop()
+        files, directories = future.result()
+        if depth is None or level == depth:
+            yield from files
+        if depth is None or level < depth:
+            stack.extend(
+                (executor.submit(scan_directory, directory), level + 1)
+                for directory in reversed(directories)
+            )
+
+
+def stat_input(path: str) -> Optional[os.stat_result]:
+    count_syscall("stat")
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def discover_files(
+    values: Iterable[str], threads: int = 8
+) -> Iterator[Union[Path, RemotePath]]:
+    """
+    Expand input values into input files, lazily.
+
+    Directories are searched recursively, and glob patterns (with ** for any
+    number of directories) are matched, for files with known track suffixes.
+    Other values are files or HTTP(S) URLs and are used as given, also when
+    repeated. Files found by searching that were found before, also through
+    symlinks or hard links, are dropped.
+    """
+    seen_keys: Set[FileKey] = set()
+    executor = ThreadPoolExecutor(max_workers=threads)
+    try:
+        for value in values:
+            if is_url(value):
+                yield RemotePath(value)
+                continue
+
+            if GLOB_MAGIC.search(value):
+                root, depth = split_glob(value)
+                pattern = translate_glob(value)
+                found: Iterable[Tuple[str, FileKey]] = (
+                    (path, key)
+                    for path, key in walk_files(executor, root, depth)
+                    if pattern.match(path)
+                )
+            else:
+                value_stat = stat_input(value)
+                if value_stat is None or not stat.S_ISDIR(value_stat.st_mode):
+                    # Missing files are kept for the input validation to report
+                    if value_stat is not None:
+                        seen_keys.add((value_stat.st_dev, value_stat.st_ino))
+                    yield Path(value)
+                    continue
+                found = walk_files(executor, value.rstrip("/") or "/")
+
+            for path, key in found:
+                if key in seen_keys:
+                    count("duplicate inputs")
+                    continue
+                seen_keys.add(key)
+                yield Path(path)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
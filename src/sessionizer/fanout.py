@@ -0,0 +1,101 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from sessionizer.create_igv_session import generate_xml
+from sessionizer.genomes import GENOME
+from sessionizer.metrics import stage
+from sessionizer.output import OutputWriter
+from sessionizer.regions import read_regions, unique_stems
+from sessionizer.track_elements import DataTrack
+
+# Unique value written as the locus attribute when serializing the shared session
+LOCUS_PLACEHOLDER = "__SESSIONIZER_LOCUS__"
+
+# Number of sessions written by each task in the thread pool
+FANOUT_CHUNK_SIZE = 1000
+
+
+def read_loci(path: Path) -> Iterator[Tuple[str, str]]:
+    # Yield tuples of (IGV locus string, session file stem), the stems are unique
+    # so sessions of records at the same position do not overwrite each other
+    for region, stem in unique_stems(read_regions(path)):
+        yield region.locus, stem
+
+
+def compile_session_template(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    comment: str = "",
+    resources: Iterable[Path] = (),
+) -> Tuple[bytes, bytes]:
+    # Serialize the session once and split it around the locus attribute value
+    xml_str = generate_xml(
+        genome,
+        genome_path,
+        tracks,
+        locus=LOCUS_PLACEHOLDER,
+        comment=comment,
+        resources=resources,
+    )
+    prefix, suffix = xml_str.split(LOCUS_PLACEHOLDER)
+    return prefix.encode("utf-8"), suffix.encode("utf-8")
+
+
+def write_sessions(
+    prefix: bytes,
+    suffix: bytes,
+    output_dir: Path,
+    loci: List[Tuple[str, str]],
+    writer: OutputWriter,
+) -> int:
+    with stage("write sessions", sessions=len(loci)):
+        for locus, stem in loci:
+            locus_bytes = escape(locus, {'"': "&quot;"}).encode("utf-8")
+            writer.write(output_dir / f"{stem}.xml", [prefix, locus_bytes, suffix])
+    return len(loci)
+
+
+def generate_fanout_sessions(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    loci: Iterable[Tuple[str, str]],
+    output_dir: Path,
+    threads: int = 8,
+    comment: str = "",
+    resources: Iterable[Path] = (),
+    writer: Optional[OutputWriter] = None,
+) -> int:
+    """
+    Write one session per locus, sharing a single serialized track set.
+
+    Loci are consumed lazily in chunks, so arbitrarily large VCF/BED files can be
+    fanned out with bounded memory. Returns the number of sessions written.
+    """
+    prefix, suffix = compile_session_template(
+        genome, genome_path, tracks, comment, resources
+    )
+    output_dir.mkdir(parents=True, exist_ok=True)
+    writer = writer or OutputWriter()
+
+    loci = iter(loci)
+    n_written = 0
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = set()
+        while chunk := list(islice(loci, FANOUT_CHUNK_SIZE)):
+            # Keep a bounded number of chunks in flight
+            if len(pending) >= threads * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                n_written += sum(future.result() for future in done)
+            pending.add(
+                executor.submit(
+                    write_sessions, prefix, suffix, output_dir, chunk, writer
+                )
+            )
+        n_written += sum(future.result() for future in pending)
+
+    return n_written
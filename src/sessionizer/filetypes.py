@@ -1,3 +1,5 @@
+from typing import Optional
+
 ALIGNMENT_SUFFIXES = [
     ".sam",
     ".bam",
@@ -20,6 +22,13 @@ GTF_SUFFIXES = [
     ".gtf.gz",
 ]
 
+FILE_TYPE_SUFFIXES = {
+    "alignment": ALIGNMENT_SUFFIXES,
+    "variant": VCF_SUFFIXES,
+    "bigwig": BIGWIG_SUFFIXES,
+    "gtf": GTF_SUFFIXES,
+}
+
 FILE_INDEX_EXTENSIONS = {
     ".bam": ".bai",
     ".cram": ".crai",
@@ -28,3 +37,8 @@ FILE_INDEX_EXTENSIONS = {
     ".FASTA": ".fai",
     ".bed.gz": ".tbi",
 }
+
+
+def get_index_extension(file_name: str) -> Optional[str]:
+    extension = next((key for key in FILE_INDEX_EXTENSIONS if file_name.endswith(key)), None)
+    return FILE_INDEX_EXTENSIONS[extension] if extension else None
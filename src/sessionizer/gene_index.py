@@ -0,0 +1,207 @@
+import hashlib
+import mmap
+import re
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sessionizer.regions import Region
+from sessionizer.utils import get_cache_dir, open_text
+
+# Header: magic, source file size and mtime, number of records, key and chrom widths
+GENE_INDEX_MAGIC = b"SGENEIX1"
+GENE_INDEX_HEADER = struct.Struct("<8sQQIII")
+
+# Matches loci given as coordinates, e.g. chr1:100 or chr1:100-200
+LOCUS_PATTERN = re.compile(r"^[^\s:]+:[\d,]+(-[\d,]+)?$")
+
+GTF_ATTRIBUTE_PATTERN = re.compile(r'(gene_id|gene_name|transcript_id) "([^"]+)"')
+
+
+def parse_gtf(line: str) -> Iterator[Tuple[str, str, int, int]]:
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) < 9:
+        return
+    chrom, start, end = fields[0], int(fields[3]), int(fields[4])
+    for _, value in GTF_ATTRIBUTE_PATTERN.findall(fields[8]):
+        yield value, chrom, start, end
+
+
+def parse_refgene(line: str) -> Iterator[Tuple[str, str, int, int]]:
+    fields = line.rstrip("\n").split("\t")
+    # refGene/ncbiRefSeq tables have a leading bin column, plain genePred does not
+    offset = 1 if len(fields) >= 16 else 0
+    if len(fields) < 12 + offset:
+        return
+    chrom = fields[1 + offset]
+    start, end = int(fields[3 + offset]) + 1, int(fields[4 + offset])
+    yield fields[offset], chrom, start, end
+    yield fields[11 + offset], chrom, start, end
+
+
+def read_annotation(annotation: Path) -> Dict[bytes, Tuple[str, int, int]]:
+    # Collect the span of every gene symbol, gene ID and transcript ID
+    is_gtf = any(annotation.name.endswith(suffix) for suffix in [".gtf", ".gtf.gz"])
+    parse = parse_gtf if is_gtf else parse_refgene
+
+    genes: Dict[bytes, Tuple[str, int, int]] = {}
+    with open_text(annotation) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            for name, chrom, start, end in parse(line):
+                names = [name]
+                # Also index Ensembl style IDs without version, e.g. ENSG00000012048
+                if name.startswith("ENS") and "." in name:
+                    names.append(name.split(".", 1)[0])
+
+                for key in (n.lower().encode("utf-8") for n in names):
+                    if key not in genes:
+                        genes[key] = (chrom, start, end)
+                        continue
+                    known_chrom, known_start, known_end = genes[key]
+                    if known_chrom == chrom:
+                        start, end = min(start, known_start), max(end, known_end)
+                        genes[key] = (chrom, start, end)
+                    elif "_" in known_chrom and "_" not in chrom:
+                        # Prefer primary assembly over alt/fix contigs
+                        genes[key] = (chrom, start, end)
+
+    return genes
+
+
+def build_gene_index(annotation: Path, index: Path) -> Path:
+    """
+    Build a sorted, fixed-width gene index from a GTF or refGene file.
+
+    The index stores the lowercased gene symbols and IDs with their coordinates,
+    so lookups can binary search the memory-mapped file directly.
+    """
+    genes = read_annotation(annotation)
+    key_width = max((len(key) for key in genes), default=1)
+    chrom_width = max(
+        (len(chrom.encode("utf-8")) for chrom, _, _ in genes.values()), default=1
+    )
+    record = struct.Struct(f"<{key_width}s{chrom_width}sII")
+
+    stat = annotation.stat()
+    index.parent.mkdir(parents=True, exist_ok=True)
+    tmp_index = index.with_name(index.name + ".tmp")
+    with open(tmp_index, "wb") as f:
+        f.write(
+            GENE_INDEX_HEADER.pack(
+                GENE_INDEX_MAGIC,
+                stat.st_size,
+                stat.st_mtime_ns,
+                len(genes),
+                key_width,
+                chrom_width,
+            )
+        )
+        for key in sorted(genes):
+            chrom, start, end = genes[key]
+            f.write(record.pack(key, chrom.encode("utf-8"), start, end))
+    tmp_index.replace(index)
+
+    return index
+
+
+class GeneIndex:
+    """Memory-mapped gene index supporting case-insensitive O(log n) lookups."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            self.source_size,
+            self.source_mtime_ns,
+            self.n_records,
+            self.key_width,
+            self.chrom_width,
+        ) = GENE_INDEX_HEADER.unpack_from(self.mmap)
+        if magic != GENE_INDEX_MAGIC:
+            raise ValueError(f"{path} is not a sessionizer gene index.")
+
+        self.record = struct.Struct(f"<{self.key_width}s{self.chrom_width}sII")
+
+    def key_at(self, i: int) -> bytes:
+        offset = GENE_INDEX_HEADER.size + i * self.record.size
+        return self.mmap[offset : offset + self.key_width]
+
+    def lookup(self, name: str) -> Optional[Region]:
+        key = name.lower().encode("utf-8")
+        if len(key) > self.key_width:
+            return None
+        key = key.ljust(self.key_width, b"\0")
+
+        # Binary search over the fixed-width records
+        low, high = 0, self.n_records
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low == self.n_records or self.key_at(low) != key:
+            return None
+
+        offset = GENE_INDEX_HEADER.size + low * self.record.size
+        _, chrom, start, end = self.record.unpack_from(self.mmap, offset)
+        return Region(chrom.rstrip(b"\0").decode("utf-8"), start, end, name)
+
+    def lookup_many(self, names: Iterable[str]) -> List[Optional[Region]]:
+        return [self.lookup(name) for name in names]
+
+    def close(self):
+        self.mmap.close()
+
+
+def get_gene_index(annotation: Path) -> GeneIndex:
+    """
+    Open the gene index for an annotation file, building it on first use.
+
+    Indexes are kept in the sessionizer cache directory and rebuilt when the
+    size or modification time of the annotation file changes.
+    """
+    annotation = annotation.absolute()
+    digest = hashlib.sha1(str(annotation).encode("utf-8")).hexdigest()
+    index_path = get_cache_dir() / "genes" / f"{digest}.idx"
+
+    stat = annotation.stat()
+    if index_path.exists():
+        index = GeneIndex(index_path)
+        source = (index.source_size, index.source_mtime_ns)
+        if source == (stat.st_size, stat.st_mtime_ns):
+            return index
+        index.close()
+
+    return GeneIndex(build_gene_index(annotation, index_path))
+
+
+def resolve_locus(locus: str, annotation: Optional[Path]) -> str:
+    """
+    Resolve the gene names of a locus, which may list several loci separated by
+    spaces as in IGV, to coordinates.
+
+    Loci given as coordinates are used as is. Other loci are looked up as genes,
+    and kept as given if not found, e.g. a contig name such as chr1, for IGV to
+    resolve.
+    """
+    if annotation is None:
+        return locus
+
+    loci = locus.split()
+    if all(LOCUS_PATTERN.match(part) for part in loci):
+        return locus
+
+    index = get_gene_index(annotation)
+    try:
+        regions = index.lookup_many(loci)
+    finally:
+        index.close()
+    return " ".join(
+        part if LOCUS_PATTERN.match(part) or region is None else region.locus
+        for part, region in zip(loci, regions)
+    )
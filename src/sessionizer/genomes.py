@@ -1,4 +1,19 @@
+import json
+import os
+from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
+from importlib import resources
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib  # type: ignore
+    except ImportError:
+        tomllib = None  # type: ignore
 
 
 class GENOME(str, Enum):
@@ -8,17 +23,130 @@ class GENOME(str, Enum):
     CUSTOM = "custom"
 
     def get_igv_name(self) -> str:
-        genome_mapping = {
-            GENOME.HG19: "hg19",
-            GENOME.HG38: "hg38",
-            GENOME.T2T: "chm13v2.0",
-            GENOME.CUSTOM: "custom",
-        }
-
-        if self not in genome_mapping:
-            raise ValueError(f"Genome {self} is not valid.")
+        if self == GENOME.CUSTOM:
+            return "custom"
 
-        return genome_mapping[self]
+        return get_genome(self.value).igv_name
 
     def __str__(self):
         return self.value
+
+
+@dataclass(frozen=True)
+class GenomeEntry:
+    """
+    Genome from the genome registry.
+
+    Attributes:
+    - name: Name used on the command line, e.g. hg38.
+    - igv_name: Genome id used by IGV.
+    - gene_tracks: Gene/annotation track ids or URLs added to the feature panel.
+    - mirrors: Local copies of gene tracks, mapping URL to local path.
+    - chromosome_aliases: Alternative chromosome names, mapping alias to name.
+    - chromosome_lengths: Lengths of (some) chromosomes, used to recognize the genome.
+    - fasta: Local FASTA file of the genome, used to resolve CRAM reference sequences.
+
+    """
+
+    name: str
+    igv_name: str
+    gene_tracks: Tuple[str, ...] = ()
+    mirrors: Dict[str, str] = field(default_factory=dict)
+    chromosome_aliases: Dict[str, str] = field(default_factory=dict)
+    chromosome_lengths: Dict[str, int] = field(default_factory=dict)
+    fasta: str = ""
+
+    def resolve_gene_tracks(self) -> List[str]:
+        # Prefer local mirrors so IGV does not download the tracks. Mirrors are
+        # only used if they exist on the host writing the session
+        resolved = []
+        for track in self.gene_tracks:
+            mirror = self.mirrors.get(track)
+            resolved.append(mirror if mirror and Path(mirror).exists() else track)
+        return resolved
+
+
+def is_local_gene_track(track: str) -> bool:
+    # Gene tracks given as a local path, e.g. a mirror, rather than a URL or a
+    # track id of the IGV genome
+    return "://" not in track and ("/" in track or "\\" in track)
+
+
+def get_registry_files() -> List[Path]:
+    # User files override the packaged registry, later files override earlier ones
+    config_home = os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    files = [
+        Path(config_home) / "sessionizer" / "genomes.json",
+        Path(config_home) / "sessionizer" / "genomes.toml",
+    ]
+    if "SESSIONIZER_GENOMES" in os.environ:
+        files += [Path(p) for p in os.environ["SESSIONIZER_GENOMES"].split(os.pathsep)]
+    return [file for file in files if file.is_file()]
+
+
+def read_registry_file(path: Path) -> Dict[str, dict]:
+    if path.suffix == ".toml":
+        if tomllib is None:
+            raise ValueError(
+                f"Reading {path} requires Python 3.11+ or the tomli package."
+            )
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def load_registry() -> Dict[str, dict]:
+    """
+    Load raw genome definitions from the packaged and user registry files.
+
+    Entries from later files are merged into earlier entries field by field, so
+    a user file can e.g. add local mirrors to a packaged genome.
+    """
+    packaged = resources.files("sessionizer") / "data" / "genomes.json"
+    registry = json.loads(packaged.read_text(encoding="utf-8"))
+
+    for path in get_registry_files():
+        for name, entry in read_registry_file(path).items():
+            registry[name] = {**registry.get(name, {}), **entry}
+
+    return registry
+
+
+@lru_cache(maxsize=None)
+def get_genome(name: str) -> GenomeEntry:
+    registry = load_registry()
+    if name not in registry:
+        raise ValueError(
+            f"Genome {name} is not valid. Valid genomes: {', '.join(list_genomes())}."
+        )
+
+    entry = registry[name]
+    return GenomeEntry(
+        name=name,
+        igv_name=entry.get("igv_name", name),
+        gene_tracks=tuple(entry.get("gene_tracks", [])),
+        mirrors=dict(entry.get("mirrors", {})),
+        chromosome_aliases=dict(entry.get("chromosome_aliases", {})),
+        chromosome_lengths=dict(entry.get("chromosome_lengths", {})),
+        fasta=entry.get("fasta", ""),
+    )
+
+
+def list_genomes() -> List[str]:
+    return [*load_registry(), GENOME.CUSTOM.value]
+
+
+def guess_genome(references: List[Tuple[str, int]]) -> Optional[str]:
+    # Recognize the genome from reference sequence names and lengths
+    lengths = dict(references)
+    for name in load_registry():
+        entry = get_genome(name)
+        for chrom, length in entry.chromosome_lengths.items():
+            names = [chrom]
+            names += [a for a, c in entry.chromosome_aliases.items() if c == chrom]
+            if any(lengths.get(n) == length for n in names):
+                return name
+    return None
@@ -0,0 +1,202 @@
+import bz2
+import gzip
+import lzma
+import re
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Tuple
+
+from sessionizer.utils import open_text
+
+BIGWIG_MAGIC = 0x888FFC26
+BPLUS_TREE_MAGIC = 0x78CA8C91
+
+VCF_CONTIG_PATTERN = re.compile(r"^##contig=<.*?ID=([^,>]+)")
+
+
+def parse_sam_header(text: str, record_type: str) -> List[Dict[str, str]]:
+    # Parse header records of one type, e.g. @SQ, into dictionaries of tags
+    records = []
+    for line in text.splitlines():
+        if line.startswith(record_type + "\t"):
+            fields = line.split("\t")[1:]
+            records.append(dict(field.split(":", 1) for field in fields if ":" in field))
+    return records
+
+
+def read_bam_header(path: Path) -> Tuple[str, List[Tuple[str, int]]]:
+    """
+    Read the header text and reference sequences of a BAM file.
+
+    BAM files are BGZF compressed, so only the first blocks are decompressed.
+    """
+    with gzip.open(path, "rb") as f:
+        if f.read(4) != b"BAM\1":
+            raise ValueError(f"{path} is not a BAM file.")
+        (l_text,) = struct.unpack("<i", f.read(4))
+        text = f.read(l_text).rstrip(b"\0").decode("utf-8", errors="replace")
+
+        (n_ref,) = struct.unpack("<i", f.read(4))
+        references = []
+        for _ in range(n_ref):
+            (l_name,) = struct.unpack("<i", f.read(4))
+            name = f.read(l_name).rstrip(b"\0").decode("utf-8")
+            (l_ref,) = struct.unpack("<i", f.read(4))
+            references.append((name, l_ref))
+
+    return text, references
+
+
+def read_itf8(f: BinaryIO) -> int:
+    # CRAM variable length 32 bit integer
+    b0 = f.read(1)[0]
+    if b0 < 0x80:
+        return b0
+    if b0 < 0xC0:
+        value = ((b0 & 0x3F) << 8) | f.read(1)[0]
+    elif b0 < 0xE0:
+        b1, b2 = f.read(2)
+        value = ((b0 & 0x1F) << 16) | (b1 << 8) | b2
+    elif b0 < 0xF0:
+        b1, b2, b3 = f.read(3)
+        value = ((b0 & 0x0F) << 24) | (b1 << 16) | (b2 << 8) | b3
+    else:
+        b1, b2, b3, b4 = f.read(4)
+        value = ((b0 & 0x0F) << 28) | (b1 << 20) | (b2 << 12) | (b3 << 4) | (b4 & 0x0F)
+    return value - (1 << 32) if value >= (1 << 31) else value
+
+
+def read_ltf8(f: BinaryIO) -> int:
+    # CRAM variable length 64 bit integer, the number of leading 1 bits is the
+    # number of additional bytes
+    b0 = f.read(1)[0]
+    n_bytes = 0
+    while n_bytes < 8 and b0 & (0x80 >> n_bytes):
+        n_bytes += 1
+    value = b0 & (0xFF >> (n_bytes + 1)) if n_bytes < 8 else 0
+    for byte in f.read(n_bytes):
+        value = (value << 8) | byte
+    return value
+
+
+def read_cram_header(path: Path) -> str:
+    """
+    Read the SAM header text of a CRAM file.
+
+    The header is stored in the first block of the first container, which is
+    the only part of the file that is read.
+    """
+    with open(path, "rb") as f:
+        if f.read(4) != b"CRAM":
+            raise ValueError(f"{path} is not a CRAM file.")
+        major_version = f.read(2)[0]
+        f.read(20)  # File id
+
+        # Container header
+        f.read(4)  # Length
+        for _ in range(4):
+            read_itf8(f)  # Reference id, start, span and number of records
+        if major_version >= 3:
+            read_ltf8(f)  # Record counter
+            read_ltf8(f)  # Number of bases
+        else:
+            read_itf8(f)
+            read_ltf8(f)
+        read_itf8(f)  # Number of blocks
+        for _ in range(read_itf8(f)):
+            read_itf8(f)  # Landmarks
+        if major_version >= 3:
+            f.read(4)  # CRC32
+
+        # Header block
+        method = f.read(1)[0]
+        f.read(1)  # Content type
+        read_itf8(f)  # Content id
+        compressed_size = read_itf8(f)
+        read_itf8(f)  # Raw size
+        data = f.read(compressed_size)
+
+    if method == 1:
+        data = gzip.decompress(data)
+    elif method == 2:
+        data = bz2.decompress(data)
+    elif method == 3:
+        data = lzma.decompress(data)
+    elif method != 0:
+        raise ValueError(f"Unsupported compression method {method} in {path} header.")
+
+    (l_text,) = struct.unpack_from("<i", data)
+    return data[4 : 4 + l_text].rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+def read_vcf_header(path: Path) -> List[str]:
+    # Read meta-information and header lines, stopping at the first record
+    lines = []
+    with open_text(path) as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            lines.append(line.rstrip("\n"))
+    return lines
+
+
+def read_vcf_contigs(path: Path) -> List[str]:
+    return [
+        match.group(1)
+        for line in read_vcf_header(path)
+        if (match := VCF_CONTIG_PATTERN.match(line))
+    ]
+
+
+def read_tabix_names(path: Path) -> List[str]:
+    # Sequence names from the header of a tabix (.tbi) index
+    with gzip.open(path, "rb") as f:
+        magic, _, _, _, _, _, _, _, l_nm = struct.unpack("<4s8i", f.read(36))
+        if magic != b"TBI\1":
+            raise ValueError(f"{path} is not a tabix index.")
+        names = f.read(l_nm)
+    return [name.decode("utf-8") for name in names.split(b"\0") if name]
+
+
+def read_fai(path: Path) -> List[Tuple[str, int]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            (fields[0], int(fields[1]))
+            for fields in (line.split("\t") for line in f)
+            if len(fields) > 1
+        ]
+
+
+def read_bigwig_chromosomes(path: Path) -> List[Tuple[str, int]]:
+    """Read chromosome names and sizes from the chromosome tree of a BigWig file."""
+    with open(path, "rb") as f:
+        header = f.read(16)
+        byte_order = "<"
+        if struct.unpack("<I", header[:4])[0] != BIGWIG_MAGIC:
+            byte_order = ">"
+            if struct.unpack(">I", header[:4])[0] != BIGWIG_MAGIC:
+                raise ValueError(f"{path} is not a BigWig file.")
+        (tree_offset,) = struct.unpack(byte_order + "Q", header[8:16])
+
+        f.seek(tree_offset)
+        magic, _, key_size, _, _ = struct.unpack(byte_order + "IIIIQ", f.read(24))
+        if magic != BPLUS_TREE_MAGIC:
+            raise ValueError(f"{path} has an invalid chromosome tree.")
+
+        chromosomes = []
+        nodes = [tree_offset + 32]
+        while nodes:
+            f.seek(nodes.pop())
+            is_leaf, _, count = struct.unpack(byte_order + "BBH", f.read(4))
+            children = []
+            for _ in range(count):
+                key = f.read(key_size)
+                if is_leaf:
+                    _, size = struct.unpack(byte_order + "II", f.read(8))
+                    chromosomes.append((key.rstrip(b"\0").decode("utf-8"), size))
+                else:
+                    children.append(struct.unpack(byte_order + "Q", f.read(8))[0])
+            # Visit child nodes in order
+            nodes.extend(reversed(children))
+
+    return chromosomes
@@ -0,0 +1,109 @@
+import gzip
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from sessionizer.tabix import LINEAR_INDEX_SHIFT
+
+# Bin holding the number of mapped and unmapped reads of a reference
+BAI_PSEUDO_BIN = 37450
+
+
+@dataclass
+class BaiReference:
+    """
+    Index of one reference sequence in a BAM index.
+
+    Attributes:
+    - bins: Chunks of virtual file offsets per bin.
+    - intervals: Virtual file offset of the first read in each 16 kb window.
+    - n_mapped: Number of mapped reads, if the index has a pseudo-bin.
+    - n_unmapped: Number of unmapped reads placed on the reference.
+
+    """
+
+    bins: Dict[int, List[Tuple[int, int]]] = field(default_factory=dict)
+    intervals: List[int] = field(default_factory=list)
+    n_mapped: int = 0
+    n_unmapped: int = 0
+
+    def window_sizes(self) -> List[int]:
+        # Compressed bytes per linear index window, for windows containing reads
+        offsets = [offset >> 16 for offset in self.intervals]
+        return [end - start for start, end in zip(offsets, offsets[1:]) if end > start]
+
+
+def read_bai(path: Path) -> List[BaiReference]:
+    """Read a BAM index (.bai) into one BaiReference per reference sequence."""
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if bytes(data[:4]) != b"BAI\1":
+        raise ValueError(f"{path} is not a BAM index.")
+
+    (n_ref,) = struct.unpack_from("<i", data, 4)
+    offset = 8
+    references = []
+    for _ in range(n_ref):
+        reference = BaiReference()
+        (n_bin,) = struct.unpack_from("<i", data, offset)
+        offset += 4
+        for _ in range(n_bin):
+            bin_id, n_chunk = struct.unpack_from("<Ii", data, offset)
+            offset += 8
+            chunks = list(struct.iter_unpack("<QQ", data[offset : offset + 16 * n_chunk]))
+            offset += 16 * n_chunk
+            if bin_id == BAI_PSEUDO_BIN and n_chunk == 2:
+                reference.n_mapped, reference.n_unmapped = chunks[1]
+            else:
+                reference.bins[bin_id] = chunks
+
+        (n_intv,) = struct.unpack_from("<i", data, offset)
+        offset += 4
+        reference.intervals = list(struct.unpack_from(f"<{n_intv}Q", data, offset))
+        offset += 8 * n_intv
+        references.append(reference)
+
+    return references
+
+
+def read_crai(path: Path) -> List[Tuple[int, int, int, int]]:
+    """
+    Read the slices of a CRAM index (.crai).
+
+    Returns (reference id, start, span, slice size) for each slice. Unmapped and
+    multi-reference slices have a negative reference id.
+    """
+    slices = []
+    with gzip.open(path, "rt", encoding="ascii") as f:
+        for line in f:
+            fields = line.split("\t")
+            if len(fields) >= 6:
+                slices.append(
+                    (int(fields[0]), int(fields[1]), int(fields[2]), int(fields[5]))
+                )
+    return slices
+
+
+def get_alignment_density(path: Path) -> float:
+    """
+    Estimate compressed bytes per base in the covered parts of an alignment file.
+
+    The density is derived from the index: the size of each 16 kb window in a
+    BAM index, or the size and span of each slice in a CRAM index.
+    """
+    name = path.name
+    if name.endswith(".bam"):
+        sizes = [
+            size
+            for reference in read_bai(path.with_name(name + ".bai"))
+            for size in reference.window_sizes()
+        ]
+        return sum(sizes) / (len(sizes) << LINEAR_INDEX_SHIFT) if sizes else 0.0
+
+    if name.endswith(".cram"):
+        slices = [s for s in read_crai(path.with_name(name + ".crai")) if s[0] >= 0]
+        span = sum(s[2] for s in slices)
+        return sum(s[3] for s in slices) / span if span else 0.0
+
+    raise ValueError(f"{path} is not an indexed alignment file.")
@@ -1,23 +1,121 @@
+import json
+import os
+import time
+from dataclasses import replace
+from itertools import chain, islice, tee
 from pathlib import Path
 from typing import List
 
 import typer
+from typer.core import TyperCommand, TyperGroup
 from typing_extensions import Annotated
 
+from sessionizer.batch_script import write_batch_scripts
+from sessionizer.catalog import Catalog
 from sessionizer.colors import RGBColorOption
-from sessionizer.create_igv_session import generate_igv_session
-from sessionizer.genomes import GENOME
+from sessionizer.contigs import check_contigs
+from sessionizer.coverage import write_index_coverages
+from sessionizer.create_igv_session import (
+    create_tracks,
+    write_session_json,
+    write_session_xml,
+)
+from sessionizer.discovery import discover_files, read_files_from
+from sessionizer.diff import (
+    diff_directories,
+    diff_sessions,
+    format_diff,
+    format_summary,
+)
+from sessionizer.fanout import generate_fanout_sessions, read_loci
+from sessionizer.gene_index import resolve_locus
+from sessionizer.genomes import GENOME, get_genome, list_genomes
+from sessionizer.metrics import (
+    MetricsCollector,
+    aggregate_metrics,
+    count,
+    count_tracks,
+    format_report,
+    stage,
+    start_trace,
+    stop_trace,
+)
+from sessionizer.output import OutputWriter
+from sessionizer.presets import apply_preset, get_preset
+from sessionizer.refcache import resolve_cram_references
+from sessionizer.regions import merge_regions, read_regions, sort_regions
+from sessionizer.remote import URL_CHECK_TTL, UrlChecker, is_remote
+from sessionizer.samplesheet import (
+    get_sort_order,
+    join_sample_sheet,
+    read_sample_sheet,
+    write_attribute_file,
+)
+from sessionizer.sharding import (
+    DEFAULT_BASE_COST,
+    ShardModeOption,
+    estimate_track_costs,
+    shard_tracks,
+    write_shard_index,
+)
+from sessionizer.shortcuts import GC_MIN_AGE, ShortcutStore
+from sessionizer.spec import build_spec, check_session, format_spec_comment
+from sessionizer.tabix import write_indexed_bed
+from sessionizer.templates import read_instances, read_templates
 from sessionizer.track_elements import (
     AlignmentColorByOption,
     AlignmentDisplayModeOption,
     AlignmentGroupByOption,
+    AlignmentTrack,
     BigWigPlotTypeOption,
     BigWigRangeOption,
+    DataTrack,
     GtfDisplayModeOption,
 )
-from sessionizer.utils import bw_range_parser, generate_symlink
+from sessionizer.utils import (
+    RelativePathResolver,
+    bw_range_parser,
+    generate_symlink,
+    get_cache_dir,
+)
+from sessionizer.validation import validate_inputs
+from sessionizer.watch import SessionWatcher, create_watcher
+
+
+class DefaultCommandGroup(TyperGroup):
+    """Command group running the run command if no command name is given."""
+
+    default_command = "run"
+
+    def parse_args(self, ctx, args):
+        # Keep "sessionizer --file ..." working next to the other commands, and
+        # "sessionizer --help" showing the options of the run command, which
+        # lists the other commands
+        if args and (
+            args[0] in ctx.help_option_names
+            or (
+                args[0] not in self.commands
+                and not any(args[0] in param.opts for param in self.get_params(ctx))
+            )
+        ):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
 
-app = typer.Typer(rich_markup_mode="rich")
+class TimedCommand(TyperCommand):
+    """Command recording the time of option parsing and validation."""
+
+    def parse_args(self, ctx, args):
+        # Includes the callbacks and exists=True checks of the options, which
+        # run before the command body starts collecting metrics
+        start = time.perf_counter()
+        try:
+            return super().parse_args(ctx, args)
+        finally:
+            ctx.meta["parse options seconds"] = time.perf_counter() - start
+
+
+app = typer.Typer(cls=DefaultCommandGroup, rich_markup_mode="rich")
 
 
 # Options sections
@@ -28,40 +126,104 @@ ALIGNMENT_OPTIONS = "Alignment options"
 BIGWIG_OPTIONS = "BigWig options"
 VARIANT_OPTIONS = "Variant options"
 GTF_OPTIONS = "GTF options"
+FANOUT_OPTIONS = "Fanout options"
+BATCH_SCRIPT_OPTIONS = "Batch script options"
+ROI_OPTIONS = "Regions of interest options"
+CATALOG_OPTIONS = "Catalog options"
+SHARD_OPTIONS = "Sharding options"
+PROFILING_OPTIONS = "Profiling options"
+OUTPUT_OPTIONS = "Output options"
+SAMPLE_SHEET_OPTIONS = "Sample sheet options"
 
 
-@app.command()
+def genome_callback(value: str) -> str:
+    if value not in list_genomes():
+        raise typer.BadParameter(
+            f"{value} is not one of: {', '.join(list_genomes())}."
+        )
+    return value
+
+
+@app.command(cls=TimedCommand)
 def run(
-    file: Annotated[
-        List[Path],
-        typer.Option(
-            help="Input file (can be used multiple times)",
-            exists=True,
-        ),
-    ],
+    ctx: typer.Context,
     output: Annotated[
         Path,
         typer.Option(
-            help="Output XML session file.",
+            help="Output XML session file. Output directory if --fanout-loci is used.",
             exists=False,
         ),
     ],
+    file: Annotated[
+        List[str],
+        typer.Option(
+            help="Input file or HTTP(S) URL (can be used multiple times). Directories and glob patterns (** matches any number of directories) are searched for files with known track suffixes. Found files are validated during the search; the session is written once the search is complete.",
+        ),
+    ] = [],
+    files_from: Annotated[
+        Path,
+        typer.Option(
+            help="File with one --file value per line, or - to read them from stdin.",
+            rich_help_panel=INPUT_FILES_OPTIONS,
+            allow_dash=True,
+            dir_okay=False,
+        ),
+    ] = None,  # type: ignore
     # Genome options
     genome: Annotated[
-        GENOME,
+        str,
         typer.Option(
-            help="Genome track options",
+            help="Genome from the genome registry, e.g. hg19, hg38 or t2t, or custom for a custom genome FASTA file.",
             rich_help_panel=GENOME_OPTIONS,
+            callback=genome_callback,
+            autocompletion=list_genomes,
         ),
-    ] = GENOME.HG38,
+    ] = GENOME.HG38.value,
     genome_path: Annotated[
         Path,
         typer.Option(
             help="Path to custom genome FASTA file",
             rich_help_panel=GENOME_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    locus: Annotated[
+        str,
+        typer.Option(
+            help="Initial locus of the session, e.g. chr1:100-200 or a gene name such as BRCA1.",
+            rich_help_panel=GENOME_OPTIONS,
+        ),
+    ] = "",
+    gene_annotation: Annotated[
+        Path,
+        typer.Option(
+            help="GTF or refGene file used to look up gene names given with --locus. An index is built on first use and cached.",
+            rich_help_panel=GENOME_OPTIONS,
             exists=True,
         ),
     ] = None,  # type: ignore
+    check_contig_names: Annotated[
+        bool,
+        typer.Option(
+            "--check-contigs",
+            help="Check that the contig names in the headers and indexes of the input files match the genome before writing the session.",
+            rich_help_panel=GENOME_OPTIONS,
+        ),
+    ] = False,
+    check_cram_references: Annotated[
+        bool,
+        typer.Option(
+            help="Check that the reference sequences of CRAM inputs (@SQ M5 checksums) are in the custom genome FASTA, the FASTA of the registry genome or --ref-cache, so IGV does not download them.",
+            rich_help_panel=GENOME_OPTIONS,
+        ),
+    ] = False,
+    ref_cache: Annotated[
+        Path,
+        typer.Option(
+            help="REF_CACHE directory (%2s/%2s/%s layout) filled with the sequences of the genome FASTA for CRAM decoding. Implies --check-cram-references.",
+            rich_help_panel=GENOME_OPTIONS,
+            file_okay=False,
+        ),
+    ] = None,  # type: ignore
     # Input files options
     use_relative_paths: Annotated[
         bool,
@@ -77,6 +239,36 @@ def run(
             rich_help_panel=INPUT_FILES_OPTIONS,
         ),
     ] = False,
+    shortcut_store: Annotated[
+        Path,
+        typer.Option(
+            help="Shared directory for the symlinks of --generate-symlinks instead of igv_shortcuts next to each session. Each file is linked once for all sessions; remove links of deleted sessions with the gc command.",
+            rich_help_panel=INPUT_FILES_OPTIONS,
+            file_okay=False,
+        ),
+    ] = None,  # type: ignore
+    warn_invalid_inputs: Annotated[
+        bool,
+        typer.Option(
+            help="Print problems of the input files and indexes (missing, unreadable, empty, index older than its file) as warnings instead of failing.",
+            rich_help_panel=INPUT_FILES_OPTIONS,
+        ),
+    ] = False,
+    check_urls: Annotated[
+        bool,
+        typer.Option(
+            help="Check that URL inputs and their indexes are reachable with HEAD requests before writing the session. Without this option URLs are written to the session unchecked.",
+            rich_help_panel=INPUT_FILES_OPTIONS,
+        ),
+    ] = False,
+    url_check_ttl: Annotated[
+        float,
+        typer.Option(
+            help="Seconds the results of --check-urls are cached and reused by later runs.",
+            rich_help_panel=INPUT_FILES_OPTIONS,
+            min=0,
+        ),
+    ] = URL_CHECK_TTL,
     # Track options
     name: Annotated[
         List[str],
@@ -92,6 +284,22 @@ def run(
             rich_help_panel=TRACK_OPTIONS,
         ),
     ] = [0],
+    preset: Annotated[
+        str,
+        typer.Option(
+            help="Named preset of track options per file type and file name pattern, e.g. coloring *.hifi.bam by base modification. Options given on the command line take precedence.",
+            rich_help_panel=TRACK_OPTIONS,
+        ),
+    ] = "",
+    preset_file: Annotated[
+        List[Path],
+        typer.Option(
+            help="TOML or JSON file with presets (can be used multiple times). Defaults to presets.toml and presets.json in ~/.config/sessionizer.",
+            rich_help_panel=TRACK_OPTIONS,
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = [],
     # Alignment options
     bam_group_by: Annotated[
         List[AlignmentGroupByOption],
@@ -149,6 +357,13 @@ def run(
             rich_help_panel=ALIGNMENT_OPTIONS,
         ),
     ] = [False],
+    index_coverage: Annotated[
+        bool,
+        typer.Option(
+            help="Add a coarse coverage track above each BAM/CRAM track, estimated from the .bai/.crai index without reading alignments, so coverage is visible at chromosome zoom. Profiles are cached.",
+            rich_help_panel=ALIGNMENT_OPTIONS,
+        ),
+    ] = False,
     # BigWig options
     bw_ranges: Annotated[
         List[BigWigRangeOption],
@@ -209,6 +424,214 @@ def run(
             rich_help_panel=GTF_OPTIONS,
         ),
     ] = [GtfDisplayModeOption.COLLAPSED],
+    # Fanout options
+    fanout_loci: Annotated[
+        Path,
+        typer.Option(
+            help="VCF or BED file (optionally gzipped) with loci. One session per locus is written to the --output directory.",
+            rich_help_panel=FANOUT_OPTIONS,
+            exists=True,
+        ),
+    ] = None,  # type: ignore
+    fanout_threads: Annotated[
+        int,
+        typer.Option(
+            help="Number of threads used to write fanout sessions.",
+            rich_help_panel=FANOUT_OPTIONS,
+            min=1,
+        ),
+    ] = 8,
+    # Batch script options
+    batch_regions: Annotated[
+        Path,
+        typer.Option(
+            help="VCF or BED file (optionally gzipped) with regions to take IGV snapshots of.",
+            rich_help_panel=BATCH_SCRIPT_OPTIONS,
+            exists=True,
+        ),
+    ] = None,  # type: ignore
+    batch_script: Annotated[
+        Path,
+        typer.Option(
+            help="Output IGV batch script taking snapshots of the --batch-regions.",
+            rich_help_panel=BATCH_SCRIPT_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    batch_shards: Annotated[
+        int,
+        typer.Option(
+            help="Number of batch scripts to split the regions into, e.g. for running multiple IGV instances in parallel.",
+            rich_help_panel=BATCH_SCRIPT_OPTIONS,
+            min=1,
+        ),
+    ] = 1,
+    snapshot_dir: Annotated[
+        Path,
+        typer.Option(
+            help="Directory IGV writes the batch script snapshots to.",
+            rich_help_panel=BATCH_SCRIPT_OPTIONS,
+        ),
+    ] = Path("snapshots"),
+    # Regions of interest options
+    roi: Annotated[
+        List[Path],
+        typer.Option(
+            help="BED file (optionally gzipped) with regions of interest (can be used multiple times).",
+            rich_help_panel=ROI_OPTIONS,
+            exists=True,
+        ),
+    ] = [],
+    roi_merge: Annotated[
+        bool,
+        typer.Option(
+            help="Merge overlapping regions of interest.",
+            rich_help_panel=ROI_OPTIONS,
+        ),
+    ] = False,
+    roi_max: Annotated[
+        int,
+        typer.Option(
+            help="Maximum number of regions of interest in the session. Remaining regions are written to an indexed BED track next to the output.",
+            rich_help_panel=ROI_OPTIONS,
+            min=0,
+        ),
+    ] = None,  # type: ignore
+    # Sample sheet options
+    sample_sheet: Annotated[
+        Path,
+        typer.Option(
+            help="Tab or comma separated (.csv) sample sheet with a header line and sample names in the first column. Input files are joined to its rows by a path/file column, by the name before the first dot of the file name or by the sample names in the file header, and its columns are written to an IGV sample information file.",
+            rich_help_panel=SAMPLE_SHEET_OPTIONS,
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,  # type: ignore
+    sample_sort: Annotated[
+        List[str],
+        typer.Option(
+            help="Sample sheet column to order the tracks by (can be used multiple times).",
+            rich_help_panel=SAMPLE_SHEET_OPTIONS,
+        ),
+    ] = [],
+    # Catalog options
+    catalog: Annotated[
+        Path,
+        typer.Option(
+            help="Catalog database created by the catalog command. Files matching --catalog-sample and --catalog-type are added as input files.",
+            rich_help_panel=CATALOG_OPTIONS,
+            exists=True,
+        ),
+    ] = None,  # type: ignore
+    catalog_sample: Annotated[
+        str,
+        typer.Option(
+            help="Add catalogued files containing this sample, e.g. from the SM tag of alignment read groups or VCF sample columns.",
+            rich_help_panel=CATALOG_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    catalog_type: Annotated[
+        List[str],
+        typer.Option(
+            help="Add catalogued files of this type: alignment, variant, bigwig or gtf (can be used multiple times).",
+            rich_help_panel=CATALOG_OPTIONS,
+        ),
+    ] = [],
+    catalog_indexed: Annotated[
+        bool,
+        typer.Option(
+            help="Only add catalogued files that have an index, or are of a type without index.",
+            rich_help_panel=CATALOG_OPTIONS,
+        ),
+    ] = False,
+    # Sharding options
+    shard_budget: Annotated[
+        float,
+        typer.Option(
+            help="Estimated IGV memory budget (MB) per shard. The tracks are split into shards within the budget, estimated from file type, size and read density in the index.",
+            rich_help_panel=SHARD_OPTIONS,
+            min=1,
+        ),
+    ] = None,  # type: ignore
+    shard_max_tracks: Annotated[
+        int,
+        typer.Option(
+            help="Maximum number of tracks per shard.",
+            rich_help_panel=SHARD_OPTIONS,
+            min=1,
+        ),
+    ] = None,  # type: ignore
+    shard_mode: Annotated[
+        ShardModeOption,
+        typer.Option(
+            help="Write shards as separate sessions <stem>_<n>.xml with an index <stem>_shards.tsv, or as data panels of one session.",
+            rich_help_panel=SHARD_OPTIONS,
+        ),
+    ] = ShardModeOption.SESSIONS,
+    # Profiling options
+    profile: Annotated[
+        bool,
+        typer.Option(
+            help="Print the time of each stage, filesystem calls, bytes written, filesystem blocks, tracks per type and peak memory to stderr.",
+            rich_help_panel=PROFILING_OPTIONS,
+        ),
+    ] = False,
+    metrics_json: Annotated[
+        Path,
+        typer.Option(
+            help="Append the metrics of this run as a JSON line to this file. Use the metrics command to aggregate the runs of a batch.",
+            rich_help_panel=PROFILING_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    profile_output: Annotated[
+        Path,
+        typer.Option(
+            help="Write cProfile statistics of this run to this file, e.g. for snakeviz or python -m pstats.",
+            rich_help_panel=PROFILING_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    trace: Annotated[
+        Path,
+        typer.Option(
+            help="Append Chrome trace events of each stage (header reads, index discovery, symlinks, serialization and writes) to this file, for chrome://tracing or Perfetto. Files ending with .jsonl get one event per line.",
+            rich_help_panel=PROFILING_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    # Output options
+    canonical: Annotated[
+        bool,
+        typer.Option(
+            help="Order tracks by path and name and regions of interest by position, so the same inputs give the same session independent of the argument order.",
+            rich_help_panel=OUTPUT_OPTIONS,
+        ),
+    ] = False,
+    embed_spec: Annotated[
+        bool,
+        typer.Option(
+            help="Embed a comment with the hash of the session spec and the size and modification time of the inputs, used by the check command.",
+            rich_help_panel=OUTPUT_OPTIONS,
+        ),
+    ] = False,
+    json_output: Annotated[
+        Path,
+        typer.Option(
+            help="Also write the session for igv.js/igv-webapp as JSON to this file, with the same tracks and paths as the XML session.",
+            rich_help_panel=OUTPUT_OPTIONS,
+        ),
+    ] = None,  # type: ignore
+    skip_unchanged: Annotated[
+        bool,
+        typer.Option(
+            help="Leave sessions whose content did not change untouched, keeping their modification time and inode.",
+            rich_help_panel=OUTPUT_OPTIONS,
+        ),
+    ] = False,
+    fsync: Annotated[
+        bool,
+        typer.Option(
+            help="Sync sessions to disk before they replace the previous version, and their directories once after all sessions are written.",
+            rich_help_panel=OUTPUT_OPTIONS,
+        ),
+    ] = False,
 ):
     """
     Generate an IGV session XML file.
@@ -222,27 +645,154 @@ def run(
 
     # Generate an IGV session for a single file
     sessionizer generate --file test.bam
+
+    # Generate one IGV session per variant in a VCF
+    sessionizer --file test.bam --fanout-loci variants.vcf.gz --output sessions/
+
+    # Generate an IGV session with the CRAMs and VCFs of a sample in a catalog
+    sessionizer --catalog catalog.sqlite --catalog-sample NA12878 --catalog-type alignment --catalog-type variant --output NA12878.xml
+
+    Other commands: catalog, watch, check, diff, gc, template and metrics. Use sessionizer COMMAND --help for their options.
     """
-    # If generate_symlinks is True, create symlinks to the input files
-    if generate_symlinks:
-        # Generate symlinks
-        igv_shortcut_dir = output.parent / "igv_shortcuts"
-        igv_shortcut_dir.mkdir(parents=True, exist_ok=True)
-        file = [generate_symlink(igv_shortcut_dir, file) for file in file]
+    # Collect metrics until the command finishes, also if it fails
+    if profile or metrics_json is not None or profile_output is not None:
+        collector = MetricsCollector(profile, metrics_json, profile_output)
+        ctx.call_on_close(collector.finish)
+        parse_seconds = ctx.meta.get("parse options seconds")
+        if parse_seconds is not None:
+            collector.metrics.add_stage("parse options", parse_seconds)
+    if trace is not None:
+        start_trace(trace)
+        ctx.call_on_close(stop_trace)
+
+    # Sessions are written atomically, directories are synced when done
+    writer = OutputWriter(skip_unchanged=skip_unchanged, durable=fsync)
+    ctx.call_on_close(writer.close)
 
+    # Input files are local paths or HTTP(S) URLs, directories and glob
+    # patterns are expanded and files found more than once are dropped
+    values = chain(file, read_files_from(files_from) if files_from else [])
+    discovered = discover_files(values)
+
+    # Add input files from the catalog
+    catalogued: List[Path] = []
+    if catalog is not None:
+        with stage("catalog"):
+            db = Catalog(catalog)
+            try:
+                genome_filter = genome if genome != GENOME.CUSTOM else None
+                catalogued = db.query(
+                    catalog_sample, catalog_type, genome_filter, catalog_indexed
+                )
+            finally:
+                db.close()
+
+    # Check all input files and indexes at once, reporting every problem. Files
+    # are checked while the directories are still searched, the session needs
+    # the complete list of files
+    url_checker = None
+    if check_urls:
+        url_checker = UrlChecker(get_cache_dir() / "url_checks.json", url_check_ttl)
+        ctx.call_on_close(url_checker.close)
+    inputs, checked_inputs = tee(chain(discovered, catalogued))
+    with stage("discover inputs"):
+        problems = validate_inputs(
+            chain(checked_inputs, [genome_path] if genome_path else []),
+            url_checker=url_checker,
+        )
+    file = list(inputs)  # type: ignore
+
+    if not file:
+        raise ValueError("No input files given")
+    if problems:
+        report = "Invalid input files:\n" + "\n".join(problems)
+        if not warn_invalid_inputs:
+            raise ValueError(report)
+        typer.echo(f"Warning: {report}", err=True)
+
+    # Sharding is only supported for single sessions
+    sharding = shard_budget is not None or shard_max_tracks is not None
+    if sharding and fanout_loci is not None:
+        raise ValueError("Sharding can not be used together with --fanout-loci")
+    if json_output is not None and fanout_loci is not None:
+        raise ValueError("--json-output can not be used together with --fanout-loci")
+    input_files = list(file)
+    input_genome_path = genome_path
+    spec_inputs = [*input_files, *roi]
+    if sample_sheet is not None:
+        spec_inputs.append(sample_sheet)
+    if genome_path is not None:
+        spec_inputs.append(genome_path)
+    if fanout_loci is not None:
+        spec_inputs.append(fanout_loci)
+
+    # Check contig naming of input files against the genome
+    if check_contig_names:
+        with stage("check contigs"):
+            local_files = [path for path in file if not is_remote(path)]
+            problems = check_contigs(local_files, genome, genome_path)
+        if problems:
+            raise ValueError(
+                "Contig names do not match the genome:\n" + "\n".join(problems)
+            )
+
+    # Check that the CRAM reference sequences can be resolved locally, filling
+    # the reference cache from the genome FASTA
+    crams = [path for path in file if path.name.endswith(".cram") and not is_remote(path)]
+    if crams and (check_cram_references or ref_cache is not None):
+        with stage("check cram references"):
+            if genome_path is not None:
+                fasta = genome_path
+            elif genome != GENOME.CUSTOM and get_genome(genome).fasta:
+                fasta = Path(get_genome(genome).fasta)
+            else:
+                fasta = None
+            problems = resolve_cram_references(crams, fasta, ref_cache)
+        if problems:
+            raise ValueError(
+                "CRAM reference sequences can not be resolved:\n" + "\n".join(problems)
+            )
+
+    # Sessions are written to the output directory in fanout mode
+    output_dir = output if fanout_loci is not None else output.parent
+
+    # Check the shortcut store is used together with symlinks
+    if shortcut_store is not None and not generate_symlinks:
+        raise ValueError("--shortcut-store requires --generate-symlinks")
+
+    # Link the input files in the shared store, the references of the sessions
+    # are recorded once they are written
+    store = None
+    if generate_symlinks and shortcut_store is not None:
+        store = ShortcutStore(shortcut_store)
+        ctx.call_on_close(store.close)
+        links = iter(store.link_files([f for f in file if not is_remote(f)]))
+        file = [f if is_remote(f) else next(links) for f in file]
         if genome_path is not None:
-            genome_path = generate_symlink(igv_shortcut_dir, genome_path)
+            genome_path = store.link_files([genome_path])[0]
+
+    # If generate_symlinks is True, create symlinks to the input files
+    elif generate_symlinks:
+        with stage("symlinks"):
+            # Generate symlinks
+            igv_shortcut_dir = output_dir / "igv_shortcuts"
+            igv_shortcut_dir.mkdir(parents=True, exist_ok=True)
+            file = [
+                file if is_remote(file) else generate_symlink(igv_shortcut_dir, file)
+                for file in file
+            ]
+
+            if genome_path is not None:
+                genome_path = generate_symlink(igv_shortcut_dir, genome_path)
 
     # If use_relative_paths is True, create paths to the input files relative to the output file
     if use_relative_paths:
-        file = [
-            Path(f).relative_to(output.parent.absolute(), walk_up=True) for f in file
-        ]
+        resolver = RelativePathResolver(output_dir)
+        relative_files = iter(resolver.relative_all(f for f in file if not is_remote(f)))
+        file = [f if is_remote(f) else next(relative_files) for f in file]
 
         if genome_path is not None:
-            genome_path = Path(genome_path).relative_to(
-                output.parent.absolute(), walk_up=True
-            )
+            genome_path = resolver.relative(genome_path)
 
     # Check genome_path is given if genome is set to custom
     if genome_path is None:
@@ -251,13 +801,15 @@ def run(
         else:
             genome_path = Path("")
 
-    # Generate XML
-    xml_str = generate_igv_session(
-        files=file,
-        names=name,
-        heights=height,
-        genome=genome,
-        genome_path=genome_path,
+    # Regions of interest are only supported for single sessions
+    if roi and fanout_loci is not None:
+        raise ValueError("--roi can not be used together with --fanout-loci")
+
+    # Check batch script options are given together
+    if (batch_regions is None) != (batch_script is None):
+        raise ValueError("--batch-regions and --batch-script must be given together")
+
+    track_options = dict(
         bam_group_by=bam_group_by,
         bam_color_by=bam_color_by,
         bam_color_by_tag=bam_color_by_tag,
@@ -276,9 +828,635 @@ def run(
         gtf_display_mode=gtf_display_mode,
     )
 
-    # Write XML to output file
-    with open(output, "w", encoding="utf-8") as f:
-        f.write(xml_str)
+    # Fill the track options not given on the command line from the preset,
+    # matching the preset against the names of the input files
+    if preset:
+        default_keys = [
+            key
+            for key in track_options
+            if ctx.get_parameter_source(key).name == "DEFAULT"
+        ]
+        track_options = apply_preset(
+            get_preset(preset, preset_file or None),
+            input_files,
+            track_options,
+            default_keys,
+        )
+
+    # Create tracks
+    with stage("create tracks"):
+        tracks = create_tracks(files=file, names=name, heights=height, **track_options)
+
+    # Order tracks independent of the argument order, keeping the input files in
+    # the same order for the cost estimates
+    if canonical:
+        order = sorted(
+            range(len(tracks)), key=lambda i: (str(tracks[i].path), tracks[i].name)
+        )
+        tracks = [tracks[i] for i in order]
+        input_files = [input_files[i] for i in order]
+
+    # Join the sample sheet to the input files, order the tracks by its columns
+    # and write its columns as IGV sample information
+    resources = []
+    if sample_sheet is not None:
+        with stage("sample sheet"):
+            sheet = read_sample_sheet(sample_sheet)
+            rows = join_sample_sheet(sheet, input_files)
+            if sample_sort:
+                order = get_sort_order(sheet, rows, sample_sort)
+                tracks = [tracks[i] for i in order]
+                input_files = [input_files[i] for i in order]
+                rows = [rows[i] for i in order]
+
+            if fanout_loci is not None:
+                output.mkdir(parents=True, exist_ok=True)
+                attribute_file = output / "sample_info.txt"
+            else:
+                attribute_file = output.with_name(f"{output.stem}_sample_info.txt")
+            write_attribute_file(attribute_file, sheet, tracks, rows, writer=writer)
+            resources.append(
+                Path(attribute_file.name)
+                if use_relative_paths
+                else attribute_file.absolute()
+            )
+    elif sample_sort:
+        raise ValueError("--sample-sort requires --sample-sheet")
+
+    # Add coverage tracks estimated from the alignment indexes above their
+    # alignment tracks, alignments without index are left out. The cached
+    # profiles are copied next to the session, so it does not depend on the
+    # cache directory of this user
+    if index_coverage:
+        with stage("index coverage"):
+            alignments = [
+                i
+                for i, track in enumerate(tracks)
+                if isinstance(track, AlignmentTrack) and not is_remote(input_files[i])
+            ]
+            coverage_files = write_index_coverages([input_files[i] for i in alignments])
+
+            if fanout_loci is not None:
+                coverage_dir = output / "coverage"
+            else:
+                coverage_dir = output.with_name(f"{output.stem}_coverage")
+            coverage_dir.mkdir(parents=True, exist_ok=True)
+            for i, coverage_file in reversed(list(zip(alignments, coverage_files))):
+                if coverage_file is None:
+                    continue
+                # Cached file names include a digest of the alignment file path
+                session_file = coverage_dir / coverage_file.name
+                writer.write(session_file, [coverage_file.read_bytes()])
+                coverage_track = DataTrack(
+                    name=f"{tracks[i].name} index coverage",
+                    path=(
+                        Path(coverage_dir.name) / coverage_file.name
+                        if use_relative_paths
+                        else session_file.absolute()
+                    ),
+                    height=0,
+                )
+                tracks.insert(i, coverage_track)
+                input_files.insert(i, session_file)
+
+    # Write IGV batch scripts. IGV resolves their paths against its working
+    # directory, so they use the absolute input paths instead of the symlinks
+    # or paths relative to the session
+    if batch_script is not None:
+        with stage("batch scripts"):
+            batch_tracks = [
+                track if is_remote(path) else replace(track, path=path.absolute())
+                for track, path in zip(tracks, input_files)
+            ]
+            write_batch_scripts(
+                genome=genome,
+                genome_path=(
+                    input_genome_path.absolute()
+                    if input_genome_path is not None
+                    else genome_path
+                ),
+                tracks=batch_tracks,
+                regions=list(read_regions(batch_regions)),
+                output=batch_script,
+                snapshot_dir=snapshot_dir,
+                shards=batch_shards,
+                writer=writer,
+            )
+
+    # Stream regions of interest
+    roi_regions = chain.from_iterable(read_regions(path) for path in roi)
+    if canonical:
+        roi_regions = sort_regions(roi_regions)
+    if roi_merge:
+        roi_regions = merge_regions(roi_regions)
+
+    # Move regions exceeding the maximum to an indexed BED track
+    if roi_max is not None:
+        with stage("regions of interest"):
+            session_regions = list(islice(roi_regions, roi_max))
+            excess_regions = sort_regions(roi_regions)
+            if excess_regions:
+                roi_track_path = output.with_name(f"{output.stem}_roi.bed.gz")
+                write_indexed_bed(excess_regions, roi_track_path, writer)
+                tracks.append(
+                    DataTrack(
+                        name="Regions of interest",
+                        path=(
+                            Path(roi_track_path.name)
+                            if use_relative_paths
+                            else roi_track_path.absolute()
+                        ),
+                        height=0,
+                        clazz="org.broad.igv.track.FeatureTrack",
+                    )
+                )
+            roi_regions = session_regions
+    count_tracks(tracks)
+
+    # Describe the session by its inputs and options in a comment
+    spec_options = {
+        "roi_merge": roi_merge,
+        "roi_max": roi_max,
+        "canonical": canonical,
+        "sample_sort": sample_sort,
+    }
+
+    def get_spec_comment(spec_tracks: List[DataTrack], locus: str = "") -> str:
+        if not embed_spec:
+            return ""
+        spec = build_spec(
+            genome, genome_path, spec_tracks, spec_inputs, locus, spec_options
+        )
+        return format_spec_comment(spec)
+
+    # Split tracks into shards, other tracks such as regions of interest get the
+    # base cost
+    shards = None
+    if sharding:
+        with stage("sharding"):
+            costs = estimate_track_costs(input_files)
+            costs += [DEFAULT_BASE_COST] * (len(tracks) - len(costs))
+            shards = shard_tracks(tracks, costs, shard_budget, shard_max_tracks)
+
+    # Write one session per locus
+    if fanout_loci is not None:
+        with stage("fanout"):
+            n_sessions = generate_fanout_sessions(
+                genome=genome,
+                genome_path=genome_path,
+                tracks=tracks,
+                loci=read_loci(fanout_loci),
+                output_dir=output,
+                threads=fanout_threads,
+                comment=get_spec_comment(tracks),
+                resources=resources,
+                writer=writer,
+            )
+        count("sessions", n_sessions)
+        if store is not None:
+            store.add_references([output])
+        return
+
+    # Resolve gene names to coordinates
+    if locus:
+        with stage("resolve locus"):
+            locus = resolve_locus(locus, gene_annotation)
+
+    # Write an igv.js session of all tracks, reusing the tracks of the XML session
+    if json_output is not None:
+        roi_regions = list(roi_regions)
+        write_session_json(
+            json_output,
+            genome,
+            genome_path,
+            tracks,
+            locus=locus,
+            regions=roi_regions,
+            writer=writer,
+        )
+
+    # Write one session per shard and an index of the shards
+    if shards is not None and shard_mode == ShardModeOption.SESSIONS and len(shards) > 1:
+        roi_regions = list(roi_regions)
+        session_paths = [
+            output.with_name(f"{output.stem}_{i}{output.suffix}")
+            for i in range(1, len(shards) + 1)
+        ]
+        for session_path, shard in zip(session_paths, shards):
+            write_session_xml(
+                session_path,
+                genome,
+                genome_path,
+                [tracks[i] for i in shard],
+                locus=locus,
+                regions=roi_regions,
+                comment=get_spec_comment([tracks[i] for i in shard], locus),
+                resources=resources,
+                writer=writer,
+            )
+        write_shard_index(
+            output.with_name(f"{output.stem}_shards.tsv"),
+            session_paths,
+            shards,
+            tracks,
+            costs,
+            writer=writer,
+        )
+        count("sessions", len(session_paths))
+        if store is not None:
+            store.add_references(session_paths)
+        return
+
+    # Write XML to output file, with one data panel per shard
+    panels = None
+    if shards is not None and shard_mode == ShardModeOption.PANELS:
+        panels = [[tracks[i] for i in shard] for shard in shards]
+    write_session_xml(
+        output,
+        genome,
+        genome_path,
+        tracks,
+        locus=locus,
+        regions=roi_regions,
+        panels=panels,
+        comment=get_spec_comment(tracks, locus),
+        resources=resources,
+        writer=writer,
+    )
+    count("sessions")
+    if store is not None:
+        store.add_references([output])
+
+
+@app.command(name="catalog")
+def catalog_command(
+    directory: Annotated[
+        List[Path],
+        typer.Argument(
+            help="Directories to scan recursively for track files.",
+            exists=True,
+            file_okay=False,
+        ),
+    ],
+    db: Annotated[
+        Path,
+        typer.Option(
+            help="Catalog database. Defaults to catalog.sqlite in the sessionizer cache directory.",
+        ),
+    ] = None,  # type: ignore
+    threads: Annotated[
+        int,
+        typer.Option(
+            help="Number of threads used to read file headers.",
+            min=1,
+        ),
+    ] = 8,
+):
+    """
+    Scan directories into a catalog of track files.
+
+    Only files that are new or changed since the last scan are read. The catalog
+    stores the file type, index presence, sample names and genome of each file,
+    and can be queried with the --catalog options of the run command.
+    """
+    if db is None:
+        db = get_cache_dir() / "catalog.sqlite"
+    db.parent.mkdir(parents=True, exist_ok=True)
+
+    catalog = Catalog(db)
+    try:
+        counts = catalog.scan(directory, threads=threads)
+    finally:
+        catalog.close()
+
+    typer.echo(
+        f"{db}: {counts['added']} added, {counts['updated']} updated,"
+        f" {counts['removed']} removed, {counts['unchanged']} unchanged"
+    )
+
+
+@app.command()
+def watch(
+    directory: Annotated[
+        List[Path],
+        typer.Argument(
+            help="Directories to watch recursively for track files.",
+            exists=True,
+            file_okay=False,
+        ),
+    ],
+    output_dir: Annotated[
+        Path,
+        typer.Option(
+            help="Directory to write one IGV session per sample to.",
+        ),
+    ],
+    genome: Annotated[
+        str,
+        typer.Option(
+            help="Genome from the genome registry, e.g. hg19, hg38 or t2t, or custom for a custom genome FASTA file.",
+            callback=genome_callback,
+            autocompletion=list_genomes,
+        ),
+    ] = GENOME.HG38.value,
+    genome_path: Annotated[
+        Path,
+        typer.Option(
+            help="Path to custom genome FASTA file",
+            exists=True,
+        ),
+    ] = None,  # type: ignore
+    db: Annotated[
+        Path,
+        typer.Option(
+            help="Catalog database. Defaults to catalog.sqlite in the sessionizer cache directory.",
+        ),
+    ] = None,  # type: ignore
+    debounce: Annotated[
+        float,
+        typer.Option(
+            help="Seconds a directory must be quiet, and files unmodified, before sessions are updated.",
+            min=0,
+        ),
+    ] = 5.0,
+    polling: Annotated[
+        bool,
+        typer.Option(
+            help="Poll directories instead of using inotify, e.g. on network file systems.",
+        ),
+    ] = False,
+    poll_interval: Annotated[
+        float,
+        typer.Option(
+            help="Seconds between polls if inotify is not used.",
+            min=0.1,
+        ),
+    ] = 2.0,
+    preset: Annotated[
+        str,
+        typer.Option(
+            help="Named preset of track options per file type and file name pattern.",
+        ),
+    ] = "",
+    preset_file: Annotated[
+        List[Path],
+        typer.Option(
+            help="TOML or JSON file with presets (can be used multiple times). Defaults to presets.toml and presets.json in ~/.config/sessionizer.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = [],
+):
+    """
+    Watch directories and keep one IGV session per sample up to date.
+
+    Files are catalogued as in the catalog command. When files are added, changed
+    or removed, only the sessions of the affected samples are written again.
+    Alignment and compressed VCF files are added once their index is complete.
+    """
+    if genome == GENOME.CUSTOM and genome_path is None:
+        raise ValueError("Genome path needs to be given if genome is set")
+
+    if db is None:
+        db = get_cache_dir() / "catalog.sqlite"
+    db.parent.mkdir(parents=True, exist_ok=True)
+
+    track_preset = get_preset(preset, preset_file or None) if preset else None
+
+    roots = [os.path.abspath(d) for d in directory]
+    catalog = Catalog(db)
+    watcher = create_watcher(roots, polling=polling, interval=poll_interval)
+    session_watcher = SessionWatcher(
+        catalog,
+        output_dir,
+        genome,
+        genome_path.absolute() if genome_path is not None else Path(""),
+        debounce=debounce,
+        preset=track_preset,
+    )
+    try:
+        session_watcher.run(watcher)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session_watcher.close()
+        watcher.close()
+        catalog.close()
+
+
+@app.command()
+def check(
+    session: Annotated[
+        List[Path],
+        typer.Argument(
+            help="Sessions generated with --embed-spec.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+):
+    """
+    Check whether sessions are up to date with their inputs, without generating them.
+
+    Exits with status 1 if any session is out of date.
+    """
+    out_of_date = 0
+    for path in session:
+        problems = check_session(path)
+        if problems:
+            out_of_date += 1
+            typer.echo(f"{path}: out of date")
+            for problem in problems:
+                typer.echo(f"  {problem}")
+        else:
+            typer.echo(f"{path}: up to date")
+    if out_of_date:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def diff(
+    old: Annotated[
+        Path,
+        typer.Argument(help="Old session, or directory of sessions.", exists=True),
+    ],
+    new: Annotated[
+        Path,
+        typer.Argument(help="New session, or directory of sessions.", exists=True),
+    ],
+    summary: Annotated[
+        bool,
+        typer.Option(help="Only print the summary when comparing directories."),
+    ] = False,
+    threads: Annotated[
+        int,
+        typer.Option(help="Number of processes comparing sessions in parallel.", min=1),
+    ] = 8,
+):
+    """
+    Compare sessions semantically, matching resources by path and tracks by id.
+
+    Reports added, removed and changed resources, tracks and attributes. Exits
+    with status 1 if the sessions differ.
+    """
+    if old.is_dir() != new.is_dir():
+        raise typer.BadParameter("OLD and NEW must both be sessions or directories")
+
+    if not old.is_dir():
+        lines = format_diff(diff_sessions(old, new))
+        for line in lines:
+            typer.echo(line)
+        if lines:
+            raise typer.Exit(code=1)
+        return
+
+    diffs, added, removed = diff_directories(old, new, threads)
+    if not summary:
+        for name, session_diff in diffs.items():
+            if session_diff:
+                typer.echo(name)
+                for line in format_diff(session_diff):
+                    typer.echo(f"  {line}")
+        for name in added:
+            typer.echo(f"+ session {name}")
+        for name in removed:
+            typer.echo(f"- session {name}")
+    for line in format_summary(diffs, added, removed):
+        typer.echo(line)
+    if added or removed or any(diffs.values()):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def gc(
+    shortcut_store: Annotated[
+        Path,
+        typer.Argument(
+            help="Shortcut store given with --shortcut-store.",
+            exists=True,
+            file_okay=False,
+        ),
+    ],
+    min_age: Annotated[
+        float,
+        typer.Option(
+            help="Only remove unused links created at least this many seconds ago, keeping the links of runs still in progress.",
+            min=0,
+        ),
+    ] = GC_MIN_AGE,
+):
+    """
+    Remove the links of deleted sessions from a shortcut store.
+
+    Only the sessions and links recorded in the store are checked, the store
+    directory is not scanned.
+    """
+    store = ShortcutStore(shortcut_store)
+    try:
+        counts = store.gc(min_age)
+    finally:
+        store.close()
+    typer.echo(
+        f"{shortcut_store}: {counts['sessions']} deleted sessions, "
+        f"{counts['links']} links removed"
+    )
+
+
+@app.command()
+def template(
+    templates: Annotated[
+        Path,
+        typer.Argument(
+            help="TOML or JSON file with session templates.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+    name: Annotated[str, typer.Argument(help="Name of the template to render.")],
+    instances: Annotated[
+        Path,
+        typer.Argument(
+            help="Tab separated file with a session column, one column with the file path of each template slot, and optional <slot>_name and locus columns.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+    output_dir: Annotated[
+        Path,
+        typer.Option(help="Directory to write the sessions <session>.xml to."),
+    ],
+    genome: Annotated[
+        str,
+        typer.Option(
+            help="Genome from the genome registry, e.g. hg19, hg38 or t2t, or custom for a custom genome FASTA file.",
+            callback=genome_callback,
+            autocompletion=list_genomes,
+        ),
+    ] = GENOME.HG38.value,
+    genome_path: Annotated[
+        Path,
+        typer.Option(help="Path to custom genome FASTA file"),
+    ] = None,  # type: ignore
+    skip_unchanged: Annotated[
+        bool,
+        typer.Option(help="Leave sessions whose content did not change untouched."),
+    ] = False,
+):
+    """
+    Render sessions from a template, substituting the paths and names of each
+    row of the instances file into the precompiled session.
+
+    Example template (TOML):
+
+    [tumor_normal]
+    tracks = [
+      { slot = "tumor", suffix = ".bam", options = { bam_color_by = "read_strand" } },
+      { slot = "normal", suffix = ".bam" },
+      { slot = "variants", suffix = ".vcf.gz", height = 60 },
+    ]
+    """
+    if genome_path is None:
+        if genome == GENOME.CUSTOM:
+            raise ValueError("Genome path needs to be given if genome is set")
+        genome_path = Path("")
+
+    with stage("compile templates"):
+        compiled = read_templates(templates, genome, genome_path)
+    if name not in compiled:
+        raise typer.BadParameter(
+            f"{name} is not one of: {', '.join(compiled)}.", param_hint="NAME"
+        )
+    session_template = compiled[name]
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_written = 0
+    with OutputWriter(skip_unchanged=skip_unchanged) as writer:
+        with stage("render templates"):
+            for stem, paths, names, locus in read_instances(instances, session_template):
+                session = session_template.render(paths, names, locus)
+                n_written += writer.write(output_dir / f"{stem}.xml", [session])
+    typer.echo(f"{output_dir}: {n_written} sessions written")
+
+
+@app.command()
+def metrics(
+    metrics_json: Annotated[
+        List[Path],
+        typer.Argument(
+            help="Metrics files written with --metrics-json.",
+            exists=True,
+            dir_okay=False,
+        ),
+    ],
+):
+    """
+    Aggregate the metrics of runs written with --metrics-json, e.g. of a batch.
+    """
+    records = []
+    for path in metrics_json:
+        with open(path, "r", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    typer.echo(format_report(aggregate_metrics(records)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+# No-op context returned by stage() when metrics are disabled
+NO_STAGE = nullcontext()
+
+
+class Metrics:
+    """
+    Metrics of one run: time per stage, filesystem calls, bytes written,
+    filesystem blocks, tracks per type and peak memory.
+
+    Stages may be nested, so their times can add up to more than the total.
+    Metadata calls (stat, lstat, readlink, ...) are counted at their call sites
+    with count_syscall(). Read and write calls, bytes written and blocks are
+    measured for the whole process from /proc/self/io and getrusage(), so the
+    calls of all threads are included.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counters: Counter = Counter()
+        self.syscalls: Counter = Counter()
+        self.lock = threading.Lock()
+        self.io_start = read_process_io()
+        self.blocks_start = read_process_blocks()
+        self.blocks: Dict[str, int] = {}
+        self.total = 0.0
+        self.peak_memory_mb = 0.0
+        self.bytes_written: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] += n
+
+    def count_syscall(self, name: str, n: int = 1):
+        with self.lock:
+            self.syscalls[name] += n
+
+    def add_stage(self, name: str, seconds: float):
+        # Stages timed before the metrics were started, e.g. option parsing
+        with self.lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def stop(self):
+        self.total = time.perf_counter() - self.start
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        if resource is not None:
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak_memory_mb = max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        io_end = read_process_io()
+        if self.io_start and io_end:
+            self.bytes_written = io_end["wchar"] - self.io_start["wchar"]
+            self.syscalls["read"] = io_end["syscr"] - self.io_start["syscr"]
+            self.syscalls["write"] = io_end["syscw"] - self.io_start["syscw"]
+        blocks_end = read_process_blocks()
+        if self.blocks_start and blocks_end:
+            self.blocks = {
+                name: blocks_end[name] - self.blocks_start[name] for name in blocks_end
+            }
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": round(self.total, 6),
+            "stages": {name: round(t, 6) for name, t in self.stages.items()},
+            "syscalls": dict(self.syscalls),
+            "counters": dict(self.counters),
+            "bytes_written": self.bytes_written,
+            "blocks": self.blocks,
+            "peak_memory_mb": round(self.peak_memory_mb, 1),
+        }
+
+
+def read_process_io() -> Optional[Dict[str, int]]:
+    # Bytes and system calls of this process from /proc, only on Linux
+    try:
+        with open("/proc/self/io", "r", encoding="ascii") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return None
+
+
+def read_process_blocks() -> Optional[Dict[str, int]]:
+    # Filesystem blocks read and written by this process, not on Windows
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {"input": usage.ru_inblock, "output": usage.ru_oublock}
+
+
+class Tracer:
+    """
+    Write spans as Chrome trace events, viewable in chrome://tracing or Perfetto.
+
+    Files ending with .jsonl get one event per line. Other files use the JSON
+    array format without closing bracket, which trace viewers accept, so
+    parallel processes can append to the same file. Timestamps are wall clock
+    microseconds to line up spans of different processes.
+    """
+
+    def __init__(self, path: Path):
+        self.json_lines = path.name.endswith(".jsonl")
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        # Line buffered appends keep events of parallel processes intact
+        self.handle = open(path, "a", encoding="utf-8", buffering=1)
+        if not self.json_lines and self.handle.tell() == 0:
+            self.handle.write("[\n")
+
+    @contextmanager
+    def span(self, name: str, args: dict):
+        ts = time.time_ns() // 1000
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            event = {
+                "name": name,
+                "cat": "sessionizer",
+                "ph": "X",
+                "ts": ts,
+                "dur": round((time.perf_counter() - start) * 1e6, 3),
+                "pid": self.pid,
+                "tid": threading.get_native_id(),
+            }
+            if args:
+                event["args"] = args
+            line = json.dumps(event) + ("\n" if self.json_lines else ",\n")
+            with self.lock:
+                self.handle.write(line)
+
+    def close(self):
+        self.handle.close()
+
+
+# Metrics and tracer of the current run, None if disabled
+active_metrics: Optional[Metrics] = None
+active_tracer: Optional[Tracer] = None
+
+
+@contextmanager
+def timed_stage(name: str, args: dict):
+    with active_metrics.stage(name) if active_metrics is not None else NO_STAGE:
+        with active_tracer.span(name, args) if active_tracer is not None else NO_STAGE:
+            yield
+
+
+def stage(name: str, **args):
+    """
+    Time a stage of the current run and trace it as a span with the given
+    arguments. A no-op if neither metrics nor tracing are enabled.
+    """
+    if active_metrics is None and active_tracer is None:
+        return NO_STAGE
+    return timed_stage(name, args)
+
+
+def start_trace(path: Path) -> Tracer:
+    global active_tracer
+    active_tracer = Tracer(path)
+    return active_tracer
+
+
+def stop_trace():
+    global active_tracer
+    if active_tracer is not None:
+        active_tracer.close()
+        active_tracer = None
+
+
+def count(name: str, n: int = 1):
+    if active_metrics is not None:
+        active_metrics.count(name, n)
+
+
+def count_syscall(name: str, n: int = 1):
+    # Filesystem metadata call made by sessionizer, e.g. stat or readlink
+    if active_metrics is not None:
+        active_metrics.count_syscall(name, n)
+
+
+def count_tracks(tracks: Iterable):
+    if active_metrics is not None:
+        for track in tracks:
+            active_metrics.count(f"tracks.{type(track).__name__}")
+
+
+class MetricsCollector:
+    """
+    Collect metrics until finish() is called, optionally profiling with
+    cProfile.
+    """
+
+    def __init__(
+        self,
+        print_report: bool = False,
+        metrics_json: Optional[Path] = None,
+        profile_output: Optional[Path] = None,
+    ):
+        global active_metrics
+        self.print_report = print_report
+        self.metrics_json = metrics_json
+        self.profile_output = profile_output
+
+        self.metrics = Metrics()
+        active_metrics = self.metrics
+
+        self.profiler = None
+        if profile_output is not None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def finish(self):
+        global active_metrics
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        if active_metrics is self.metrics:
+            active_metrics = None
+        self.metrics.stop()
+
+        if self.profiler is not None:
+            self.profiler.dump_stats(str(self.profile_output))
+        if self.metrics_json is not None:
+            # One JSON object per line, so runs can be appended and aggregated
+            with open(self.metrics_json, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.metrics.to_dict()) + "\n")
+        if self.print_report:
+            print(format_report(self.metrics.to_dict()), file=sys.stderr)
+
+
+def aggregate_metrics(records: List[dict]) -> dict:
+    """Sum the metrics of several runs; peak memory is the maximum."""
+    total: dict = {
+        "runs": len(records),
+        "total_seconds": 0.0,
+        "stages": Counter(),
+        "syscalls": Counter(),
+        "counters": Counter(),
+        "bytes_written": 0,
+        "blocks": Counter(),
+        "peak_memory_mb": 0.0,
+    }
+    for record in records:
+        total["total_seconds"] += record["total_seconds"]
+        total["stages"].update(record["stages"])
+        total["syscalls"].update(record["syscalls"])
+        total["counters"].update(record["counters"])
+        total["bytes_written"] += record.get("bytes_written") or 0
+        total["blocks"].update(record.get("blocks") or {})
+        total["peak_memory_mb"] = max(total["peak_memory_mb"], record["peak_memory_mb"])
+    for key in ["stages", "syscalls", "counters", "blocks"]:
+        total[key] = dict(total[key])
+    return total
+
+
+def format_report(metrics: dict) -> str:
+    lines = []
+    if "runs" in metrics:
+        lines.append(f"Runs: {metrics['runs']}")
+    lines.append(f"Total: {metrics['total_seconds']:.3f} s")
+    for name, seconds in sorted(metrics["stages"].items(), key=lambda item: -item[1]):
+        lines.append(f"  {name}: {seconds:.3f} s")
+    lines.append(f"Filesystem calls: {sum(metrics['syscalls'].values())}")
+    for name, n in sorted(metrics["syscalls"].items(), key=lambda item: -item[1]):
+        lines.append(f"  {name}: {n}")
+    for name, n in sorted(metrics["counters"].items()):
+        lines.append(f"{name}: {n}")
+    if metrics["bytes_written"] is not None:
+        lines.append(f"Bytes written: {metrics['bytes_written']}")
+    for name, n in sorted((metrics.get("blocks") or {}).items()):
+        lines.append(f"Filesystem blocks {name}: {n}")
+    lines.append(f"Peak memory: {metrics['peak_memory_mb']:.1f} MB")
+    return "\n".join(lines)
@@ -0,0 +1,112 @@
+import os
+import threading
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, List, Set, Union
+
+from sessionizer.metrics import count
+
+# Write buffer size, sessions are written with few large writes
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def encode_chunks(chunks: Iterable[Union[str, bytes]]) -> Iterable[bytes]:
+    for chunk in chunks:
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+class OutputWriter:
+    """
+    Write files atomically through a temporary file renamed over the target, so
+    readers never see a partially written file.
+
+    Options:
+    - skip_unchanged: Compare the new content with the existing file while it is
+      generated and leave the file untouched if it is the same.
+    - durable: fsync each file before it is renamed and each directory once in
+      close(), so the directory entries of a batch are synced together.
+
+    """
+
+    def __init__(
+        self,
+        skip_unchanged: bool = False,
+        durable: bool = False,
+        buffer_size: int = WRITE_BUFFER_SIZE,
+    ):
+        self.skip_unchanged = skip_unchanged
+        self.durable = durable
+        self.buffer_size = buffer_size
+        self.lock = threading.Lock()
+        self.directories: Set[str] = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def is_unchanged(
+        self, path: Path, chunks: Iterable[bytes], matched: List[bytes]
+    ) -> bool:
+        # Compare chunk by chunk, keeping the matched chunks for writing in case
+        # the content differs later
+        try:
+            f = open(path, "rb", buffering=self.buffer_size)
+        except OSError:
+            return False
+        with f:
+            for chunk in chunks:
+                matched.append(chunk)
+                if f.read(len(chunk)) != chunk:
+                    return False
+            return f.read(1) == b""
+
+    def write(self, path: Path, chunks: Iterable[Union[str, bytes]]) -> bool:
+        """Write the chunks to a file. Returns False if the file was unchanged."""
+        data = iter(encode_chunks(chunks))
+        if self.skip_unchanged:
+            matched: List[bytes] = []
+            if self.is_unchanged(path, data, matched):
+                count("files unchanged")
+                return False
+            data = chain(matched, data)
+
+        directory, name = os.path.split(os.path.abspath(path))
+        tmp_path = os.path.join(
+            directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            with open(fd, "wb", buffering=self.buffer_size) as f:
+                for chunk in data:
+                    f.write(chunk)
+                if self.durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        if self.durable:
+            with self.lock:
+                self.directories.add(directory)
+        count("files written")
+        return True
+
+    def close(self):
+        # Sync the directory entries of all renamed files, once per directory
+        with self.lock:
+            directories, self.directories = self.directories, set()
+        for directory in sorted(directories):
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+def write_atomic(path: Path, chunks: Iterable[Union[str, bytes]]) -> bool:
+    with OutputWriter() as writer:
+        return writer.write(path, chunks)
@@ -0,0 +1,161 @@
+import os
+import re
+from dataclasses import dataclass, field
+from fnmatch import translate
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sessionizer.filetypes import FILE_TYPE_SUFFIXES
+from sessionizer.genomes import read_registry_file
+from sessionizer.metrics import stage
+from sessionizer.templates import parse_track_option
+from sessionizer.utils import filter_files_by_filetype, get_file_type
+
+# File type of the track options, by option prefix
+OPTION_FILE_TYPES = {
+    "bam": "alignment",
+    "bw": "bigwig",
+    "vcf": "variant",
+    "gtf": "gtf",
+}
+
+
+def get_option_file_type(key: str) -> str:
+    return OPTION_FILE_TYPES[key.split("_", 1)[0]]
+
+
+def get_preset_files() -> List[Path]:
+    # Default preset files, later files override presets of earlier ones
+    config_home = os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    files = [
+        Path(config_home) / "sessionizer" / "presets.json",
+        Path(config_home) / "sessionizer" / "presets.toml",
+    ]
+    return [file for file in files if file.is_file()]
+
+
+@dataclass
+class Preset:
+    """
+    Track options of a named preset, validated and converted.
+
+    Attributes:
+    - name: Preset name.
+    - file_types: Options of all files of a file type, by file type.
+    - patterns: File name patterns with their options, in the order of the
+      preset. Options of later matching patterns override earlier ones and the
+      file type options.
+
+    """
+
+    name: str
+    file_types: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    patterns: List[Tuple[re.Pattern, Dict[str, object]]] = field(default_factory=list)
+
+    def resolve(self, file_name: str) -> Dict[str, object]:
+        """Options of a file, looked up by file type and file name."""
+        file_type = get_file_type(file_name)
+        options = dict(self.file_types.get(file_type, {})) if file_type else {}
+        for pattern, pattern_options in self.patterns:
+            if pattern.match(file_name):
+                options.update(pattern_options)
+        return options
+
+
+def compile_options(
+    name: str, options: dict, file_type: Optional[str]
+) -> Dict[str, object]:
+    compiled = {}
+    for key, value in options.items():
+        # parse_track_option rejects unknown options and values
+        (compiled[key],) = parse_track_option(key, value)
+        if file_type is not None and get_option_file_type(key) != file_type:
+            raise ValueError(
+                f"{key} of preset {name} does not apply to {file_type} files"
+            )
+    return compiled
+
+
+def compile_preset(name: str, spec: dict) -> Preset:
+    """
+    Compile a preset spec into a preset.
+
+    The spec has a table of options per file type (alignment, bigwig, variant or
+    gtf) and a patterns table of options per file name pattern, e.g.
+    patterns."*.hifi.bam" = { bam_color_by = "base_modification" }. Options are
+    named like the create_tracks arguments.
+    """
+    preset = Preset(name=name)
+    for key, value in spec.items():
+        if key == "patterns":
+            for pattern, options in value.items():
+                compiled = compile_options(name, options, None)
+                preset.patterns.append((re.compile(translate(pattern)), compiled))
+        elif key in FILE_TYPE_SUFFIXES:
+            preset.file_types[key] = compile_options(name, value, key)
+        else:
+            raise ValueError(f"Unknown section {key} in preset {name}")
+    return preset
+
+
+@lru_cache(maxsize=8)
+def load_presets(path: Path, mtime_ns: int, size: int) -> Dict[str, Preset]:
+    # Compiled presets are kept in memory only and reused while the preset
+    # file is unchanged, e.g. by watch and the batch paths
+    with stage("compile presets"):
+        return {
+            name: compile_preset(name, spec)
+            for name, spec in read_registry_file(path).items()
+        }
+
+
+def read_presets(path: Path) -> Dict[str, Preset]:
+    """Read the presets of a TOML or JSON file, compiled once per file version."""
+    stat = path.stat()
+    return load_presets(path, stat.st_mtime_ns, stat.st_size)
+
+
+def get_preset(name: str, paths: Optional[Iterable[Path]] = None) -> Preset:
+    """Find a preset in the given preset files or the default preset files."""
+    paths = get_preset_files() if paths is None else list(paths)
+    preset = None
+    for path in paths:
+        preset = read_presets(path).get(name, preset)
+    if preset is None:
+        searched = ", ".join(map(str, paths)) or "any preset file"
+        raise ValueError(f"Preset {name} not found in {searched}")
+    return preset
+
+
+def apply_preset(
+    preset: Preset,
+    files: List[Path],
+    options: dict,
+    keys: Optional[Iterable[str]] = None,
+) -> dict:
+    """
+    Return create_tracks options with the preset values of the given option keys,
+    by default of all file type options, one value per file of the file type of
+    the option. Files without a preset value for an option keep the value given
+    in options.
+    """
+    options = dict(options)
+    if keys is None:
+        keys = [key for key in options if key not in ("names", "heights")]
+    resolved = {file.name: preset.resolve(file.name) for file in files}
+    for key in keys:
+        typed_files = filter_files_by_filetype(
+            files, FILE_TYPE_SUFFIXES[get_option_file_type(key)]
+        )
+        if not any(key in resolved[file.name] for file in typed_files):
+            continue
+        # Options given once apply to all files of the type
+        values = options[key]
+        if len(values) == 1:
+            values = values * len(typed_files)
+        options[key] = [
+            resolved[file.name].get(key, value)
+            for file, value in zip(typed_files, values)
+        ]
+    return options
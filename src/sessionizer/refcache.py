@@ -0,0 +1,280 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sessionizer.headers import parse_sam_header, read_cram_header
+from sessionizer.metrics import stage
+from sessionizer.output import write_atomic
+from sessionizer.utils import get_cache_dir
+
+# Bytes read at a time while hashing sequences
+FASTA_CHUNK_SIZE = 1 << 20
+
+# Characters left out of the M5 checksum: whitespace, control and non-ASCII
+# characters (SAM specification, @SQ M5)
+M5_IGNORED_BYTES = bytes(i for i in range(256) if i < 33 or i > 126)
+
+
+@dataclass(frozen=True)
+class FaiEntry:
+    """
+    Sequence of a FASTA index (.fai).
+
+    Attributes:
+    - name: Sequence name.
+    - length: Number of bases.
+    - offset: Byte offset of the first base.
+    - line_bases: Bases per line.
+    - line_width: Bytes per line, including the line break.
+
+    """
+
+    name: str
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+    def byte_length(self) -> int:
+        # Bytes from the first to the last base, including line breaks
+        if self.length == 0:
+            return 0
+        full_lines, rest = divmod(self.length, self.line_bases)
+        if rest == 0:
+            return (full_lines - 1) * self.line_width + self.line_bases
+        return full_lines * self.line_width + rest
+
+
+def read_fai_entries(path: Path) -> List[FaiEntry]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            FaiEntry(fields[0], *map(int, fields[1:5]))
+            for fields in (line.rstrip("\n").split("\t") for line in f)
+            if len(fields) >= 5
+        ]
+
+
+def get_ref_cache_path(ref_cache: Path, md5: str) -> Path:
+    # samtools REF_CACHE layout %2s/%2s/%s
+    return ref_cache / md5[:2] / md5[2:4] / md5[4:]
+
+
+class SequenceWriter:
+    """
+    Hash a sequence and write it to a REF_CACHE directory while it is read.
+
+    The sequence is written to a temporary file, which is renamed to the
+    checksum path once the sequence is complete, unless it is cached already.
+    """
+
+    def __init__(self, ref_cache: Optional[Path]):
+        self.ref_cache = ref_cache
+        self.md5 = hashlib.md5()
+        self.file = None
+        if ref_cache is not None:
+            ref_cache.mkdir(parents=True, exist_ok=True)
+            self.tmp_path = ref_cache / f".{os.getpid()}.{threading.get_ident()}.tmp"
+            self.file = open(self.tmp_path, "wb")
+
+    def write(self, data: bytes):
+        data = data.translate(None, M5_IGNORED_BYTES).upper()
+        self.md5.update(data)
+        if self.file is not None:
+            self.file.write(data)
+
+    def close(self) -> str:
+        md5 = self.md5.hexdigest()
+        if self.file is not None:
+            self.file.close()
+            cache_path = get_ref_cache_path(self.ref_cache, md5)
+            if cache_path.exists():
+                os.unlink(self.tmp_path)
+            else:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(self.tmp_path, cache_path)
+        return md5
+
+
+def hash_indexed_sequence(
+    fasta: Path, entry: FaiEntry, ref_cache: Optional[Path]
+) -> str:
+    # Read one sequence at its offset in the FASTA index
+    if fasta.name.endswith(".gz"):
+        raise ValueError(f"{fasta} is compressed and can not be read at .fai offsets.")
+    with stage("hash sequence", path=str(fasta), sequence=entry.name):
+        writer = SequenceWriter(ref_cache)
+        with open(fasta, "rb") as f:
+            f.seek(entry.offset)
+            remaining = entry.byte_length()
+            while remaining > 0:
+                data = f.read(min(remaining, FASTA_CHUNK_SIZE))
+                if not data:
+                    break
+                writer.write(data)
+                remaining -= len(data)
+        return writer.close()
+
+
+def iter_fasta_md5(fasta: Path, ref_cache: Optional[Path]) -> Iterator[Tuple[str, str]]:
+    # Stream a FASTA file without index, yielding the name and checksum of
+    # each sequence. Gzipped and bgzipped files are decompressed
+    name = None
+    writer = None
+    opener = gzip.open if fasta.name.endswith(".gz") else open
+    with opener(fasta, "rb") as f:
+        for line in f:
+            if line.startswith(b">"):
+                if writer is not None:
+                    yield name, writer.close()
+                fields = line[1:].split(None, 1)
+                name = fields[0].decode("utf-8") if fields else ""
+                writer = SequenceWriter(ref_cache)
+            elif writer is not None:
+                writer.write(line)
+    if writer is not None:
+        yield name, writer.close()
+
+
+class Md5Cache:
+    """
+    On-disk cache of the sequence checksums of FASTA files keyed by file path,
+    size and modification time.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.changed = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def signature(file: Path) -> List[int]:
+        stat = file.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, file: Path) -> Optional[Dict[str, str]]:
+        entry = self.entries.get(str(file.absolute()))
+        if entry is not None and entry["signature"] == self.signature(file):
+            return entry["md5"]
+        return None
+
+    def set(self, file: Path, md5: Dict[str, str]):
+        self.entries[str(file.absolute())] = {
+            "signature": self.signature(file),
+            "md5": md5,
+        }
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path, [json.dumps(self.entries)])
+
+
+def get_fasta_md5(
+    fasta: Path, ref_cache: Optional[Path] = None, threads: int = 8
+) -> Dict[str, str]:
+    """
+    Checksums of the sequences of a FASTA file by name, filling the REF_CACHE
+    directory if one is given.
+
+    The FASTA file is read once. With a .fai index the sequences of an
+    uncompressed file are read and hashed in parallel at their offsets,
+    otherwise the file is streamed, decompressing gzipped and bgzipped files. The
+    checksums are cached, so the file is only read again if it changed or
+    sequences are missing from the REF_CACHE directory.
+    """
+    cache = Md5Cache(get_cache_dir() / "reference_md5.json")
+    md5 = cache.get(fasta)
+    missing = None
+    if md5 is not None:
+        if ref_cache is None:
+            return md5
+        missing = {
+            name
+            for name, checksum in md5.items()
+            if not get_ref_cache_path(ref_cache, checksum).exists()
+        }
+        if not missing:
+            return md5
+
+    # The .fai offsets of bgzipped files are uncompressed offsets, which need the
+    # .gzi index to seek, so compressed files are streamed
+    fai = fasta.with_name(fasta.name + ".fai")
+    with stage("hash reference", path=str(fasta)):
+        if fai.exists() and not fasta.name.endswith(".gz"):
+            entries = [
+                entry
+                for entry in read_fai_entries(fai)
+                if missing is None or entry.name in missing
+            ]
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                checksums = executor.map(
+                    lambda entry: hash_indexed_sequence(fasta, entry, ref_cache),
+                    entries,
+                )
+                new_md5 = dict(zip((entry.name for entry in entries), checksums))
+        else:
+            new_md5 = dict(iter_fasta_md5(fasta, ref_cache))
+
+    md5 = {**(md5 or {}), **new_md5}
+    cache.set(fasta, md5)
+    cache.save()
+    return md5
+
+
+def read_cram_sequences(path: Path) -> List[Dict[str, str]]:
+    return parse_sam_header(read_cram_header(path), "@SQ")
+
+
+def resolve_cram_references(
+    crams: List[Path],
+    fasta: Optional[Path],
+    ref_cache: Optional[Path] = None,
+    threads: int = 8,
+) -> List[str]:
+    """
+    Check that the reference sequences of CRAM files, identified by the M5 tags
+    of their @SQ header lines, can be resolved without the EBI reference
+    service: from the FASTA file or from the REF_CACHE directory, which is
+    filled from the FASTA file.
+
+    The CRAM headers are read in parallel while the FASTA file is hashed.
+    Returns a list of problems.
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        headers = executor.map(read_cram_sequences, crams)
+        fasta_md5 = (
+            get_fasta_md5(fasta, ref_cache, threads) if fasta is not None else {}
+        )
+        sequences = list(headers)
+
+    available: Set[str] = set(fasta_md5.values())
+    problems = []
+    for cram, cram_sequences in zip(crams, sequences):
+        for sequence in cram_sequences:
+            name, m5 = sequence.get("SN", ""), sequence.get("M5", "").lower()
+            if not m5:
+                continue
+            if m5 in available:
+                continue
+            if ref_cache is not None and get_ref_cache_path(ref_cache, m5).exists():
+                available.add(m5)
+                continue
+            if name in fasta_md5:
+                problems.append(
+                    f"{cram}: {name} (M5 {m5}) differs from {name} in {fasta}"
+                )
+            else:
+                problems.append(f"{cram}: {name} (M5 {m5}) can not be resolved")
+    return problems
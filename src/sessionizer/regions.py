@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from sessionizer.filetypes import VCF_SUFFIXES
+from sessionizer.utils import open_text
+
+
+class Region(NamedTuple):
+    """Genomic region in IGV's 1-based, closed coordinates."""
+
+    chrom: str
+    start: int
+    end: int
+    name: str = ""
+
+    @property
+    def locus(self) -> str:
+        if self.start == self.end:
+            return f"{self.chrom}:{self.start}"
+        return f"{self.chrom}:{self.start}-{self.end}"
+
+    @property
+    def stem(self) -> str:
+        if self.start == self.end:
+            return f"{self.chrom}_{self.start}"
+        return f"{self.chrom}_{self.start}_{self.end}"
+
+
+def unique_stems(regions: Iterable[Region]) -> Iterator[Tuple[Region, str]]:
+    """
+    Yield each region with a file name stem that is unique among the regions.
+
+    Regions with the same coordinates, e.g. VCF records of several alleles at one
+    position or duplicate BED intervals, get the suffixes _2, _3 and so on in the
+    order they are read.
+    """
+    seen: Dict[str, int] = {}
+    for region in regions:
+        stem = region.stem
+        if stem in seen:
+            n = seen[stem]
+            while f"{region.stem}_{n + 1}" in seen:
+                n += 1
+            seen[region.stem] = n + 1
+            stem = f"{region.stem}_{n + 1}"
+        seen[stem] = 1
+        yield region, stem
+
+
+def read_regions(path: Path) -> Iterator[Region]:
+    """
+    Stream regions from a VCF or BED file (optionally gzipped).
+
+    BED coordinates are converted from 0-based half-open to 1-based closed.
+    """
+    is_vcf = any(path.name.endswith(suffix) for suffix in VCF_SUFFIXES)
+    with open_text(path) as f:
+        for line in f:
+            if not line.strip() or line.startswith(("#", "track", "browser")):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if is_vcf:
+                pos = int(fields[1])
+                name = fields[2] if len(fields) > 2 and fields[2] != "." else ""
+                yield Region(fields[0], pos, pos, name)
+            else:
+                name = fields[3] if len(fields) > 3 else ""
+                yield Region(fields[0], int(fields[1]) + 1, int(fields[2]), name)
+
+
+def chromosome_sort_key(chrom: str):
+    # Natural order: chr1, chr2, ..., chr10, ..., chrX, chrY, chrM, then others
+    name = chrom[3:] if chrom.lower().startswith("chr") else chrom
+    if name.isdigit():
+        return (0, int(name), "")
+    return (1, 0, name)
+
+
+def sort_regions(regions: Iterable[Region]) -> List[Region]:
+    return sorted(
+        regions,
+        key=lambda region: (chromosome_sort_key(region.chrom), region.start, region.end),
+    )
+
+
+def merge_regions(regions: Iterable[Region]) -> Iterator[Region]:
+    """
+    Merge overlapping regions with a sort-and-sweep pass.
+
+    Merged regions keep the name of the first region.
+    """
+    current = None
+    for region in sort_regions(regions):
+        if (
+            current is not None
+            and region.chrom == current.chrom
+            and region.start <= current.end
+        ):
+            if region.end > current.end:
+                current = current._replace(end=region.end)
+            continue
+        if current is not None:
+            yield current
+        current = region
+    if current is not None:
+        yield current
@@ -0,0 +1,336 @@
+import http.client
+import json
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from sessionizer.metrics import count, stage
+from sessionizer.output import write_atomic
+from sessionizer.utils import get_index_extension
+
+# URL schemes of inputs served over HTTP
+REMOTE_SCHEMES = ("http://", "https://")
+
+# Seconds URL check results are reused
+URL_CHECK_TTL = 300.0
+
+# Seconds to wait for a server to connect or respond
+URL_CHECK_TIMEOUT = 10.0
+
+
+def is_url(value: str) -> bool:
+    return value.lower().startswith(REMOTE_SCHEMES)
+
+
+class RemotePath:
+    """
+    URL of an input file served over HTTP(S).
+
+    Provides the parts of the Path interface used for input files, such as the
+    file name and suffix taken from the URL path, so URLs can be used as track
+    files. The URL is written to sessions unchanged.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def __str__(self) -> str:
+        return self.url
+
+    def __repr__(self) -> str:
+        return f"RemotePath({self.url!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RemotePath) and other.url == self.url
+
+    def __hash__(self) -> int:
+        return hash(self.url)
+
+    @property
+    def name(self) -> str:
+        return unquote(posixpath.basename(urlsplit(self.url).path))
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.name).suffix
+
+    @property
+    def stem(self) -> str:
+        return PurePosixPath(self.name).stem
+
+    def with_name(self, name: str) -> "RemotePath":
+        # Replace the last path segment, keeping e.g. the query with a token
+        parts = urlsplit(self.url)
+        path = posixpath.join(posixpath.dirname(parts.path), name)
+        return RemotePath(urlunsplit(parts._replace(path=path)))
+
+    def absolute(self) -> "RemotePath":
+        return self
+
+    def is_absolute(self) -> bool:
+        return True
+
+
+def is_remote(path) -> bool:
+    return isinstance(path, RemotePath)
+
+
+def parse_input_path(value: str) -> Union[Path, RemotePath]:
+    return RemotePath(value) if is_url(value) else Path(value)
+
+
+@dataclass
+class UrlStatus:
+    """
+    Result of a URL check.
+
+    Attributes:
+    - status: HTTP status, 0 if the server could not be reached.
+    - size: Content length in bytes, None if not reported.
+    - last_modified: Last modification as Unix time, None if not reported.
+    - error: Connection error if the server could not be reached.
+    - checked: Time of the check.
+
+    """
+
+    status: int
+    size: Optional[int] = None
+    last_modified: Optional[float] = None
+    error: str = ""
+    checked: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 400
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections by host, reused by all requests.
+
+    A connection is used by one request at a time; connections are added when
+    all connections to a host are busy, so the number of connections per host
+    is at most the number of concurrent requests.
+    """
+
+    def __init__(self, timeout: float = URL_CHECK_TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+
+    def acquire(self, key: Tuple[str, str]) -> Tuple[http.client.HTTPConnection, bool]:
+        # Returns a connection and whether it was used before
+        with self.lock:
+            connections = self.idle.get(key)
+            if connections:
+                return connections.pop(), True
+        scheme, netloc = key
+        if scheme == "https":
+            connection: http.client.HTTPConnection = http.client.HTTPSConnection(
+                netloc, timeout=self.timeout
+            )
+        else:
+            connection = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        count("http connections")
+        return connection, False
+
+    def release(self, key: Tuple[str, str], connection: http.client.HTTPConnection):
+        with self.lock:
+            self.idle.setdefault(key, []).append(connection)
+
+    def request(
+        self, method: str, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, http.client.HTTPMessage]:
+        """Send a request and return the status and headers of the response."""
+        parts = urlsplit(url)
+        key = (parts.scheme.lower(), parts.netloc)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+
+        while True:
+            connection, reused = self.acquire(key)
+            try:
+                connection.request(method, target, headers=headers or {})
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                # The server may have closed an idle connection, retry once on
+                # a new connection
+                if reused:
+                    continue
+                raise
+            count("http requests")
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(key, connection)
+            return response.status, response.headers
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class UrlChecker:
+    """
+    Check that URLs are reachable with HEAD requests, sent concurrently over a
+    pool of keep-alive connections.
+
+    Results are reused for ttl seconds, across runs if a cache file is given.
+    Unreachable servers are not cached, so they are checked again next time.
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[Path] = None,
+        ttl: float = URL_CHECK_TTL,
+        threads: int = 16,
+        timeout: float = URL_CHECK_TIMEOUT,
+    ):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.threads = threads
+        self.pool = ConnectionPool(timeout)
+        self.lock = threading.Lock()
+        self.results: Dict[str, UrlStatus] = {}
+        self.changed = False
+        if cache_path is not None:
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    self.results = {
+                        url: UrlStatus(**result) for url, result in json.load(f).items()
+                    }
+            except (OSError, ValueError, TypeError):
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def head(self, url: str) -> UrlStatus:
+        try:
+            status, headers = self.pool.request("HEAD", url)
+            size = headers.get("Content-Length")
+            if status in (405, 501):
+                # HEAD is not supported, request the first byte instead
+                status, headers = self.pool.request("GET", url, {"Range": "bytes=0-0"})
+                size = headers.get("Content-Range", "").rpartition("/")[2] or (
+                    headers.get("Content-Length") if status == 200 else None
+                )
+        except (OSError, http.client.HTTPException) as e:
+            return UrlStatus(status=0, error=str(e) or type(e).__name__)
+        return UrlStatus(
+            status=status,
+            size=int(size) if size and size.isdigit() else None,
+            last_modified=parse_http_date(headers.get("Last-Modified")),
+            checked=time.time(),
+        )
+
+    def check(self, url: str) -> UrlStatus:
+        with self.lock:
+            result = self.results.get(url)
+        if result is not None and time.time() - result.checked < self.ttl:
+            count("url checks cached")
+            return result
+
+        with stage("head", url=url):
+            result = self.head(url)
+        if result.status:
+            with self.lock:
+                self.results[url] = result
+                self.changed = True
+        return result
+
+    def check_all(self, urls: Iterable[str]) -> Dict[str, UrlStatus]:
+        """Check URLs concurrently. Returns the result of each URL."""
+        unique = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return dict(zip(unique, executor.map(self.check, unique)))
+
+    def close(self):
+        self.pool.close()
+        if self.cache_path is None or not self.changed:
+            return
+        now = time.time()
+        with self.lock:
+            results = {
+                url: asdict(result)
+                for url, result in self.results.items()
+                if now - result.checked < self.ttl
+            }
+            self.changed = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.cache_path, [json.dumps(results)])
+        except OSError:
+            pass
+
+
+def get_index_url(path: RemotePath) -> Optional[RemotePath]:
+    index_extension = get_index_extension(path.name)
+    return path.with_name(path.name + index_extension) if index_extension else None
+
+
+def check_remote_input(path: RemotePath, results: Dict[str, UrlStatus]) -> List[str]:
+    """
+    Report problems of a URL input and its index from the check results, as
+    check_input does for local files. A missing index is not a problem.
+    """
+    result = results[str(path)]
+    if not result.status:
+        return [f"{path} can not be reached: {result.error}"]
+    if not result.ok:
+        return [f"{path} returned HTTP {result.status}"]
+
+    problems = []
+    if result.size == 0:
+        problems.append(f"{path} is empty")
+
+    index = get_index_url(path)
+    if index is not None:
+        index_result = results[str(index)]
+        if not index_result.status:
+            problems.append(f"{index} can not be reached: {index_result.error}")
+        elif index_result.ok:
+            if (
+                index_result.last_modified is not None
+                and result.last_modified is not None
+                and index_result.last_modified < result.last_modified
+            ):
+                problems.append(f"{index} is older than {path.name}")
+        elif index_result.status != 404:
+            problems.append(f"{index} returned HTTP {index_result.status}")
+    return problems
+
+
+def check_remote_inputs(paths: List[RemotePath], checker: UrlChecker) -> List[str]:
+    """Check URL inputs and their indexes. Returns the problems in input order."""
+    urls = []
+    for path in paths:
+        index = get_index_url(path)
+        urls += [str(path)] + ([str(index)] if index is not None else [])
+    with stage("check urls", urls=len(urls)):
+        results = checker.check_all(urls)
+    return [problem for path in paths for problem in check_remote_input(path, results)]
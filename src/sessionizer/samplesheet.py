@@ -0,0 +1,173 @@
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sessionizer.catalog import inspect_file
+from sessionizer.metrics import stage
+from sessionizer.output import OutputWriter
+from sessionizer.remote import is_remote, parse_input_path
+from sessionizer.track_elements import DataTrack
+from sessionizer.utils import open_text
+
+# Names of the sample sheet column with file paths, matched case-insensitively
+PATH_COLUMNS = ["path", "file"]
+
+
+@dataclass
+class SampleSheet:
+    """
+    Sample sheet indexed for joining input files.
+
+    The first column holds the sample names. Rows are indexed by sample name,
+    by the absolute path and by the file name of an optional path column.
+
+    Attributes:
+    - columns: Column names.
+    - rows: Rows as dictionaries of column name to value.
+    - by_sample: Row index by sample name.
+    - by_path: Row index by absolute path.
+    - by_name: Row index by file name.
+
+    """
+
+    columns: List[str]
+    rows: List[Dict[str, str]] = field(default_factory=list)
+    by_sample: Dict[str, int] = field(default_factory=dict)
+    by_path: Dict[str, int] = field(default_factory=dict)
+    by_name: Dict[str, int] = field(default_factory=dict)
+
+
+@lru_cache(maxsize=8)
+def load_sample_sheet(path: Path, mtime_ns: int) -> SampleSheet:
+    # Cached by modification time, so a changed sheet is read again
+    delimiter = "," if path.name.removesuffix(".gz").endswith(".csv") else "\t"
+    with open_text(path) as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        if not reader.fieldnames:
+            raise ValueError(f"Sample sheet {path} has no header")
+        sheet = SampleSheet(columns=list(reader.fieldnames))
+        sheet.rows = list(reader)
+
+    sample_column = sheet.columns[0]
+    path_column = next(
+        (column for column in sheet.columns if column.lower() in PATH_COLUMNS), None
+    )
+    for i, row in enumerate(sheet.rows):
+        sheet.by_sample.setdefault(row[sample_column], i)
+        if path_column and row[path_column]:
+            row_path = parse_input_path(row[path_column])
+            if not row_path.is_absolute():
+                row_path = path.parent / row_path
+            sheet.by_path.setdefault(get_path_key(row_path), i)
+            sheet.by_name.setdefault(row_path.name, i)
+
+    return sheet
+
+
+def read_sample_sheet(path: Path) -> SampleSheet:
+    """
+    Read a tab or comma separated (.csv) sample sheet with a header line.
+
+    Sheets are loaded once per process and modification time.
+    """
+    with stage("read sample sheet", path=str(path)):
+        return load_sample_sheet(path.absolute(), path.stat().st_mtime_ns)
+
+
+def get_path_key(path: Path) -> str:
+    # Absolute path of a file, URLs are used as they are
+    return str(path) if is_remote(path) else os.path.abspath(path)
+
+
+def get_sample_name(path: Path) -> str:
+    # Related files share the name before the first dot, e.g. NA12878.cram
+    return path.name.split(".", 1)[0]
+
+
+def join_sample_sheet(
+    sheet: SampleSheet, files: List[Path], threads: int = 8
+) -> List[Optional[Dict[str, str]]]:
+    """
+    Find the sample sheet row of each file, None if there is none.
+
+    Files are matched by path, by file name and by the sample name before the
+    first dot of the file name. Headers are only read for the remaining files,
+    matching the sample names of read groups or VCF columns.
+    """
+    matches: List[Optional[int]] = []
+    for file in files:
+        match = sheet.by_path.get(get_path_key(file))
+        if match is None:
+            match = sheet.by_name.get(file.name)
+        if match is None:
+            match = sheet.by_sample.get(get_sample_name(file))
+        matches.append(match)
+
+    # Headers of URL inputs are not read
+    unmatched = [
+        i
+        for i, match in enumerate(matches)
+        if match is None and not is_remote(files[i])
+    ]
+    if unmatched:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            headers = executor.map(lambda i: inspect_file(files[i])[0], unmatched)
+            for i, samples in zip(unmatched, headers):
+                matches[i] = next(
+                    (sheet.by_sample[s] for s in samples if s in sheet.by_sample), None
+                )
+
+    return [sheet.rows[match] if match is not None else None for match in matches]
+
+
+def get_sort_order(
+    sheet: SampleSheet, rows: List[Optional[Dict[str, str]]], columns: List[str]
+) -> List[int]:
+    """
+    Order of files by sample sheet columns.
+
+    Numeric values are compared as numbers. Files without row or value come
+    last, and the order of equal files is kept.
+    """
+
+    def sort_key(i: int):
+        key = []
+        for column in columns:
+            value = (rows[i] or {}).get(column) or ""
+            try:
+                key.append((0, float(value), ""))
+            except ValueError:
+                key.append((1 if value else 2, 0.0, value))
+        return key
+
+    for column in columns:
+        if column not in sheet.columns:
+            raise ValueError(f"Sample sheet has no column {column}")
+    return sorted(range(len(rows)), key=sort_key)
+
+
+def write_attribute_file(
+    path: Path,
+    sheet: SampleSheet,
+    tracks: List[DataTrack],
+    rows: List[Optional[Dict[str, str]]],
+    writer: Optional[OutputWriter] = None,
+):
+    """
+    Write an IGV sample information file with the sample sheet columns of each
+    track, matched to the tracks by their name.
+    """
+    columns = [column for column in sheet.columns if column.lower() not in PATH_COLUMNS]
+    buffer = io.StringIO()
+    csv_writer = csv.writer(buffer, delimiter="\t", lineterminator="\n")
+    csv_writer.writerow(["Track", *columns])
+    for track, row in zip(tracks, rows):
+        if row is not None:
+            values = [row.get(column, "") for column in columns]
+            csv_writer.writerow([track.name, *values])
+    (writer or OutputWriter()).write(path, [buffer.getvalue()])
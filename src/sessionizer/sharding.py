@@ -0,0 +1,162 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sessionizer.headers import parse_sam_header, read_bam_header, read_cram_header
+from sessionizer.indexes import get_alignment_density
+from sessionizer.metrics import stage
+from sessionizer.output import OutputWriter
+from sessionizer.remote import is_remote
+from sessionizer.track_elements import DataTrack
+from sessionizer.utils import get_file_type, get_index_extension
+
+# Estimated memory (MB) IGV uses for a track independent of the data
+TRACK_BASE_COST = {
+    "alignment": 40.0,
+    "variant": 5.0,
+    "bigwig": 2.0,
+    "gtf": 2.0,
+}
+DEFAULT_BASE_COST = 2.0
+
+# IGV loads alignments in a 30 kb visibility window
+ALIGNMENT_VISIBILITY_WINDOW = 30_000
+
+# Memory per compressed byte of loaded alignments, reads are decompressed and
+# stored as Java objects
+ALIGNMENT_EXPANSION = {".bam": 30.0, ".cram": 60.0, ".sam": 3.0}
+
+# Memory per byte of feature files without index, which IGV loads completely
+FEATURE_EXPANSION = 8.0
+
+# Genome size assumed when an alignment file has neither index nor header
+DEFAULT_GENOME_SIZE = 3.1e9
+
+
+class ShardModeOption(str, Enum):
+    SESSIONS = "sessions"
+    PANELS = "panels"
+
+    def __str__(self):
+        return self.value
+
+
+def estimate_alignment_density(path: Path) -> float:
+    # Compressed bytes per base, from the index if present, else from the file
+    # size and the reference lengths in the header
+    try:
+        return get_alignment_density(path)
+    except (OSError, ValueError, EOFError, struct.error):
+        pass
+
+    size = path.stat().st_size
+    genome_size = DEFAULT_GENOME_SIZE
+    try:
+        if path.name.endswith(".bam"):
+            genome_size = sum(length for _, length in read_bam_header(path)[1]) or genome_size
+        elif path.name.endswith(".cram"):
+            records = parse_sam_header(read_cram_header(path), "@SQ")
+            genome_size = sum(int(record["LN"]) for record in records) or genome_size
+    except (OSError, ValueError, EOFError, KeyError, IndexError, struct.error):
+        pass
+    return size / genome_size
+
+
+def estimate_track_cost(path: Path) -> float:
+    """
+    Estimate the memory (MB) IGV needs to show a file.
+
+    Alignments are loaded for the visibility window, so their cost depends on the
+    read density. Indexed feature files are loaded per region, while files
+    without index are loaded completely and cost in proportion to their size.
+    """
+    file_type = get_file_type(path.name)
+    cost = TRACK_BASE_COST.get(file_type, DEFAULT_BASE_COST)
+
+    # The size and index of URL inputs are not known without requests
+    if is_remote(path):
+        return cost
+
+    if file_type == "alignment":
+        expansion = next(
+            (e for suffix, e in ALIGNMENT_EXPANSION.items() if path.name.endswith(suffix)),
+            ALIGNMENT_EXPANSION[".bam"],
+        )
+        with stage("read index", path=str(path)):
+            density = estimate_alignment_density(path)
+        cost += density * ALIGNMENT_VISIBILITY_WINDOW * expansion / 1e6
+    elif file_type != "bigwig":
+        index_extension = get_index_extension(path.name)
+        if not index_extension or not path.with_name(path.name + index_extension).exists():
+            cost += path.stat().st_size * FEATURE_EXPANSION / 1e6
+
+    return cost
+
+
+def estimate_track_costs(files: List[Path], threads: int = 8) -> List[float]:
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(estimate_track_cost, files))
+
+
+def get_group_key(path: Path) -> str:
+    # Related files share the name before the first dot, e.g. sample1.bam and
+    # sample1.vcf.gz
+    return path.name.split(".", 1)[0]
+
+
+def shard_tracks(
+    tracks: List[DataTrack],
+    costs: List[float],
+    budget: Optional[float] = None,
+    max_tracks: Optional[int] = None,
+) -> List[List[int]]:
+    """
+    Split tracks into shards within a memory budget and a maximum number of tracks.
+
+    Tracks of related files are kept in the same shard. Groups are placed first
+    fit in order of decreasing cost; a group exceeding the budget on its own gets
+    its own shard. Returns the track indices of each shard, in input order.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, track in enumerate(tracks):
+        groups.setdefault(get_group_key(track.path), []).append(i)
+
+    shards: List[List[int]] = []
+    shard_costs: List[float] = []
+    for indices in sorted(groups.values(), key=lambda g: -sum(costs[i] for i in g)):
+        group_cost = sum(costs[i] for i in indices)
+        for j, shard in enumerate(shards):
+            if (budget is None or shard_costs[j] + group_cost <= budget) and (
+                max_tracks is None or len(shard) + len(indices) <= max_tracks
+            ):
+                shard.extend(indices)
+                shard_costs[j] += group_cost
+                break
+        else:
+            shards.append(list(indices))
+            shard_costs.append(group_cost)
+
+    # Order shards by their first track
+    return sorted((sorted(shard) for shard in shards), key=lambda shard: shard[0])
+
+
+def write_shard_index(
+    path: Path,
+    session_paths: List[Path],
+    shards: List[List[int]],
+    tracks: List[DataTrack],
+    costs: List[float],
+    writer: Optional[OutputWriter] = None,
+):
+    """Write a tab separated index of the shard sessions and their tracks."""
+
+    def iter_lines():
+        yield "session\testimated_memory_mb\ttracks\n"
+        for session_path, shard in zip(session_paths, shards):
+            cost = sum(costs[i] for i in shard)
+            names = ",".join(tracks[i].name for i in shard)
+            yield f"{session_path.name}\t{cost:.0f}\t{names}\n"
+
+    (writer or OutputWriter()).write(path, iter_lines())
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sessionizer.metrics import count_syscall, stage
+from sessionizer.utils import get_index_extension
+
+# Name of the reference table database in the store directory
+SHORTCUT_DB_NAME = "shortcuts.sqlite"
+
+# Minimum age (seconds) of unreferenced links removed by gc, so links of runs
+# still writing their sessions are kept
+GC_MIN_AGE = 3600.0
+
+SHORTCUT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    link TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    session TEXT NOT NULL,
+    link TEXT NOT NULL REFERENCES links (link) ON DELETE CASCADE,
+    PRIMARY KEY (session, link)
+);
+CREATE INDEX IF NOT EXISTS refs_link ON refs (link);
+"""
+
+
+class ShortcutStore:
+    """
+    Directory of symlinks shared by many sessions.
+
+    The links of a file are placed in a directory named after the device and
+    inode of the file, so each file is linked once however many sessions use
+    it, and its index is linked next to it. A reference table records which
+    sessions use which links, so unused links can be removed without scanning
+    the store.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        directory.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(directory / SHORTCUT_DB_NAME)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SHORTCUT_SCHEMA)
+        self.pending_links: Dict[str, str] = {}
+
+    def close(self):
+        self.connection.close()
+
+    def create_link(self, link: Path, target: Path) -> bool:
+        # Create the symlink unless it exists with the same target
+        try:
+            count_syscall("readlink")
+            if os.readlink(link) == str(target):
+                return False
+            count_syscall("unlink")
+            link.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            count_syscall("symlink")
+            link.symlink_to(target)
+        except FileExistsError:
+            # Created by a parallel run
+            if os.readlink(link) != str(target):
+                raise
+        return True
+
+    def link_file(self, file: Path) -> Dict[str, str]:
+        # Links of a file and its index by link path
+        target = file.absolute()
+        count_syscall("stat")
+        stat = target.stat()
+        link_dir = self.directory / f"{stat.st_dev:x}-{stat.st_ino:x}"
+        count_syscall("mkdir")
+        link_dir.mkdir(exist_ok=True)
+
+        links = {str(link_dir / file.name): str(target)}
+        index_extension = get_index_extension(file.name)
+        if index_extension:
+            index = target.with_name(target.name + index_extension)
+            count_syscall("stat")
+            if index.exists():
+                links[str(link_dir / index.name)] = str(index)
+
+        for link, link_target in links.items():
+            self.create_link(Path(link), Path(link_target))
+        return links
+
+    def link_files(self, files: List[Path]) -> List[Path]:
+        """
+        Link files and their indexes. Returns the link of each file.
+
+        The links are recorded without references until add_references() is
+        called, so links of a failed run are removed by the next gc().
+        """
+        links: Dict[str, str] = {}
+        file_links = []
+        with stage("symlinks", files=len(files)):
+            for file in files:
+                file_link_map = self.link_file(file)
+                links.update(file_link_map)
+                file_links.append(Path(next(iter(file_link_map))))
+
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                # An upsert keeps the references, a replace would delete them
+                "INSERT INTO links (link, target, created) VALUES (?, ?, ?) "
+                "ON CONFLICT (link) DO UPDATE "
+                "SET target = excluded.target, created = excluded.created",
+                [(link, target, now) for link, target in links.items()],
+            )
+        self.pending_links.update(links)
+        return file_links
+
+    def add_references(self, sessions: List[Path]):
+        """
+        Record that sessions use the links created since the last call,
+        replacing the references of their previous versions.
+        """
+        with self.connection:
+            for session in sessions:
+                session_key = str(session.absolute())
+                self.connection.execute(
+                    "DELETE FROM refs WHERE session = ?", (session_key,)
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO refs (session, link) VALUES (?, ?)",
+                    [(session_key, link) for link in self.pending_links],
+                )
+        self.pending_links.clear()
+
+    def gc(self, min_age: float = GC_MIN_AGE) -> Dict[str, int]:
+        """
+        Remove the references of deleted sessions and the links no session
+        uses that were created at least min_age seconds ago.
+
+        Only the sessions and links in the reference table are checked.
+        """
+        sessions = [
+            session
+            for (session,) in self.connection.execute(
+                "SELECT DISTINCT session FROM refs"
+            )
+        ]
+        removed_sessions = [s for s in sessions if not os.path.exists(s)]
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM refs WHERE session = ?", [(s,) for s in removed_sessions]
+            )
+            orphans = [
+                link
+                for (link,) in self.connection.execute(
+                    "SELECT link FROM links WHERE created <= ? "
+                    "AND link NOT IN (SELECT link FROM refs)",
+                    (time.time() - min_age,),
+                )
+            ]
+            for link in orphans:
+                try:
+                    os.unlink(link)
+                except FileNotFoundError:
+                    pass
+                # Remove the directory of the file once its last link is gone
+                try:
+                    os.rmdir(os.path.dirname(link))
+                except OSError:
+                    pass
+            self.connection.executemany(
+                "DELETE FROM links WHERE link = ?", [(link,) for link in orphans]
+            )
+        return {"sessions": len(removed_sessions), "links": len(orphans)}
@@ -0,0 +1,121 @@
+import hashlib
+import json
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from sessionizer.genomes import GENOME
+from sessionizer.remote import is_remote, is_url
+from sessionizer.track_elements import DataTrack
+
+# Prefix of the XML comment holding the session spec
+SPEC_COMMENT_PREFIX = "sessionizer-spec"
+
+# Version of the spec format, sessions with another version are out of date
+SPEC_VERSION = 1
+
+# Number of lines read from the start of a session to find the spec comment
+SPEC_COMMENT_MAX_LINES = 4
+
+
+def get_input_signature(path: Path) -> Optional[List[int]]:
+    # Size and modification time of an input file, None if it is missing
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_spec(
+    genome: GENOME,
+    genome_path: Path,
+    tracks: List[DataTrack],
+    inputs: Iterable[Path],
+    locus: str = "",
+    options: Optional[dict] = None,
+) -> dict:
+    """
+    Describe everything a session is generated from.
+
+    The inputs are recorded with their size and modification time, so a session
+    can be checked against the current files without generating it again. URL
+    inputs are recorded without signature.
+    """
+    input_paths = sorted(
+        {str(path if is_remote(path) else Path(path).absolute()) for path in inputs}
+    )
+    return {
+        "version": SPEC_VERSION,
+        "genome": str(genome),
+        "genome_path": str(genome_path),
+        "locus": locus,
+        "tracks": [
+            {"class": type(track).__name__, **asdict(track)} for track in tracks
+        ],
+        "options": options or {},
+        "inputs": {
+            path: None if is_url(path) else get_input_signature(Path(path))
+            for path in input_paths
+        },
+    }
+
+
+def spec_hash(spec: dict) -> str:
+    data = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def format_spec_comment(spec: dict) -> str:
+    # "--" is not allowed in XML comments, the JSON escape keeps it readable
+    data = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    data = data.replace("--", "-\\u002d")
+    return f"{SPEC_COMMENT_PREFIX} sha256={spec_hash(spec)} {data}"
+
+
+def read_spec_comment(session: Path) -> Optional[Dict]:
+    """
+    Read the spec comment of a session, None if it has none.
+
+    Only the first lines of the session are read, the comment follows the XML
+    declaration.
+    """
+    start = f"<!--{SPEC_COMMENT_PREFIX} sha256="
+    with open(session, "r", encoding="utf-8") as f:
+        for _ in range(SPEC_COMMENT_MAX_LINES):
+            line = f.readline()
+            if line.startswith(start):
+                comment = line[len(start) :].rstrip().removesuffix("-->")
+                digest, data = comment.split(" ", 1)
+                return {"sha256": digest, "spec": json.loads(data)}
+    return None
+
+
+def check_session(session: Path) -> List[str]:
+    """
+    Check a session against its current inputs.
+
+    Returns the reasons the session is out of date, empty if it is up to date.
+    Only the spec comment is read and the inputs are stat'ed; no XML is built.
+    """
+    comment = read_spec_comment(session)
+    if comment is None:
+        return ["no spec comment, generate the session with --embed-spec"]
+
+    spec = comment["spec"]
+    if spec.get("version") != SPEC_VERSION:
+        return [f"spec version {spec.get('version')} is not {SPEC_VERSION}"]
+    if spec_hash(spec) != comment["sha256"]:
+        return ["spec comment does not match its hash"]
+
+    problems = []
+    for path, signature in spec["inputs"].items():
+        # URL inputs can not be checked without requests
+        if is_url(path):
+            continue
+        current = get_input_signature(Path(path))
+        if current is None:
+            problems.append(f"{path} is missing")
+        elif current != signature:
+            problems.append(f"{path} changed")
+    return problems
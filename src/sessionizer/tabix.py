@@ -0,0 +1,171 @@
+import io
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional
+
+from sessionizer.output import OutputWriter
+from sessionizer.regions import Region
+
+# Maximum amount of uncompressed data in a BGZF block
+BGZF_BLOCK_SIZE = 0xFF00
+
+# Empty BGZF block marking the end of file
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+# Size of the linear index windows
+LINEAR_INDEX_SHIFT = 14
+
+# Tabix preset for BED files: generic format with 0-based coordinates
+TABIX_FORMAT_BED = 0x10000
+
+
+class BgzfWriter:
+    """
+    Minimal writer for BGZF, the blocked gzip format read by tabix and IGV.
+
+    Data passed to a single write() call is never split across blocks, so the
+    returned virtual offsets can be used directly in an index.
+    """
+
+    def __init__(self, handle: BinaryIO):
+        self.handle = handle
+        self.buffer = bytearray()
+        self.block_offset = 0
+
+    def tell(self) -> int:
+        return (self.block_offset << 16) | len(self.buffer)
+
+    def write(self, data: bytes) -> int:
+        if len(self.buffer) + len(data) > BGZF_BLOCK_SIZE:
+            self.flush()
+        virtual_offset = self.tell()
+        self.buffer += data
+        return virtual_offset
+
+    def write_all(self, data: bytes):
+        # Write data of any size, splitting it over multiple blocks
+        for i in range(0, len(data), BGZF_BLOCK_SIZE):
+            self.write(data[i : i + BGZF_BLOCK_SIZE])
+
+    def flush(self):
+        if not self.buffer:
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        compressed = compressor.compress(bytes(self.buffer)) + compressor.flush()
+        block_size = 18 + len(compressed) + 8
+
+        # gzip header with the BGZF "BC" extra field holding the block size
+        self.handle.write(
+            struct.pack(
+                "<4BI2BH2BHH", 31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, block_size - 1
+            )
+        )
+        self.handle.write(compressed)
+        self.handle.write(struct.pack("<II", zlib.crc32(self.buffer), len(self.buffer)))
+
+        self.block_offset += block_size
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.handle.write(BGZF_EOF)
+
+
+def reg2bin(beg: int, end: int) -> int:
+    # Smallest UCSC/SAM bin containing the 0-based, half-open interval
+    end -= 1
+    if beg >> 14 == end >> 14:
+        return ((1 << 15) - 1) // 7 + (beg >> 14)
+    if beg >> 17 == end >> 17:
+        return ((1 << 12) - 1) // 7 + (beg >> 17)
+    if beg >> 20 == end >> 20:
+        return ((1 << 9) - 1) // 7 + (beg >> 20)
+    if beg >> 23 == end >> 23:
+        return ((1 << 6) - 1) // 7 + (beg >> 23)
+    if beg >> 26 == end >> 26:
+        return ((1 << 3) - 1) // 7 + (beg >> 26)
+    return 0
+
+
+class ReferenceIndex:
+    def __init__(self):
+        self.bins: Dict[int, List[List[int]]] = {}
+        self.linear: List = []
+
+    def add(self, beg: int, end: int, voffset_beg: int, voffset_end: int):
+        # Add chunk to bin, merging with the previous chunk if adjacent
+        chunks = self.bins.setdefault(reg2bin(beg, end), [])
+        if chunks and chunks[-1][1] == voffset_beg:
+            chunks[-1][1] = voffset_end
+        else:
+            chunks.append([voffset_beg, voffset_end])
+
+        # Record the first record overlapping each linear index window
+        last_window = (max(end, beg + 1) - 1) >> LINEAR_INDEX_SHIFT
+        if len(self.linear) <= last_window:
+            self.linear.extend([None] * (last_window + 1 - len(self.linear)))
+        for window in range(beg >> LINEAR_INDEX_SHIFT, last_window + 1):
+            if self.linear[window] is None:
+                self.linear[window] = voffset_beg
+
+    def pack(self) -> bytes:
+        # Empty windows point to the next record
+        linear = list(self.linear)
+        for window in range(len(linear) - 2, -1, -1):
+            if linear[window] is None:
+                linear[window] = linear[window + 1]
+
+        data = [struct.pack("<i", len(self.bins))]
+        for bin_id, chunks in self.bins.items():
+            data.append(struct.pack("<Ii", bin_id, len(chunks)))
+            data.extend(struct.pack("<QQ", *chunk) for chunk in chunks)
+        data.append(struct.pack("<i", len(linear)))
+        data.append(struct.pack(f"<{len(linear)}Q", *linear))
+        return b"".join(data)
+
+
+def write_indexed_bed(
+    regions: Iterable[Region], path: Path, writer: Optional[OutputWriter] = None
+) -> Path:
+    """
+    Write regions to a bgzipped BED file with a tabix index next to it.
+
+    Regions must be sorted by position and grouped by chromosome, e.g. by
+    `sort_regions`. Both files are compressed in memory and written through the
+    output writer. Returns the path of the index.
+    """
+    writer = writer or OutputWriter()
+    references: Dict[str, ReferenceIndex] = {}
+
+    handle = io.BytesIO()
+    bgzf = BgzfWriter(handle)
+    for region in regions:
+        beg, end = region.start - 1, region.end
+        line = f"{region.chrom}\t{beg}\t{end}"
+        if region.name:
+            line += f"\t{region.name}"
+        voffset_beg = bgzf.write(f"{line}\n".encode("utf-8"))
+        references.setdefault(region.chrom, ReferenceIndex()).add(
+            beg, end, voffset_beg, bgzf.tell()
+        )
+    bgzf.close()
+    writer.write(path, [handle.getvalue()])
+
+    names = b"".join(name.encode("utf-8") + b"\0" for name in references)
+    # Columns of the sequence name, start and end, and the comment character
+    columns = (1, 2, 3, ord("#"), 0)
+    header = struct.pack(
+        "<4s8i", b"TBI\1", len(references), TABIX_FORMAT_BED, *columns, len(names)
+    )
+
+    index_path = path.with_name(path.name + ".tbi")
+    handle = io.BytesIO()
+    bgzf = BgzfWriter(handle)
+    bgzf.write_all(header + names)
+    for reference in references.values():
+        bgzf.write_all(reference.pack())
+    bgzf.close()
+    writer.write(index_path, [handle.getvalue()])
+
+    return index_path
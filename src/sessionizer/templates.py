@@ -0,0 +1,176 @@
+import csv
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from sessionizer.create_igv_session import (
+    DEFAULT_TRACK_OPTIONS,
+    XML_ATTRIBUTE_ENTITIES,
+    create_tracks,
+    generate_xml,
+)
+from sessionizer.genomes import GENOME, read_registry_file
+from sessionizer.utils import bw_range_parser
+
+# Placeholders written into the session while compiling a template
+PLACEHOLDER_PATTERN = re.compile(r"@@(path|name|locus):([^@]*)@@")
+
+
+def placeholder(kind: str, slot: str = "") -> str:
+    return f"@@{kind}:{slot}@@"
+
+
+def parse_track_option(key: str, value) -> list:
+    # Convert a template option to the list create_tracks expects, using the
+    # type of the default value
+    if key not in DEFAULT_TRACK_OPTIONS or key in ("names", "heights"):
+        raise ValueError(f"{key} is not a track option")
+    if key == "bw_ranges":
+        return [bw_range_parser(value)]
+    default = DEFAULT_TRACK_OPTIONS[key][0]
+    if isinstance(default, bool) and not isinstance(value, bool):
+        raise ValueError(f"{key} must be true or false")
+    return [type(default)(value)]
+
+
+@dataclass
+class SessionTemplate:
+    """
+    Session layout compiled into serialized XML fragments.
+
+    Attributes:
+    - name: Template name.
+    - slots: Slot names in track order; each slot is one input file.
+    - parts: Fragments of the serialized session without and with an initial
+      locus, alternating literal text and (kind, slot) placeholders.
+
+    """
+
+    name: str
+    slots: List[str]
+    parts: Dict[bool, List[object]] = field(default_factory=dict)
+
+    def render(
+        self,
+        paths: Dict[str, str],
+        names: Optional[Dict[str, str]] = None,
+        locus: str = "",
+    ) -> str:
+        """
+        Render a session by substituting the paths, names and locus.
+
+        Names default to the file names, as for sessions without --name.
+        """
+        names = names or {}
+        missing = [slot for slot in self.slots if not paths.get(slot)]
+        if missing:
+            raise ValueError(f"Template {self.name} is missing {', '.join(missing)}")
+
+        values = {}
+        for slot in self.slots:
+            values[("path", slot)] = paths[slot]
+            values[("name", slot)] = names.get(slot) or Path(paths[slot]).name
+        values[("locus", "")] = locus
+
+        return "".join(
+            part
+            if isinstance(part, str)
+            else escape(values[part], XML_ATTRIBUTE_ENTITIES)
+            for part in self.parts[bool(locus)]
+        )
+
+
+def compile_template(
+    name: str, spec: dict, genome: GENOME, genome_path: Path
+) -> SessionTemplate:
+    """
+    Compile a template spec into XML fragments.
+
+    The spec lists the tracks, each with a slot name, the file suffix selecting
+    the track type (e.g. ".bam") and optional height and track options named
+    like the create_tracks arguments, e.g. bam_color_by = "tag".
+    """
+    tracks = []
+    slots = []
+    for track_spec in spec.get("tracks", []):
+        slot = track_spec["slot"]
+        if slot in slots or not re.fullmatch(r"[\w.-]+", slot):
+            raise ValueError(f"Invalid or duplicate slot {slot} in template {name}")
+        options = {
+            **DEFAULT_TRACK_OPTIONS,
+            "names": [placeholder("name", slot)],
+        }
+        for key, value in track_spec.get("options", {}).items():
+            options[key] = parse_track_option(key, value)
+
+        # The suffix selects the track type, the path is replaced afterwards
+        file = Path(f"file{track_spec['suffix']}")
+        (track,) = create_tracks(files=[file], **options)
+        track.path = Path(placeholder("path", slot))
+        # create_tracks ignores a single height
+        track.height = int(track_spec.get("height", 0))
+        tracks.append(track)
+        slots.append(slot)
+
+    template = SessionTemplate(name=name, slots=slots)
+    for with_locus in [False, True]:
+        xml_str = generate_xml(
+            genome,
+            genome_path,
+            tracks,
+            locus=placeholder("locus") if with_locus else "",
+        )
+        # split() returns the text around the placeholders and their groups
+        tokens = PLACEHOLDER_PATTERN.split(xml_str)
+        parts: List[object] = [tokens[0]]
+        for kind, slot, text in zip(tokens[1::3], tokens[2::3], tokens[3::3]):
+            parts += [(kind, slot), text]
+        template.parts[with_locus] = parts
+    return template
+
+
+def read_templates(
+    path: Path, genome: GENOME, genome_path: Path
+) -> Dict[str, SessionTemplate]:
+    """Read and compile the templates of a TOML or JSON file."""
+    specs = read_registry_file(path)
+    return {
+        name: compile_template(name, spec, genome, genome_path)
+        for name, spec in specs.items()
+    }
+
+
+def read_instances(
+    path: Path, template: SessionTemplate
+) -> Iterator[Tuple[str, Dict[str, str], Dict[str, str], str]]:
+    """
+    Yield (session stem, paths, names, locus) of each row of a tab separated
+    instances file with a session column, one column per slot, optional
+    <slot>_name columns and an optional locus column.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        missing = [
+            column
+            for column in ["session", *template.slots]
+            if column not in (reader.fieldnames or [])
+        ]
+        if missing:
+            raise ValueError(f"{path} is missing the columns {', '.join(missing)}")
+
+        for line_number, row in enumerate(reader, start=2):
+            # Session stems are file names in the output directory
+            stem = row["session"] or ""
+            if stem in ["", ".", ".."] or any(
+                separator in stem for separator in ["/", os.sep, os.altsep] if separator
+            ):
+                raise ValueError(
+                    f"{path}:{line_number}: invalid session name {stem!r}, "
+                    "session names must be file names without directories"
+                )
+            paths = {slot: row.get(slot) or "" for slot in template.slots}
+            names = {slot: row.get(f"{slot}_name") or "" for slot in template.slots}
+            yield stem, paths, names, row.get("locus") or ""
@@ -2,8 +2,10 @@ import xml.etree.ElementTree as ET
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
+from typing import List
 
 from sessionizer.colors import RGBColorOption
+from sessionizer.filetypes import get_index_extension
 
 
 class AlignmentGroupByOption(str, Enum):
@@ -89,6 +91,65 @@ class BigWigPlotTypeOption(str, Enum):
         return self.value
 
 
+# IGV batch commands for setting track display modes
+DISPLAY_MODE_BATCH_COMMANDS = {
+    "expanded": "expand",
+    "collapsed": "collapse",
+    "squished": "squish",
+}
+
+# igv.js colorBy types of the alignment color options it supports
+IGVJS_COLOR_BY = {
+    "none": "none",
+    "read_strand": "strand",
+    "first_of_pair_strand": "firstOfPairStrand",
+    "pair_orientation": "pairOrientation",
+    "insert_size": "insertSize",
+    "unexpected_pair": "unexpectedPair",
+    "tag": "tag",
+    "meth": "basemod",
+    "base_modification": "basemod",
+    "base_modification_2color": "basemod2",
+}
+
+# igv.js groupBy values of the alignment group options it supports
+IGVJS_GROUP_BY = {
+    "strand": "strand",
+    "sample": "sample",
+    "read_group": "readGroup",
+    "library": "library",
+    "first_of_pair": "firstOfPairStrand",
+    "pair_orientation": "pairOrientation",
+    "mate_chromosome": "mateChr",
+    "chimeric": "chimeric",
+    "supplementary": "supplementary",
+    "read_order": "readOrder",
+    "phase": "phase",
+    "mapping_quality": "mapq",
+}
+
+# igv.js alignment display modes, igv.js has no collapsed mode
+IGVJS_ALIGNMENT_DISPLAY_MODES = {
+    "expanded": "EXPANDED",
+    "collapsed": "SQUISHED",
+    "squished": "SQUISHED",
+}
+
+# igv.js graph types of the BigWig plot types
+IGVJS_GRAPH_TYPES = {
+    "line": "line",
+    "scatter": "points",
+    "heatmap": "heatmap",
+    "bar": "bar",
+}
+
+
+def batch_argument(value) -> str:
+    # IGV batch commands are split on whitespace unless the argument is quoted
+    value = str(value)
+    return f'"{value}"' if any(char.isspace() for char in value) else value
+
+
 @dataclass
 class DataTrack:
     name: str
@@ -119,6 +180,30 @@ class DataTrack:
 
         return track_elem
 
+    # Method for loading track in an IGV batch script
+    def batch_commands(self) -> List[str]:
+        commands = [
+            f"load {batch_argument(self.path)} name={batch_argument(self.name)}"
+        ]
+        if self.height != 0:
+            commands.append(f"setTrackHeight {self.height} {batch_argument(self.name)}")
+
+        return commands
+
+    # Method for creating the igv.js track configuration
+    def igvjs_config(self) -> dict:
+        config = {"name": self.name, "url": str(self.path)}
+        index_extension = get_index_extension(self.path.name)
+        if index_extension:
+            # with_name keeps e.g. the query of URLs after the index name
+            config["indexURL"] = str(
+                self.path.with_name(self.path.name + index_extension)
+            )
+        if self.height != 0:
+            config["height"] = self.height
+
+        return config
+
 
 @dataclass
 class AlignmentTrack(DataTrack):
@@ -174,6 +259,49 @@ class AlignmentTrack(DataTrack):
 
         return track_elem
 
+    def igvjs_config(self) -> dict:
+        config = super().igvjs_config()
+        config["type"] = "alignment"
+        config["format"] = self.path.suffix.lstrip(".").lower()
+        config["displayMode"] = IGVJS_ALIGNMENT_DISPLAY_MODES[self.display_mode.value]
+        config["showCoverage"] = self.show_coverage
+        config["showJunctions"] = self.show_junctions
+
+        # Options without igv.js equivalent are left out
+        if self.color_by.value in IGVJS_COLOR_BY:
+            config["colorBy"] = {"type": IGVJS_COLOR_BY[self.color_by.value]}
+            if self.color_by == AlignmentColorByOption.TAG:
+                config["colorBy"]["tag"] = self.color_by_tag
+        if self.group_by.value in IGVJS_GROUP_BY:
+            config["groupBy"] = IGVJS_GROUP_BY[self.group_by.value]
+        if self.hide_small_indels:
+            config["hideSmallIndels"] = True
+            config["indelSizeThreshold"] = self.small_indel_threshold
+
+        return config
+
+    def batch_commands(self) -> List[str]:
+        commands = super().batch_commands()
+
+        # Set display mode
+        display_command = DISPLAY_MODE_BATCH_COMMANDS[self.display_mode.value]
+        commands.append(f"{display_command} {batch_argument(self.name)}")
+
+        # Group and color options apply to all loaded alignment tracks
+        if self.group_by != AlignmentGroupByOption.NONE:
+            commands.append(f"group {self.group_by.name}")
+        if self.color_by == AlignmentColorByOption.TAG:
+            commands.append(f"colorBy TAG {self.color_by_tag}")
+        elif self.color_by != AlignmentColorByOption.NONE:
+            commands.append(f"colorBy {self.color_by.name}")
+        if self.hide_small_indels:
+            commands.append("preference SAM.HIDE_SMALL_INDEL true")
+            commands.append(
+                f"preference SAM.SMALL_INDEL_BP_THRESHOLD {self.small_indel_threshold}"
+            )
+
+        return commands
+
 
 @dataclass
 class BigWigRangeOption:
@@ -233,6 +361,44 @@ class BigWigTrack(DataTrack):
                 range_elem.set("maximum", str(self.range.maximum))
         return track_elem
 
+    def igvjs_config(self) -> dict:
+        config = super().igvjs_config()
+        config["type"] = "wig"
+        config["format"] = "wig" if self.path.name.endswith(".wig") else "bigwig"
+        if self.color != RGBColorOption.NONE:
+            config["color"] = f"rgb({self.color.rgb_values()})"
+        if self.negative_color != RGBColorOption.NONE:
+            config["altColor"] = f"rgb({self.negative_color.rgb_values()})"
+        if self.plot_type != BigWigPlotTypeOption.NONE:
+            config["graphType"] = IGVJS_GRAPH_TYPES[self.plot_type.value]
+        config["autoscale"] = self.autoscale
+
+        # igv.js has no baseline
+        if not self.autoscale and self.range is not None:
+            if self.range.minimum is not None:
+                config["min"] = self.range.minimum
+            if self.range.maximum is not None:
+                config["max"] = self.range.maximum
+
+        return config
+
+    def batch_commands(self) -> List[str]:
+        commands = super().batch_commands()
+        name = batch_argument(self.name)
+
+        # Add colors and data range for BigWig track
+        if self.color != RGBColorOption.NONE:
+            commands.append(f"setColor {self.color.rgb_values()} {name}")
+        if self.negative_color != RGBColorOption.NONE:
+            commands.append(f"setAltColor {self.negative_color.rgb_values()} {name}")
+        if self.autoscale:
+            commands.append(f"setDataRange auto {name}")
+        elif self.range is not None:
+            data_range = f"{self.range.minimum},{self.range.baseline},{self.range.maximum}"
+            commands.append(f"setDataRange {data_range} {name}")
+
+        return commands
+
 
 @dataclass
 class VariantTrack(DataTrack):
@@ -251,6 +417,15 @@ class VariantTrack(DataTrack):
 
         return track_elem
 
+    def igvjs_config(self) -> dict:
+        config = super().igvjs_config()
+        config["type"] = "variant"
+        config["format"] = "vcf"
+        config["showGenotypes"] = self.show_genotypes
+        config["visibilityWindow"] = self.feature_visibility_window
+
+        return config
+
 
 class GtfDisplayModeOption(str, Enum):
     EXPANDED = "expanded"
@@ -275,3 +450,18 @@ class GtfTrack(DataTrack):
         track_elem.set("displayMode", self.display_mode.name)
 
         return track_elem
+
+    def igvjs_config(self) -> dict:
+        config = super().igvjs_config()
+        config["type"] = "annotation"
+        config["format"] = "gtf"
+        config["displayMode"] = self.display_mode.name
+
+        return config
+
+    def batch_commands(self) -> List[str]:
+        commands = super().batch_commands()
+        display_command = DISPLAY_MODE_BATCH_COMMANDS[self.display_mode.value]
+        commands.append(f"{display_command} {batch_argument(self.name)}")
+
+        return commands
@@ -1,30 +1,76 @@
+import gzip
+import os
 import re
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
-from sessionizer.filetypes import FILE_INDEX_EXTENSIONS
+from sessionizer.filetypes import FILE_TYPE_SUFFIXES, get_index_extension
+from sessionizer.metrics import count_syscall, stage
 from sessionizer.track_elements import BigWigRangeOption
 
 
 def generate_symlink(shortcut_dir: Path, file: Path) -> Path:
     symlink = shortcut_dir / file.name
 
-    # If symlink already exists, remove it
-    if symlink.is_symlink():
-        symlink.unlink()
+    with stage("symlink", path=str(file)):
+        # If symlink already exists, remove it
+        count_syscall("lstat")
+        if symlink.is_symlink():
+            count_syscall("unlink")
+            symlink.unlink()
 
-    # Create symlink
-    symlink.symlink_to(file)
+        # Create symlink
+        count_syscall("symlink")
+        symlink.symlink_to(file)
 
     # Handle index files if they exist (https://igvteam.github.io/igv-webapp/fileFormats.html)
-    extension = next((key for key in FILE_INDEX_EXTENSIONS if file.name.endswith(key)), None)
-    if extension:
-        file_index = file.parent / (file.name + FILE_INDEX_EXTENSIONS[extension])
-        if file_index.exists():
+    index_extension = get_index_extension(file.name)
+    if index_extension:
+        file_index = file.parent / (file.name + index_extension)
+        with stage("index discovery", path=str(file)):
+            count_syscall("stat")
+            index_exists = file_index.exists()
+        if index_exists:
             generate_symlink(shortcut_dir, file_index)
 
     return symlink
 
 
+class RelativePathResolver:
+    """
+    Compute paths relative to a base directory, e.g. the session directory.
+
+    The base is resolved once and the real path of each parent directory is
+    looked up once, so many files in the same directories cost one realpath
+    call per directory. Symlinked directories are resolved, files are not, so
+    paths to symlinks stay paths to symlinks.
+    """
+
+    def __init__(self, base: Path):
+        self.directories: Dict[str, str] = {}
+        self.base = self.real_directory(os.path.abspath(base))
+        self.relative_directories: Dict[str, str] = {}
+
+    def real_directory(self, directory: str) -> str:
+        if directory not in self.directories:
+            # realpath calls lstat on each component of the path
+            count_syscall("lstat", len(Path(directory).parts))
+            self.directories[directory] = os.path.realpath(directory)
+        return self.directories[directory]
+
+    def relative(self, path: Path) -> Path:
+        directory, name = os.path.split(os.path.abspath(path))
+        if directory not in self.relative_directories:
+            self.relative_directories[directory] = os.path.relpath(
+                self.real_directory(directory), self.base
+            )
+        return Path(self.relative_directories[directory], name)
+
+    def relative_all(self, paths: Iterable[Path]) -> List[Path]:
+        with stage("relative paths"):
+            return [self.relative(path) for path in paths]
+
+
 def bw_range_parser(value: str):
     if not re.match(r"^\d+(\.\d+)?,\d+(\.\d+)?(,\d+(\.\d+)?)?$", value):
         raise ValueError(f"The bw_range {value} does not fit the pattern float,float (min,max) or float,float,float (min,mid,max).")
@@ -42,3 +88,24 @@ def bw_range_parser(value: str):
 
 def filter_files_by_filetype(files, suffix_list):
     return [file for file in files for suffix in suffix_list if file.name.endswith(suffix)]
+
+
+def open_text(path: Path):
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def get_cache_dir() -> Path:
+    # Directory for indexes and caches, e.g. ~/.cache/sessionizer
+    if "SESSIONIZER_CACHE_DIR" in os.environ:
+        return Path(os.environ["SESSIONIZER_CACHE_DIR"])
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "sessionizer"
+
+
+def get_file_type(file_name: str) -> Optional[str]:
+    for file_type, suffixes in FILE_TYPE_SUFFIXES.items():
+        if any(file_name.endswith(suffix) for suffix in suffixes):
+            return file_type
+    return None
@@ -0,0 +1,81 @@
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from sessionizer.metrics import count_syscall, stage
+from sessionizer.remote import UrlChecker, check_remote_inputs, is_remote
+from sessionizer.utils import get_index_extension
+
+
+def is_readable(path: Path) -> bool:
+    count_syscall("access")
+    return os.access(path, os.R_OK)
+
+
+def check_input(path: Path) -> List[str]:
+    """
+    Check that an input file exists, is readable and not empty, and that its
+    index is not older than the file. A missing index is not a problem, IGV
+    reads some files without index.
+    """
+    count_syscall("stat")
+    try:
+        data_stat = os.stat(path)
+    except FileNotFoundError:
+        return [f"{path} does not exist"]
+    except OSError as e:
+        return [f"{path} can not be accessed: {e.strerror}"]
+
+    if stat.S_ISDIR(data_stat.st_mode):
+        return [f"{path} is a directory"]
+
+    problems = []
+    if not is_readable(path):
+        problems.append(f"{path} is not readable")
+    elif data_stat.st_size == 0:
+        problems.append(f"{path} is empty")
+
+    index_extension = get_index_extension(path.name)
+    if index_extension:
+        index = path.with_name(path.name + index_extension)
+        count_syscall("stat")
+        try:
+            index_stat = os.stat(index)
+        except OSError:
+            return problems
+        if index_stat.st_mtime_ns < data_stat.st_mtime_ns:
+            problems.append(f"{index} is older than {path.name}")
+        if not is_readable(index):
+            problems.append(f"{index} is not readable")
+
+    return problems
+
+
+def validate_inputs(
+    paths: Iterable[Path], threads: int = 16, url_checker: Optional[UrlChecker] = None
+) -> List[str]:
+    """
+    Check input files and their indexes concurrently.
+
+    Paths may be produced lazily, e.g. by discover_files, and each local file is
+    checked as soon as it is produced. URL inputs are only checked if a URL
+    checker is given. Returns every problem found, local files first, instead of
+    stopping at the first one.
+    """
+    remote_paths = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = []
+        for path in paths:
+            if is_remote(path):
+                remote_paths.append(path)
+            else:
+                futures.append(executor.submit(check_input, path))
+        # Only the checks still running once all paths are produced are timed
+        with stage("validate inputs", files=len(futures)):
+            problems = [problem for future in futures for problem in future.result()]
+
+    if remote_paths and url_checker is not None:
+        problems += check_remote_inputs(remote_paths, url_checker)
+    return problems
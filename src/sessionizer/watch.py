@@ -0,0 +1,354 @@
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from sessionizer.catalog import Catalog
+from sessionizer.create_igv_session import (
+    DEFAULT_TRACK_OPTIONS,
+    create_tracks,
+    write_session_xml,
+)
+from sessionizer.genomes import GENOME
+from sessionizer.output import OutputWriter
+from sessionizer.presets import Preset, apply_preset
+from sessionizer.utils import get_index_extension
+
+# inotify event flags, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+
+
+def list_directories(root: str) -> List[str]:
+    # All directories below root, including root
+    directories = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        directories.append(directory)
+        try:
+            with os.scandir(directory) as it:
+                stack.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+        except OSError:
+            pass
+    return directories
+
+
+class InotifyWatcher:
+    """
+    Report changed directories using Linux inotify.
+
+    Only directories are watched, so the number of watches grows with the number
+    of directories rather than the number of files.
+    """
+
+    def __init__(self, roots: Iterable[str]):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self.watches: Dict[int, str] = {}
+        try:
+            for root in roots:
+                for directory in list_directories(root):
+                    self.add_watch(directory)
+        except OSError:
+            self.close()
+            raise
+
+    @property
+    def directories(self) -> Set[str]:
+        return set(self.watches.values())
+
+    def add_watch(self, directory: str):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), INOTIFY_MASK | IN_ONLYDIR
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            # Directories removed before they are watched are ignored, running
+            # out of watches is raised so the caller can fall back to polling
+            if errno in (2, 20):  # ENOENT, ENOTDIR
+                return
+            raise OSError(errno, f"inotify_add_watch {directory}: {os.strerror(errno)}")
+        self.watches[wd] = directory
+
+    def wait(self, timeout: float) -> Set[str]:
+        changed: Set[str] = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size : offset + INOTIFY_EVENT.size + length]
+                offset += INOTIFY_EVENT.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost, check all directories
+                    changed.update(self.watches.values())
+                    continue
+                directory = self.watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.watches[wd]
+                    continue
+
+                changed.add(directory)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Watch new directories, files may already exist in them
+                    subdirectory = os.path.join(directory, os.fsdecode(name.rstrip(b"\0")))
+                    for new_directory in list_directories(subdirectory):
+                        self.add_watch(new_directory)
+                        changed.add(new_directory)
+
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Report changed directories by polling directory modification times.
+
+    A directory's modification time changes when files are created, renamed or
+    deleted in it, so only directories are stat'ed on each poll. Files rewritten
+    in place, without renaming, are not detected.
+    """
+
+    def __init__(self, roots: Iterable[str], interval: float = 2.0):
+        self.interval = interval
+        self.mtimes: Dict[str, int] = {}
+        for root in roots:
+            for directory in list_directories(root):
+                self.add_directory(directory)
+
+    @property
+    def directories(self) -> Set[str]:
+        return set(self.mtimes)
+
+    def add_directory(self, directory: str):
+        try:
+            self.mtimes[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            pass
+
+    def wait(self, timeout: float) -> Set[str]:
+        time.sleep(min(timeout, self.interval))
+
+        changed: Set[str] = set()
+        for directory, mtime in list(self.mtimes.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                del self.mtimes[directory]
+                changed.add(directory)
+                continue
+            if current == mtime:
+                continue
+
+            self.mtimes[directory] = current
+            changed.add(directory)
+            # Find new subdirectories
+            try:
+                with os.scandir(directory) as it:
+                    new = [
+                        e.path
+                        for e in it
+                        if e.is_dir(follow_symlinks=False) and e.path not in self.mtimes
+                    ]
+            except OSError:
+                continue
+            for subdirectory in chain.from_iterable(map(list_directories, new)):
+                self.add_directory(subdirectory)
+                changed.add(subdirectory)
+
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots: List[str], polling: bool = False, interval: float = 2.0):
+    # Prefer inotify, fall back to polling e.g. on other platforms, network file
+    # systems without inotify support or when running out of inotify watches
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots, interval)
+
+
+def get_session_path(output_dir: Path, sample: str) -> Path:
+    return output_dir / (re.sub(r"[^\w.-]", "_", sample) + ".xml")
+
+
+class SessionWatcher:
+    """
+    Keep one IGV session per sample up to date with the files in a catalog.
+
+    Changed directories are scanned once they have been quiet for the debounce
+    time. Files that are still being written, or whose index is missing or older
+    than the data, are skipped until they are complete. Only the sessions of
+    samples with changed files are written again.
+    """
+
+    def __init__(
+        self,
+        catalog: Catalog,
+        output_dir: Path,
+        genome: GENOME,
+        genome_path: Path,
+        debounce: float = 5.0,
+        threads: int = 8,
+        preset: Optional[Preset] = None,
+    ):
+        self.catalog = catalog
+        self.output_dir = output_dir
+        self.genome = genome
+        self.genome_path = genome_path
+        self.debounce = debounce
+        self.preset = preset
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        # Sessions of samples whose files did not change are left untouched
+        self.writer = OutputWriter(skip_unchanged=True)
+        # Directories waiting for the debounce time, with the time of the last change
+        self.pending: Dict[str, float] = {}
+        self.unstable: Set[str] = set()
+
+    def is_ready(self, path: str, stat: os.stat_result, entries: Dict[str, os.DirEntry]) -> bool:
+        # Recently modified files may still be written
+        if time.time() - stat.st_mtime_ns / 1e9 < self.debounce:
+            self.unstable.add(os.path.dirname(path))
+            return False
+
+        # Indexed files are ready once their index is written after the data
+        name = os.path.basename(path)
+        index_extension = get_index_extension(name)
+        if index_extension:
+            index = entries.get(name + index_extension)
+            try:
+                return index is not None and index.stat().st_mtime_ns >= stat.st_mtime_ns
+            except OSError:
+                return False
+        return True
+
+    def update_directories(self, directories: Iterable[str]) -> Set[str]:
+        """Scan directories into the catalog and return the affected samples."""
+        samples: Set[str] = set()
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        for directory in directories:
+            previous = self.catalog.get_directory_samples(directory)
+            if not os.path.isdir(directory):
+                self.catalog.remove_directory(directory)
+                samples.update(*previous.values())
+                continue
+
+            _, changed = self.catalog.scan_directory(
+                directory, self.executor, counts, is_ready=self.is_ready
+            )
+            if changed:
+                current = self.catalog.get_directory_samples(directory)
+                for path in changed:
+                    samples.update(previous.get(path, ()), current.get(path, ()))
+        self.catalog.connection.commit()
+        return samples
+
+    def write_sessions(self, samples: Iterable[str]) -> List[Path]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        genome_filter = self.genome if self.genome != GENOME.CUSTOM else None
+
+        written = []
+        for sample in sorted(samples):
+            session_path = get_session_path(self.output_dir, sample)
+            files = self.catalog.query(sample=sample, genome=genome_filter)
+            if not files:
+                session_path.unlink(missing_ok=True)
+                continue
+
+            options = DEFAULT_TRACK_OPTIONS
+            if self.preset is not None:
+                options = apply_preset(self.preset, files, options)
+            tracks = create_tracks(files, **options)
+            if write_session_xml(
+                session_path, self.genome, self.genome_path, tracks, writer=self.writer
+            ):
+                written.append(session_path)
+        return written
+
+    def process(self, changed: Iterable[str], now: float) -> List[Path]:
+        """Debounce changed directories and update the sessions of quiet ones."""
+        for directory in changed:
+            self.pending[directory] = now
+
+        ready = [d for d, t in self.pending.items() if now - t >= self.debounce]
+        if not ready:
+            return []
+        for directory in ready:
+            del self.pending[directory]
+
+        self.unstable.clear()
+        samples = self.update_directories(ready)
+
+        # Check directories with files that were still being written again later
+        for directory in self.unstable:
+            self.pending.setdefault(directory, now)
+
+        return self.write_sessions(samples)
+
+    def start(self, directories: Iterable[str]) -> List[Path]:
+        # Catch up with changes since the last run and write missing sessions
+        samples = self.update_directories(directories)
+        samples.update(
+            sample
+            for sample in self.catalog.list_samples()
+            if not get_session_path(self.output_dir, sample).exists()
+        )
+        for directory in self.unstable:
+            self.pending.setdefault(directory, time.monotonic())
+        return self.write_sessions(samples)
+
+    def run(self, watcher, stop: Optional[threading.Event] = None):
+        self.start(sorted(watcher.directories))
+        while stop is None or not stop.is_set():
+            changed = watcher.wait(self.debounce)
+            self.process(changed, time.monotonic())
+
+    def close(self):
+        self.executor.shutdown()
@@ -16,6 +16,10 @@ class TestAppHelp(unittest.TestCase):
         result = self.runner.invoke(app, ["--help"])
         assert result.exit_code == 0
 
+        # The options of the run command are shown, with the other commands
+        assert "--file" in result.output
+        assert "Other commands" in result.output
+
 
 class TestAppAlignment(unittest.TestCase):
     def setUp(self):
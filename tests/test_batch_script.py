@@ -0,0 +1,199 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.batch_script import generate_batch_script, shard_regions
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from sessionizer.regions import Region, sort_regions
+from sessionizer.track_elements import (
+    AlignmentColorByOption,
+    AlignmentDisplayModeOption,
+    AlignmentGroupByOption,
+    AlignmentTrack,
+)
+
+
+class TestBatchScript(unittest.TestCase):
+    def setUp(self):
+        self.track = AlignmentTrack(
+            name="tumour sample",
+            path=Path("/data/tumour.bam"),
+            height=300,
+            group_by=AlignmentGroupByOption.PHASE,
+            color_by=AlignmentColorByOption.TAG,
+            color_by_tag="HP",
+            display_mode=AlignmentDisplayModeOption.SQUISHED,
+            hide_small_indels=False,
+            small_indel_threshold=0,
+            show_coverage=True,
+            show_junctions=False,
+        )
+
+    def test_sort_regions(self):
+        regions = [
+            Region("chr10", 5, 5),
+            Region("chrX", 1, 1),
+            Region("chr2", 50, 60),
+            Region("chr2", 10, 20),
+        ]
+        assert sort_regions(regions) == [
+            Region("chr2", 10, 20),
+            Region("chr2", 50, 60),
+            Region("chr10", 5, 5),
+            Region("chrX", 1, 1),
+        ]
+
+    def test_shard_regions(self):
+        regions = [Region("chr1", i, i) for i in range(1, 11)]
+
+        shards = shard_regions(regions, 3)
+        assert [len(shard) for shard in shards] == [4, 3, 3]
+        assert [region for shard in shards for region in shard] == regions
+
+        assert len(shard_regions(regions[:2], 5)) == 2
+
+    def test_generate_batch_script(self):
+        script = generate_batch_script(
+            GENOME.HG38,
+            Path(""),
+            [self.track],
+            [Region("chr1", 100, 200)],
+            Path("/snapshots"),
+        ).splitlines()
+
+        assert script[:3] == [
+            "new",
+            "genome hg38",
+            'load /data/tumour.bam name="tumour sample"',
+        ]
+        assert 'setTrackHeight 300 "tumour sample"' in script
+        assert 'squish "tumour sample"' in script
+        assert "group PHASE" in script
+        assert "colorBy TAG HP" in script
+        assert script[-3:] == ["goto chr1:100-200", "snapshot chr1_100_200.png", "exit"]
+
+
+class TestAppBatchScript(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.input_bam = self.test_dir / "input.bam"
+        self.input_bam.write_text("test content")
+
+        self.bed = self.test_dir / "regions.bed"
+        self.bed.write_text("chr2\t0\t100\nchr1\t10\t20\nchr1\t0\t5\n")
+
+        self.output = self.test_dir / "output.xml"
+        self.batch_script = self.test_dir / "snapshots.txt"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_app_batch_script_shards(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--batch-regions",
+                str(self.bed),
+                "--batch-script",
+                str(self.batch_script),
+                "--batch-shards",
+                "2",
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code == 0
+        assert self.output.exists()
+
+        shard_1 = (self.test_dir / "snapshots_1.txt").read_text()
+        shard_2 = (self.test_dir / "snapshots_2.txt").read_text()
+        assert "goto chr1:1-5\n" in shard_1
+        assert "goto chr1:11-20\n" in shard_1
+        assert "goto chr2:1-100\n" in shard_2
+
+    def test_app_batch_script_skip_unchanged(self):
+        arguments = ["--file", str(self.input_bam), "--batch-regions", str(self.bed)]
+        arguments += ["--batch-script", str(self.batch_script), "--batch-shards", "2"]
+        arguments += ["--output", str(self.output), "--skip-unchanged"]
+
+        result = self.runner.invoke(app, arguments)
+        assert result.exit_code == 0, result.output
+        shard = self.test_dir / "snapshots_1.txt"
+        inode = shard.stat().st_ino
+
+        result = self.runner.invoke(app, arguments)
+        assert result.exit_code == 0, result.output
+        assert shard.stat().st_ino == inode
+
+    def test_app_batch_script_same_region(self):
+        # Duplicate intervals split over shards get different snapshot names
+        self.bed.write_text("chr1\t10\t20\nchr1\t10\t20\n")
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--batch-regions",
+                str(self.bed),
+                "--batch-script",
+                str(self.batch_script),
+                "--batch-shards",
+                "2",
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code == 0
+        assert "snapshot chr1_11_20.png\n" in (self.test_dir / "snapshots_1.txt").read_text()
+        assert "snapshot chr1_11_20_2.png\n" in (self.test_dir / "snapshots_2.txt").read_text()
+
+    def test_app_batch_script_relative_paths(self):
+        # The session uses relative paths, the batch script absolute paths
+        self.output = self.test_dir / "sessions" / "output.xml"
+        self.output.parent.mkdir()
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--batch-regions",
+                str(self.bed),
+                "--batch-script",
+                str(self.batch_script),
+                "--use-relative-paths",
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert '<Resource path="../input.bam"/>' in self.output.read_text()
+        script = self.batch_script.read_text()
+        assert f"load {self.input_bam.absolute()} " in script
+        assert "../input.bam" not in script
+
+    def test_app_batch_script_requires_regions(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--batch-script",
+                str(self.batch_script),
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code != 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.catalog import Catalog, inspect_file
+from sessionizer.main import app
+from tests.test_headers import SAM_HEADER, write_bam
+
+VCF_HEADER = (
+    "##fileformat=VCFv4.2\n"
+    "##contig=<ID=chr1,length=248956422>\n"
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tsample1\tsample2\n"
+    "chr1\t100\t.\tA\tC\t.\t.\t.\tGT\t0/1\t0/0\n"
+)
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.data_dir = self.test_dir / "data"
+        (self.data_dir / "nested").mkdir(parents=True)
+
+        self.bam = self.data_dir / "sample1.bam"
+        write_bam(self.bam, SAM_HEADER, [("chr1", 1000), ("chr2", 500)])
+        self.bam.with_name("sample1.bam.bai").write_bytes(b"BAI\1")
+
+        self.vcf = self.data_dir / "nested" / "cohort.vcf"
+        self.vcf.write_text(VCF_HEADER)
+
+        self.gtf = self.data_dir / "genes.gtf"
+        self.gtf.write_text("")
+
+        self.catalog = Catalog(self.test_dir / "catalog.sqlite")
+
+    def tearDown(self):
+        self.catalog.close()
+        self.temp_dir.cleanup()
+
+    def test_inspect_file(self):
+        assert inspect_file(self.bam) == (["sample1"], None)
+        assert inspect_file(self.vcf) == (["sample1", "sample2"], "hg38")
+
+    def test_inspect_corrupt_file(self):
+        corrupt = self.data_dir / "corrupt.bam"
+        corrupt.write_text("not a bam")
+        assert inspect_file(corrupt) == ([], None)
+
+    def test_query(self):
+        counts = self.catalog.scan([self.data_dir])
+        assert counts["added"] == 3
+
+        assert self.catalog.query(sample="sample1") == [
+            self.vcf.absolute(),
+            self.bam.absolute(),
+        ]
+        assert self.catalog.query(sample="sample2") == [self.vcf.absolute()]
+        assert self.catalog.query(file_types=["gtf"]) == [self.gtf.absolute()]
+        assert self.catalog.query(sample="sample1", file_types=["alignment"]) == [
+            self.bam.absolute()
+        ]
+        assert self.catalog.query(genome="hg38") == [
+            self.gtf.absolute(),
+            self.vcf.absolute(),
+            self.bam.absolute(),
+        ]
+        assert self.catalog.query(genome="hg19") == [
+            self.gtf.absolute(),
+            self.bam.absolute(),
+        ]
+
+        has_index = dict(
+            self.catalog.connection.execute("SELECT path, has_index FROM files")
+        )
+        assert has_index[str(self.bam.absolute())] == 1
+        assert has_index[str(self.vcf.absolute())] == 0
+
+    def test_index_added(self):
+        vcf_gz = self.data_dir / "cohort.vcf.gz"
+        vcf_gz.write_text("")
+        self.catalog.scan([self.data_dir])
+        assert vcf_gz.absolute() not in self.catalog.query(indexed=True)
+        assert self.bam.absolute() in self.catalog.query(indexed=True)
+        assert self.gtf.absolute() in self.catalog.query(indexed=True)
+
+        # An index created after the data file is picked up by the next scan
+        vcf_gz.with_name("cohort.vcf.gz.tbi").write_text("")
+        counts = self.catalog.scan([self.data_dir])
+        assert counts["updated"] == 1
+        assert vcf_gz.absolute() in self.catalog.query(indexed=True)
+
+    def test_incremental_scan(self):
+        self.catalog.scan([self.data_dir])
+
+        counts = self.catalog.scan([self.data_dir])
+        assert counts == {"added": 0, "updated": 0, "removed": 0, "unchanged": 3}
+
+        # Change the samples of the VCF file
+        self.vcf.write_text(VCF_HEADER.replace("sample2", "sample3"))
+        stat = self.vcf.stat()
+        os.utime(self.vcf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.gtf.unlink()
+
+        counts = self.catalog.scan([self.data_dir])
+        assert counts == {"added": 0, "updated": 1, "removed": 1, "unchanged": 1}
+        assert self.catalog.query(sample="sample2") == []
+        assert self.catalog.query(sample="sample3") == [self.vcf.absolute()]
+
+    def test_removed_directory(self):
+        self.catalog.scan([self.data_dir])
+
+        self.vcf.unlink()
+        (self.data_dir / "nested").rmdir()
+
+        counts = self.catalog.scan([self.data_dir])
+        assert counts["removed"] == 1
+        assert self.catalog.query(sample="sample2") == []
+
+    def test_sibling_directory(self):
+        # _ in the scanned directory must not match other characters
+        scanned = self.test_dir / "run_1"
+        sibling = self.test_dir / "runX1"
+        for directory in [scanned, sibling / "nested"]:
+            directory.mkdir(parents=True)
+            (directory / "sample.gtf").write_text("")
+        self.catalog.scan([scanned, sibling])
+
+        counts = self.catalog.scan([scanned])
+        assert counts["removed"] == 0
+        assert len(self.catalog.query(file_types=["gtf"])) == 2
+
+
+class TestAppCatalog(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.bam = self.test_dir / "sample1.bam"
+        write_bam(self.bam, SAM_HEADER, [("chr1", 1000), ("chr2", 500)])
+        self.vcf = self.test_dir / "cohort.vcf"
+        self.vcf.write_text(VCF_HEADER)
+
+        self.db = self.test_dir / "catalog.sqlite"
+        self.output = self.test_dir / "output.xml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_catalog_session(self):
+        result = self.runner.invoke(
+            app, ["catalog", str(self.test_dir), "--db", str(self.db)]
+        )
+        assert result.exit_code == 0
+        assert "2 added" in result.output
+
+        result = self.runner.invoke(
+            app,
+            [
+                "--catalog",
+                str(self.db),
+                "--catalog-sample",
+                "sample2",
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code == 0
+        xml = self.output.read_text()
+        assert "cohort.vcf" in xml
+        assert "sample1.bam" not in xml
+
+    def test_missing_input_files(self):
+        result = self.runner.invoke(app, ["--output", str(self.output)])
+        assert result.exit_code != 0
@@ -0,0 +1,86 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.contigs import check_contigs, find_contig_mismatches
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from tests.test_headers import SAM_HEADER, write_bam
+
+
+class TestContigs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+        self.bam = self.test_dir / "input.bam"
+        write_bam(self.bam, SAM_HEADER, [("chr1", 1000), ("chr2", 500)])
+
+        self.vcf = self.test_dir / "input.vcf"
+        self.vcf.write_text("##contig=<ID=1>\n##contig=<ID=2>\n#CHROM\n")
+
+        self.genome = self.test_dir / "genome.fasta"
+        self.genome.write_text(">chr1\nACGT\n>chr2\nACGT\n")
+        self.genome.with_name("genome.fasta.fai").write_text(
+            "chr1\t4\t6\t4\t5\nchr2\t4\t17\t4\t5\n"
+        )
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_find_contig_mismatches_registry_genome(self):
+        problems = find_contig_mismatches(
+            {Path("a.bam"): ["chr1", "chr2"], Path("b.vcf"): ["1", "2", "chrM"]},
+            GENOME.HG38,
+            None,
+        )
+        assert len(problems) == 1
+        assert problems[0].startswith("b.vcf: 2 of 3 contigs")
+        assert "1 instead of chr1" in problems[0]
+
+    def test_check_contigs_custom_genome(self):
+        problems = check_contigs([self.bam, self.vcf], GENOME.CUSTOM, self.genome)
+        assert len(problems) == 1
+        assert problems[0].startswith(f"{self.vcf}: 2 of 2 contigs are not in the genome")
+
+        # Results are cached by file signature
+        assert (self.test_dir / "cache" / "contigs.json").exists()
+        assert check_contigs([self.bam], GENOME.CUSTOM, self.genome) == []
+
+    def test_check_contigs_missing_index(self):
+        self.genome.with_name("genome.fasta.fai").unlink()
+        problems = check_contigs([self.bam], GENOME.CUSTOM, self.genome)
+        assert len(problems) == 1
+        assert "genome.fasta.fai is missing" in problems[0]
+
+    def test_app_check_contigs(self):
+        runner = CliRunner()
+        output = self.test_dir / "output.xml"
+
+        result = runner.invoke(
+            app,
+            ["--file", str(self.bam), "--check-contigs", "--output", str(output)],
+        )
+        assert result.exit_code == 0
+
+        mismatch_output = self.test_dir / "mismatch.xml"
+        result = runner.invoke(
+            app,
+            ["--file", str(self.vcf), "--check-contigs", "--output", str(mismatch_output)],
+        )
+        assert result.exit_code != 0
+        assert not mismatch_output.exists()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import gzip
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.coverage import (
+    get_bai_window_sizes,
+    get_crai_window_sizes,
+    write_index_coverage,
+)
+from sessionizer.indexes import BaiReference
+from sessionizer.main import app
+from tests.test_headers import SAM_HEADER, write_bam, write_cram
+from tests.test_indexes import write_bai
+
+
+class TestCoverage(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+        self.bam = self.test_dir / "sample.bam"
+        write_bam(self.bam, SAM_HEADER, [("chr1", 40000), ("chr2", 20000)])
+        write_bai(
+            self.test_dir / "sample.bam.bai",
+            [
+                (
+                    {4681: [(0, 100 << 16)], 4682: [(100 << 16, 300 << 16)]},
+                    [0, 100 << 16],
+                    10,
+                    0,
+                ),
+                ({}, [], 0, 0),
+            ],
+        )
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_window_sizes(self):
+        # Bin 585 covers 8 windows, spread over the 2 windows of the reference
+        reference = BaiReference(
+            bins={585: [(0, 10)], 4682: [(0, 4)]}, intervals=[0, 0]
+        )
+        assert get_bai_window_sizes(reference, 4) == [5.0, 9.0]
+
+        slices = [(0, 1, 20000, 1000), (1, 1, 100, 50), (-1, 0, 0, 10)]
+        sizes = get_crai_window_sizes(slices, 0, 2)
+        assert sizes == [1000 * 16384 / 20000, 1000 * 3616 / 20000]
+
+    def test_write(self):
+        coverage_file = write_index_coverage(self.bam)
+        assert coverage_file.read_text() == (
+            "track type=bedGraph\n"
+            "chr1\t0\t16384\t0.67\n"
+            "chr1\t16384\t32768\t1.33\n"
+        )
+
+        # Cached until the file or index changes
+        coverage_file.write_text("cached")
+        assert write_index_coverage(self.bam).read_text() == "cached"
+        os.utime(self.test_dir / "sample.bam.bai", ns=(0, 0))
+        assert write_index_coverage(self.bam).read_text() != "cached"
+
+        cram = self.test_dir / "sample.cram"
+        write_cram(cram, SAM_HEADER)
+        with gzip.open(self.test_dir / "sample.cram.crai", "wt") as f:
+            f.write("0\t1\t500\t0\t0\t100\n1\t101\t100\t0\t0\t300\n")
+        assert write_index_coverage(cram).read_text() == (
+            "track type=bedGraph\nchr1\t0\t1000\t0.5\nchr2\t0\t500\t1.5\n"
+        )
+
+        assert write_index_coverage(self.test_dir / "other.bam") is None
+
+    def test_app_index_coverage(self):
+        output = self.test_dir / "session.xml"
+        result = self.runner.invoke(
+            app,
+            ["--output", str(output), "--file", str(self.bam), "--index-coverage"],
+        )
+        assert result.exit_code == 0, result.output
+
+        session = output.read_text()
+        assert 'name="sample.bam index coverage"' in session
+        assert session.index("index coverage") < session.index('name="sample.bam"')
+
+        # The session references a copy of the cached profile next to it
+        coverage_files = list((self.test_dir / "session_coverage").iterdir())
+        assert len(coverage_files) == 1
+        assert f'path="{coverage_files[0]}"' in session
+        assert str(self.test_dir / "cache") not in session
+
+        result = self.runner.invoke(
+            app,
+            [
+                "--output",
+                str(output),
+                "--file",
+                str(self.bam),
+                "--index-coverage",
+                "--use-relative-paths",
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert f'path="session_coverage/{coverage_files[0].name}"' in output.read_text()
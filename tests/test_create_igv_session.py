@@ -1,10 +1,17 @@
+import json
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from sessionizer.colors import RGBColorOption
-from sessionizer.create_igv_session import generate_igv_session
+from sessionizer.create_igv_session import (
+    DEFAULT_TRACK_OPTIONS,
+    create_tracks,
+    generate_igv_session,
+    write_session_json,
+)
 from sessionizer.genomes import GENOME
+from sessionizer.regions import Region
 from sessionizer.track_elements import (
     AlignmentColorByOption,
     AlignmentDisplayModeOption,
@@ -234,5 +241,100 @@ class TestCreateIgvSession(unittest.TestCase):
         )
 
 
+class TestSessionJson(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write_session_json(self):
+        options = {
+            **DEFAULT_TRACK_OPTIONS,
+            "bam_color_by": [AlignmentColorByOption.TAG],
+            "bam_color_by_tag": ["HP"],
+            "bam_group_by": [AlignmentGroupByOption.READ_GROUP],
+            "bw_auto_scale": [False],
+            "bw_color": [RGBColorOption.RED],
+        }
+        files = ["a.bam", "b.bw", "c.vcf.gz", "d.gtf", "e.bed"]
+        tracks = create_tracks(files=[Path(f) for f in files], **options)
+        output = self.test_dir / "session.json"
+        write_session_json(
+            output,
+            GENOME.HG38,
+            Path(""),
+            tracks,
+            locus="chr1:1-100",
+            regions=[Region("chr1", 11, 20, "peak")],
+        )
+        session = json.loads(output.read_text())
+
+        assert session["genome"] == "hg38"
+        assert session["locus"] == "chr1:1-100"
+        assert session["tracks"] == [
+            {
+                "name": "a.bam",
+                "url": "a.bam",
+                "indexURL": "a.bam.bai",
+                "type": "alignment",
+                "format": "bam",
+                "displayMode": "SQUISHED",
+                "showCoverage": False,
+                "showJunctions": False,
+                "colorBy": {"type": "tag", "tag": "HP"},
+                "groupBy": "readGroup",
+            },
+            {
+                "name": "b.bw",
+                "url": "b.bw",
+                "type": "wig",
+                "format": "bigwig",
+                "color": "rgb(255,0,0)",
+                "graphType": "bar",
+                "autoscale": False,
+                "min": 0,
+                "max": 10,
+            },
+            {
+                "name": "c.vcf.gz",
+                "url": "c.vcf.gz",
+                "indexURL": "c.vcf.gz.tbi",
+                "type": "variant",
+                "format": "vcf",
+                "showGenotypes": False,
+                "visibilityWindow": 1000000,
+            },
+            {
+                "name": "d.gtf",
+                "url": "d.gtf",
+                "type": "annotation",
+                "format": "gtf",
+                "displayMode": "COLLAPSED",
+            },
+            {"name": "e.bed", "url": "e.bed"},
+        ]
+        assert session["roi"] == [
+            {
+                "name": "Regions of interest",
+                "features": [{"chr": "chr1", "start": 10, "end": 20, "name": "peak"}],
+            }
+        ]
+
+    def test_custom_genome(self):
+        output = self.test_dir / "session.json"
+        write_session_json(output, GENOME.CUSTOM, Path("ref/genome.fasta"), [])
+        assert json.loads(output.read_text()) == {
+            "genome": {
+                "id": "genome.fasta",
+                "name": "genome.fasta",
+                "fastaURL": "ref/genome.fasta",
+                "indexURL": "ref/genome.fasta.fai",
+            },
+            "tracks": [],
+        }
+
+
 if __name__ == "__main__":
     unittest.main()
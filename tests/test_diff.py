@@ -0,0 +1,99 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.colors import RGBColorOption
+from sessionizer.create_igv_session import write_session_xml
+from sessionizer.diff import diff_directories, diff_sessions, format_summary
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from sessionizer.regions import Region
+from sessionizer.track_elements import (
+    BigWigPlotTypeOption,
+    BigWigRangeOption,
+    BigWigTrack,
+    DataTrack,
+)
+
+
+def bigwig_track(path: str, maximum: float) -> BigWigTrack:
+    return BigWigTrack(
+        name=path,
+        path=Path(path),
+        height=0,
+        plot_type=BigWigPlotTypeOption.NONE,
+        range=BigWigRangeOption(0, 0, maximum),
+        color=RGBColorOption.NONE,
+        negative_color=RGBColorOption.NONE,
+        autoscale=False,
+    )
+
+
+class TestDiff(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        self.old_dir = self.test_dir / "old"
+        self.new_dir = self.test_dir / "new"
+        self.old_dir.mkdir()
+        self.new_dir.mkdir()
+
+        write_session_xml(
+            self.old_dir / "a.xml",
+            GENOME.HG38,
+            Path(""),
+            [bigwig_track("a.bw", 10), DataTrack(name="b", path=Path("b.bed"), height=0)],
+            locus="chr1:1-100",
+        )
+        write_session_xml(
+            self.new_dir / "a.xml",
+            GENOME.HG38,
+            Path(""),
+            [bigwig_track("a.bw", 20), DataTrack(name="c", path=Path("c.bed"), height=0)],
+            locus="chr1:1-200",
+            regions=[Region("chr1", 1, 10, "")],
+        )
+        for directory in [self.old_dir, self.new_dir]:
+            write_session_xml(directory / "same.xml", GENOME.HG38, Path(""), [])
+        write_session_xml(self.new_dir / "new.xml", GENOME.HG38, Path(""), [])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_diff_sessions(self):
+        diff = diff_sessions(self.old_dir / "a.xml", self.new_dir / "a.xml")
+        assert diff.attributes == {"locus": ("chr1:1-100", "chr1:1-200")}
+        assert diff.added_resources == ["c.bed"]
+        assert diff.removed_resources == ["b.bed"]
+        assert diff.added_tracks == ["c.bed"]
+        assert diff.removed_tracks == ["b.bed"]
+        assert diff.changed_tracks == {"a.bw": {"DataRange.maximum": ("10", "20")}}
+        assert diff.added_regions == 1
+
+        assert not diff_sessions(self.old_dir / "same.xml", self.new_dir / "same.xml")
+
+    def test_diff_directories(self):
+        diffs, added, removed = diff_directories(self.old_dir, self.new_dir, threads=2)
+        assert sorted(diffs) == ["a.xml", "same.xml"]
+        assert added == ["new.xml"]
+        assert removed == []
+        assert format_summary(diffs, added, removed) == [
+            "Sessions: 2 compared, 1 unchanged, 1 changed, 1 added, 0 removed",
+            "Tracks: 1 added, 1 removed, 1 changed",
+        ]
+
+    def test_app_diff(self):
+        result = self.runner.invoke(
+            app, ["diff", str(self.old_dir / "same.xml"), str(self.new_dir / "same.xml")]
+        )
+        assert result.exit_code == 0
+        assert result.output == ""
+
+        result = self.runner.invoke(
+            app, ["diff", str(self.old_dir), str(self.new_dir), "--summary"]
+        )
+        assert result.exit_code == 1
+        assert result.output.startswith("Sessions: 2 compared")
@@ -0,0 +1,96 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.discovery import discover_files, read_files_from, split_glob
+from sessionizer.main import app
+from sessionizer.remote import RemotePath
+
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        # Files in nested directories, with files of unknown types
+        self.data_dir = self.test_dir / "data"
+        for name in ["b.bam", "a.vcf.gz", "notes.txt", "x/c.bw", "x/y/d.bam"]:
+            path = self.data_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("test content")
+
+        self.output = self.test_dir / "output.xml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def discover(self, *values):
+        return [str(path) for path in discover_files(values)]
+
+    def test_directory(self):
+        data = str(self.data_dir)
+        assert self.discover(data) == [
+            f"{data}/a.vcf.gz",
+            f"{data}/b.bam",
+            f"{data}/x/c.bw",
+            f"{data}/x/y/d.bam",
+        ]
+
+    def test_glob(self):
+        data = str(self.data_dir)
+        assert self.discover(f"{data}/*.bam") == [f"{data}/b.bam"]
+        assert self.discover(f"{data}/*/*") == [f"{data}/x/c.bw"]
+        assert self.discover(f"{data}/**/*.bam") == [
+            f"{data}/b.bam",
+            f"{data}/x/y/d.bam",
+        ]
+        assert split_glob("data/x/**/*.bam") == ("data/x", None)
+        assert split_glob("/data/*/*.bam") == ("/data", 2)
+
+    def test_duplicates(self):
+        data = str(self.data_dir)
+        os.symlink(self.data_dir / "b.bam", self.data_dir / "x" / "link.bam")
+        os.link(self.data_dir / "a.vcf.gz", self.data_dir / "x" / "hard.vcf.gz")
+        assert self.discover(data, f"{data}/x") == [
+            f"{data}/a.vcf.gz",
+            f"{data}/b.bam",
+            f"{data}/x/c.bw",
+            f"{data}/x/y/d.bam",
+        ]
+
+        # Files and URLs given explicitly are kept, also when repeated
+        url = "https://example.org/sample.bam"
+        files = list(discover_files([f"{data}/b.bam", f"{data}/b.bam", url, data]))
+        assert files[:3] == [Path(f"{data}/b.bam")] * 2 + [RemotePath(url)]
+        assert len(files) == 6
+
+        missing = str(self.test_dir / "missing.bam")
+        assert self.discover(missing) == [missing]
+
+    def test_files_from(self):
+        files_from = self.test_dir / "files.txt"
+        files_from.write_text(f"{self.data_dir}/b.bam\n\n{self.data_dir}/x\n")
+        assert list(read_files_from(files_from)) == [
+            f"{self.data_dir}/b.bam",
+            f"{self.data_dir}/x",
+        ]
+
+        result = self.runner.invoke(
+            app, ["--files-from", str(files_from), "--output", str(self.output)]
+        )
+        assert result.exit_code == 0, result.output
+        session = self.output.read_text()
+        assert all(name in session for name in ["b.bam", "c.bw", "d.bam"])
+        assert "a.vcf.gz" not in session
+
+        result = self.runner.invoke(
+            app,
+            ["--files-from", "-", "--output", str(self.output)],
+            input=f"{self.data_dir}/a.vcf.gz\n",
+        )
+        assert result.exit_code == 0, result.output
+        assert "a.vcf.gz" in self.output.read_text()
@@ -0,0 +1,117 @@
+import gzip
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.create_igv_session import generate_xml
+from sessionizer.fanout import generate_fanout_sessions, read_loci
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from sessionizer.track_elements import DataTrack
+
+
+class TestReadLoci(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_loci_vcf_gz(self):
+        vcf = self.test_dir / "variants.vcf.gz"
+        with gzip.open(vcf, "wt") as f:
+            f.write("##fileformat=VCFv4.2\n")
+            f.write("#CHROM\tPOS\tID\tREF\tALT\n")
+            f.write("chr1\t100\t.\tA\tT\n")
+            f.write("chr2\t2000\t.\tG\tC\n")
+
+        loci = list(read_loci(vcf))
+        assert loci == [("chr1:100", "chr1_100"), ("chr2:2000", "chr2_2000")]
+
+    def test_read_loci_same_position(self):
+        # Multi-allelic records and duplicate intervals get unique stems
+        vcf = self.test_dir / "variants.vcf"
+        vcf.write_text(
+            "#CHROM\tPOS\tID\tREF\tALT\n"
+            "chr1\t100\t.\tA\tT\n"
+            "chr1\t100\t.\tA\tG\n"
+            "chr1\t100\t.\tA\tC\n"
+        )
+        assert [stem for _, stem in read_loci(vcf)] == [
+            "chr1_100",
+            "chr1_100_2",
+            "chr1_100_3",
+        ]
+
+    def test_read_loci_bed(self):
+        bed = self.test_dir / "regions.bed"
+        bed.write_text("track name=test\nchr1\t99\t200\n")
+
+        loci = list(read_loci(bed))
+        assert loci == [("chr1:100-200", "chr1_100_200")]
+
+
+class TestGenerateFanoutSessions(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        self.output_dir = self.test_dir / "sessions"
+
+        self.tracks = [DataTrack(name="test", path=Path("/data/test.bed"), height=0)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_sessions_match_generate_xml(self):
+        loci = [(f"chr1:{i}", f"chr1_{i}") for i in range(1, 2500)]
+
+        n_written = generate_fanout_sessions(
+            GENOME.HG38, Path(""), self.tracks, iter(loci), self.output_dir, threads=4
+        )
+
+        assert n_written == len(loci)
+        assert len(list(self.output_dir.iterdir())) == len(loci)
+        expected = generate_xml(GENOME.HG38, Path(""), self.tracks, locus="chr1:42")
+        assert (self.output_dir / "chr1_42.xml").read_text() == expected
+
+
+class TestAppFanout(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.input_bam = self.test_dir / "input.bam"
+        self.input_bam.write_text("test content")
+
+        self.bed = self.test_dir / "regions.bed"
+        self.bed.write_text("chr1\t0\t100\nchr2\t10\t20\n")
+
+        self.output_dir = self.test_dir / "sessions"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_app_fanout(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--fanout-loci",
+                str(self.bed),
+                "--output",
+                str(self.output_dir),
+            ],
+        )
+        assert result.exit_code == 0
+        assert 'locus="chr2:11-20"' in (self.output_dir / "chr2_11_20.xml").read_text()
+        assert 'locus="chr1:1-100"' in (self.output_dir / "chr1_1_100.xml").read_text()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import gzip
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.gene_index import (
+    GeneIndex,
+    build_gene_index,
+    get_gene_index,
+    resolve_locus,
+)
+from sessionizer.main import app
+from sessionizer.regions import Region
+
+GTF_LINES = [
+    'chr17\tHAVANA\tgene\t43044295\t43125483\t.\t-\t.\tgene_id "ENSG00000012048.23"; gene_name "BRCA1";',
+    'chr17\tHAVANA\texon\t43044295\t43045802\t.\t-\t.\tgene_id "ENSG00000012048.23"; transcript_id "ENST00000357654.9"; gene_name "BRCA1";',
+    'chr13\tHAVANA\tgene\t32315508\t32400268\t.\t+\t.\tgene_id "ENSG00000139618.16"; gene_name "BRCA2";',
+    'chr17_KI270909v1_alt\tHAVANA\tgene\t100\t200\t.\t+\t.\tgene_id "ENSG00000012048.23"; gene_name "BRCA1";',
+]
+
+REFGENE_LINES = [
+    "585\tNM_007294\tchr17\t-\t43044294\t43125483\t43045677\t43124096\t23\t.\t.\t0\tBRCA1\tcmpl\tcmpl\t.",
+]
+
+
+class TestGeneIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.gtf = self.test_dir / "genes.gtf.gz"
+        with gzip.open(self.gtf, "wt") as f:
+            f.write("\n".join(GTF_LINES) + "\n")
+
+        self.refgene = self.test_dir / "refGene.txt"
+        self.refgene.write_text("\n".join(REFGENE_LINES) + "\n")
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_lookup_gtf(self):
+        index = GeneIndex(build_gene_index(self.gtf, self.test_dir / "genes.idx"))
+
+        assert index.lookup("brca1") == Region("chr17", 43044295, 43125483, "brca1")
+        assert index.lookup("ENSG00000139618").chrom == "chr13"
+        assert index.lookup("ENSG00000139618.16").chrom == "chr13"
+        assert index.lookup("enst00000357654.9").end == 43045802
+        assert index.lookup("BRCA3") is None
+        regions = index.lookup_many(["BRCA2", "BRCA1"])
+        assert [region.chrom for region in regions] == ["chr13", "chr17"]
+
+    def test_lookup_refgene(self):
+        index = GeneIndex(build_gene_index(self.refgene, self.test_dir / "genes.idx"))
+
+        assert index.lookup("BRCA1") == Region("chr17", 43044295, 43125483, "BRCA1")
+        assert index.lookup("NM_007294").chrom == "chr17"
+
+    def test_get_gene_index_rebuilds_on_change(self):
+        assert get_gene_index(self.refgene).lookup("BRCA2") is None
+
+        self.refgene.write_text(self.refgene.read_text().replace("BRCA1", "BRCA2"))
+        os.utime(self.refgene, ns=(0, 0))
+        assert get_gene_index(self.refgene).lookup("BRCA2") is not None
+
+    def test_resolve_locus(self):
+        assert resolve_locus("chr1:100-200", self.gtf) == "chr1:100-200"
+        assert resolve_locus("BRCA1", None) == "BRCA1"
+        assert resolve_locus("BRCA2", self.gtf) == "chr13:32315508-32400268"
+
+        # Contig names and other loci not found as genes are kept for IGV
+        assert resolve_locus("chr1", self.gtf) == "chr1"
+        assert resolve_locus("BRCA3", self.gtf) == "BRCA3"
+        assert resolve_locus("chr1:100-200 BRCA2 chrX", self.gtf) == (
+            "chr1:100-200 chr13:32315508-32400268 chrX"
+        )
+
+
+class TestAppLocus(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.input_bam = self.test_dir / "input.bam"
+        self.input_bam.write_text("test content")
+
+        self.refgene = self.test_dir / "refGene.txt"
+        self.refgene.write_text("\n".join(REFGENE_LINES) + "\n")
+
+        self.output = self.test_dir / "output.xml"
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_app_locus_gene(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--locus",
+                "brca1",
+                "--gene-annotation",
+                str(self.refgene),
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code == 0
+        assert 'locus="chr17:43044295-43125483"' in self.output.read_text()
+
+
+if __name__ == "__main__":
+    unittest.main()
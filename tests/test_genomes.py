@@ -0,0 +1,117 @@
+import json
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.create_igv_session import generate_xml
+from sessionizer.genomes import GENOME, get_genome, list_genomes, load_registry
+from sessionizer.main import app
+
+
+class TestGenomeRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        # Local mirror of the hg38 gene track
+        self.mirror = self.test_dir / "ncbiRefSeq.txt.gz"
+        self.mirror.touch()
+
+        self.registry_file = self.test_dir / "genomes.json"
+        self.registry_file.write_text(
+            json.dumps(
+                {
+                    "hg38": {
+                        "mirrors": {
+                            "https://hgdownload.soe.ucsc.edu/goldenPath/hg38/database/ncbiRefSeq.txt.gz": str(
+                                self.mirror
+                            )
+                        }
+                    },
+                    "mm39": {"igv_name": "mm39", "gene_tracks": ["mm39_genes"]},
+                }
+            )
+        )
+
+        self.env = patch.dict(
+            os.environ,
+            {
+                "SESSIONIZER_GENOMES": str(self.registry_file),
+                "XDG_CONFIG_HOME": str(self.test_dir / "config"),
+            },
+        )
+        self.env.start()
+        self.clear_cache()
+
+    def tearDown(self):
+        self.env.stop()
+        self.clear_cache()
+        self.temp_dir.cleanup()
+
+    def clear_cache(self):
+        load_registry.cache_clear()
+        get_genome.cache_clear()
+
+    def test_packaged_genomes(self):
+        assert GENOME.T2T.get_igv_name() == "chm13v2.0"
+        assert GENOME.CUSTOM.get_igv_name() == "custom"
+        assert get_genome("hg38").chromosome_aliases["MT"] == "chrM"
+        assert {"hg19", "hg38", "t2t", "mm39", "custom"} <= set(list_genomes())
+
+    def test_user_genome(self):
+        xml_str = generate_xml("mm39", Path(""), [])
+        assert 'genome="mm39"' in xml_str
+        assert 'id="mm39_genes"' in xml_str
+
+        self.assertRaises(ValueError, get_genome, "unknown")
+
+    def test_local_mirror_preferred(self):
+        assert get_genome("hg38").igv_name == "hg38"
+        assert get_genome("hg38").resolve_gene_tracks() == [str(self.mirror)]
+
+        self.mirror.unlink()
+        assert get_genome("hg38").resolve_gene_tracks()[0].startswith("https://")
+
+    def test_local_mirror_resource(self):
+        # The mirror is loaded as a resource and referenced by the gene track
+        xml_str = generate_xml(GENOME.HG38, Path(""), [])
+        assert f'<Resource path="{self.mirror}"' in xml_str
+        assert f'id="{self.mirror}"' in xml_str
+
+        # Without the mirror on this host the session uses the remote URL as a
+        # track id only, so IGV does not download the whole file as a resource
+        self.mirror.unlink()
+        xml_str = generate_xml(GENOME.HG38, Path(""), [])
+        url = "https://hgdownload.soe.ucsc.edu/goldenPath/hg38/database/ncbiRefSeq.txt.gz"
+        assert f'<Resource path="{url}"' not in xml_str
+        assert f'id="{url}"' in xml_str
+
+        # Gene tracks of the IGV genome are not resources
+        assert "<Resource " not in generate_xml("mm39", Path(""), [])
+
+    def test_app_genome(self):
+        runner = CliRunner()
+        input_bam = self.test_dir / "input.bam"
+        input_bam.write_text("test content")
+        output = self.test_dir / "output.xml"
+
+        result = runner.invoke(
+            app,
+            ["--file", str(input_bam), "--genome", "mm39", "--output", str(output)],
+        )
+        assert result.exit_code == 0
+        assert 'genome="mm39"' in output.read_text()
+
+        result = runner.invoke(
+            app,
+            ["--file", str(input_bam), "--genome", "unknown", "--output", str(output)],
+        )
+        assert result.exit_code != 0
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import gzip
+import struct
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sessionizer.headers import (
+    parse_sam_header,
+    read_bam_header,
+    read_bigwig_chromosomes,
+    read_cram_header,
+    read_tabix_names,
+    read_vcf_contigs,
+)
+from sessionizer.regions import Region
+from sessionizer.tabix import write_indexed_bed
+
+SAM_HEADER = "@HD\tVN:1.6\n@SQ\tSN:chr1\tLN:1000\tM5:abc\n@SQ\tSN:chr2\tLN:500\n@RG\tID:1\tSM:sample1\n"
+
+
+def itf8(value: int) -> bytes:
+    if value < 0x80:
+        return bytes([value])
+    return bytes([0x80 | (value >> 8), value & 0xFF])
+
+
+def write_bam(path: Path, text: str, references):
+    data = b"BAM\1" + struct.pack("<i", len(text)) + text.encode()
+    data += struct.pack("<i", len(references))
+    for name, length in references:
+        data += struct.pack("<i", len(name) + 1) + name.encode() + b"\0"
+        data += struct.pack("<i", length)
+    with gzip.open(path, "wb") as f:
+        f.write(data)
+
+
+def write_cram(path: Path, text: str):
+    block_data = gzip.compress(struct.pack("<i", len(text)) + text.encode())
+    container = struct.pack("<i", 0) + itf8(0) * 4 + bytes([0, 0]) + itf8(1) + itf8(0)
+    container += b"\0" * 4  # CRC32
+    block = bytes([1, 0]) + itf8(0) + itf8(len(block_data)) + itf8(len(text) + 4)
+    with open(path, "wb") as f:
+        f.write(b"CRAM" + bytes([3, 0]) + b"\0" * 20 + container + block + block_data)
+
+
+def write_bigwig(path: Path, chromosomes):
+    key_size = max(len(name) for name, _ in chromosomes)
+    header = struct.pack("<IHHQ", 0x888FFC26, 4, 0, 64).ljust(64, b"\0")
+    tree = struct.pack("<IIIIQQ", 0x78CA8C91, 256, key_size, 8, len(chromosomes), 0)
+    tree += struct.pack("<BBH", 1, 0, len(chromosomes))
+    for i, (name, size) in enumerate(chromosomes):
+        tree += name.encode().ljust(key_size, b"\0") + struct.pack("<II", i, size)
+    path.write_bytes(header + tree)
+
+
+class TestHeaders(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parse_sam_header(self):
+        records = parse_sam_header(SAM_HEADER, "@SQ")
+        assert records == [
+            {"SN": "chr1", "LN": "1000", "M5": "abc"},
+            {"SN": "chr2", "LN": "500"},
+        ]
+
+    def test_read_bam_header(self):
+        bam = self.test_dir / "input.bam"
+        write_bam(bam, SAM_HEADER, [("chr1", 1000), ("chr2", 500)])
+
+        text, references = read_bam_header(bam)
+        assert text == SAM_HEADER
+        assert references == [("chr1", 1000), ("chr2", 500)]
+
+    def test_read_cram_header(self):
+        cram = self.test_dir / "input.cram"
+        write_cram(cram, SAM_HEADER)
+
+        assert read_cram_header(cram) == SAM_HEADER
+
+    def test_read_bigwig_chromosomes(self):
+        bigwig = self.test_dir / "input.bw"
+        write_bigwig(bigwig, [("chr1", 1000), ("chr10", 20)])
+
+        assert read_bigwig_chromosomes(bigwig) == [("chr1", 1000), ("chr10", 20)]
+
+    def test_read_vcf_contigs(self):
+        vcf = self.test_dir / "input.vcf"
+        vcf.write_text(
+            "##fileformat=VCFv4.2\n##contig=<ID=1,length=100>\n##contig=<ID=MT>\n"
+            "#CHROM\tPOS\tID\tREF\tALT\n1\t1\t.\tA\tT\n"
+        )
+        assert read_vcf_contigs(vcf) == ["1", "MT"]
+
+    def test_read_tabix_names(self):
+        bed = self.test_dir / "input.bed.gz"
+        index = write_indexed_bed([Region("chr1", 1, 10), Region("chrX", 1, 10)], bed)
+
+        assert read_tabix_names(index) == ["chr1", "chrX"]
+
+
+if __name__ == "__main__":
+    unittest.main()
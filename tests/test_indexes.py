@@ -0,0 +1,73 @@
+import gzip
+import struct
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sessionizer.indexes import (
+    BAI_PSEUDO_BIN,
+    get_alignment_density,
+    read_bai,
+    read_crai,
+)
+
+
+def write_bai(path: Path, references):
+    # references: list of (bins, intervals, n_mapped, n_unmapped)
+    data = b"BAI\1" + struct.pack("<i", len(references))
+    for bins, intervals, n_mapped, n_unmapped in references:
+        data += struct.pack("<i", len(bins) + 1)
+        for bin_id, chunks in bins.items():
+            data += struct.pack("<Ii", bin_id, len(chunks))
+            for chunk in chunks:
+                data += struct.pack("<QQ", *chunk)
+        data += struct.pack("<Ii", BAI_PSEUDO_BIN, 2)
+        data += struct.pack("<QQQQ", 0, 0, n_mapped, n_unmapped)
+        data += struct.pack(f"<i{len(intervals)}Q", len(intervals), *intervals)
+    path.write_bytes(data)
+
+
+class TestIndexes(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_bai(self):
+        bai = self.test_dir / "input.bam.bai"
+        write_bai(
+            bai,
+            [
+                ({4681: [(0, 1000 << 16)]}, [0, 400 << 16, 400 << 16, 1000 << 16], 50, 2),
+                ({}, [], 0, 0),
+            ],
+        )
+
+        references = read_bai(bai)
+        assert len(references) == 2
+        assert references[0].bins == {4681: [(0, 1000 << 16)]}
+        assert references[0].n_mapped == 50
+        assert references[0].n_unmapped == 2
+        assert references[0].window_sizes() == [400, 600]
+        assert references[1].intervals == []
+
+        # 1000 bytes over two 16 kb windows
+        assert get_alignment_density(self.test_dir / "input.bam") == 1000 / (2 << 14)
+
+    def test_read_crai(self):
+        crai = self.test_dir / "input.cram.crai"
+        with gzip.open(crai, "wt") as f:
+            f.write("0\t1\t1000\t100\t50\t500\n")
+            f.write("0\t1001\t1000\t700\t50\t300\n")
+            f.write("-1\t0\t0\t1100\t50\t400\n")
+
+        assert read_crai(crai)[0] == (0, 1, 1000, 500)
+        assert get_alignment_density(self.test_dir / "input.cram") == 800 / 2000
+
+    def test_not_a_bai(self):
+        bai = self.test_dir / "input.bam.bai"
+        bai.write_bytes(b"CSI\1")
+        with self.assertRaises(ValueError):
+            read_bai(bai)
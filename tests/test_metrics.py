@@ -0,0 +1,189 @@
+import builtins
+import json
+import os
+import pstats
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer import metrics
+from sessionizer.main import app
+from sessionizer.metrics import MetricsCollector, aggregate_metrics, stage
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled(self):
+        assert metrics.active_metrics is None
+        with stage("noop"):
+            pass
+        assert stage("noop") is metrics.NO_STAGE
+
+    def test_collector(self):
+        original_open = builtins.open
+        collector = MetricsCollector()
+        with stage("work"):
+            with open(os.devnull, "wb") as f:
+                f.write(b"metrics")
+        metrics.count("sessions", 3)
+        collector.finish()
+
+        # Nothing is patched while metrics are collected
+        assert builtins.open is original_open
+        assert metrics.active_metrics is None
+        record = collector.metrics.to_dict()
+        if os.path.exists("/proc/self/io"):
+            assert record["syscalls"]["write"] >= 1
+            assert record["bytes_written"] >= len(b"metrics")
+        assert record["counters"] == {"sessions": 3}
+        assert "work" in record["stages"]
+        assert record["peak_memory_mb"] > 0
+
+    def test_aggregate_metrics(self):
+        record = {
+            "total_seconds": 1.0,
+            "stages": {"write session": 0.5},
+            "syscalls": {"stat": 2},
+            "counters": {"sessions": 1},
+            "bytes_written": 100,
+            "peak_memory_mb": 50.0,
+        }
+        total = aggregate_metrics([record, {**record, "peak_memory_mb": 70.0}])
+        assert total["runs"] == 2
+        assert total["stages"] == {"write session": 1.0}
+        assert total["syscalls"] == {"stat": 4}
+        assert total["bytes_written"] == 200
+        assert total["peak_memory_mb"] == 70.0
+
+
+class TestAppMetrics(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.bam = self.test_dir / "input.bam"
+        self.bam.write_text("test content")
+        self.bigwig = self.test_dir / "input.bw"
+        self.bigwig.write_text("test content")
+        self.output = self.test_dir / "output.xml"
+        self.metrics_json = self.test_dir / "metrics.jsonl"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_app(self, *args):
+        return self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.bam),
+                "--file",
+                str(self.bigwig),
+                "--output",
+                str(self.output),
+                *args,
+            ],
+        )
+
+    def test_metrics_json(self):
+        for _ in range(2):
+            result = self.run_app("--metrics-json", str(self.metrics_json))
+            assert result.exit_code == 0
+
+        records = [json.loads(line) for line in self.metrics_json.read_text().splitlines()]
+        assert len(records) == 2
+        record = records[0]
+        assert {"create tracks", "write session", "serialize xml"} <= set(record["stages"])
+        assert record["counters"]["tracks.AlignmentTrack"] == 1
+        assert record["counters"]["tracks.BigWigTrack"] == 1
+        assert record["counters"]["sessions"] == 1
+        assert "parse options" in record["stages"]
+        # Metadata calls of discovery and validation are counted where made
+        assert record["syscalls"]["stat"] >= 4
+        assert record["syscalls"]["access"] >= 2
+
+        result = self.runner.invoke(app, ["metrics", str(self.metrics_json)])
+        assert result.exit_code == 0
+        assert "Runs: 2" in result.output
+        assert "tracks.AlignmentTrack: 2" in result.output
+
+    def test_metadata_calls(self):
+        result = self.run_app(
+            "--metrics-json",
+            str(self.metrics_json),
+            "--generate-symlinks",
+            "--use-relative-paths",
+        )
+        assert result.exit_code == 0, result.output
+        record = json.loads(self.metrics_json.read_text())
+        assert record["syscalls"]["symlink"] == 2
+        assert record["syscalls"]["lstat"] >= 2
+
+    def test_profile(self):
+        profile_output = self.test_dir / "run.prof"
+        result = self.run_app("--profile", "--profile-output", str(profile_output))
+        assert result.exit_code == 0
+        assert "write session" in result.output
+        assert pstats.Stats(str(profile_output)).total_calls > 0
+
+
+class TestAppTrace(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.bam = self.test_dir / "input.bam"
+        self.bam.write_text("test content")
+        self.bam.with_name("input.bam.bai").write_text("test content")
+        self.output = self.test_dir / "output" / "output.xml"
+        self.output.parent.mkdir()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_app(self, trace: Path):
+        return self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.bam),
+                "--output",
+                str(self.output),
+                "--generate-symlinks",
+                "--trace",
+                str(trace),
+            ],
+        )
+
+    def test_chrome_trace(self):
+        trace = self.test_dir / "trace.json"
+        for _ in range(2):
+            assert self.run_app(trace).exit_code == 0
+        assert metrics.active_tracer is None
+
+        # JSON array format without closing bracket
+        text = trace.read_text()
+        assert text.startswith("[\n")
+        events = json.loads(text.rstrip().rstrip(",") + "]")
+        names = [event["name"] for event in events]
+        assert names.count("symlink") == 4
+        assert names.count("index discovery") == 2
+        assert names.count("write session") == 2
+
+        event = events[names.index("write session")]
+        assert event["ph"] == "X"
+        assert event["pid"] == os.getpid()
+        assert event["args"] == {"path": str(self.output)}
+
+    def test_json_lines_trace(self):
+        trace = self.test_dir / "trace.jsonl"
+        assert self.run_app(trace).exit_code == 0
+
+        events = [json.loads(line) for line in trace.read_text().splitlines()]
+        assert {"symlink", "serialize xml", "write session"} <= {e["name"] for e in events}
+        assert all("tid" in event for event in events)
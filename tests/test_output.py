@@ -0,0 +1,69 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.output import OutputWriter
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        self.path = self.test_dir / "session.xml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write(self):
+        with OutputWriter(durable=True) as writer:
+            assert writer.write(self.path, ["<Session>", b"</Session>"])
+            assert writer.directories == {str(self.test_dir)}
+        assert writer.directories == set()
+        assert self.path.read_text() == "<Session></Session>"
+        assert os.listdir(self.test_dir) == ["session.xml"]
+
+    def test_skip_unchanged(self):
+        self.path.write_text("<Session></Session>")
+        inode = self.path.stat().st_ino
+        writer = OutputWriter(skip_unchanged=True)
+
+        assert not writer.write(self.path, ["<Session>", "</Session>"])
+        assert self.path.stat().st_ino == inode
+
+        # Content differing after matching chunks, shorter and longer content
+        for content in [
+            ["<Session>", "<Panel/>"],
+            ["<Session>"],
+            ["<Session>", "</Session>", "\n"],
+        ]:
+            assert writer.write(self.path, content)
+            assert self.path.read_text() == "".join(content)
+
+    def test_failed_write(self):
+        def chunks():
+            yield "<Session>"
+            raise ValueError("failed")
+
+        self.path.write_text("previous")
+        with self.assertRaises(ValueError):
+            OutputWriter().write(self.path, chunks())
+        assert self.path.read_text() == "previous"
+        assert os.listdir(self.test_dir) == ["session.xml"]
+
+    def test_app_skip_unchanged(self):
+        bed = self.test_dir / "a.bed"
+        bed.write_text("chr1\t0\t10\n")
+        arguments = ["--file", str(bed), "--output", str(self.path)]
+        arguments += ["--skip-unchanged", "--fsync"]
+
+        result = CliRunner().invoke(app, arguments)
+        assert result.exit_code == 0, result.output
+        inode = self.path.stat().st_ino
+
+        result = CliRunner().invoke(app, arguments)
+        assert result.exit_code == 0, result.output
+        assert self.path.stat().st_ino == inode
@@ -0,0 +1,123 @@
+import json
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.create_igv_session import DEFAULT_TRACK_OPTIONS, create_tracks
+from sessionizer.main import app
+from sessionizer.presets import apply_preset, compile_preset, get_preset, read_presets
+from sessionizer.track_elements import (
+    AlignmentColorByOption,
+    AlignmentDisplayModeOption,
+)
+
+PRESETS = {
+    "longread": {
+        "alignment": {"bam_display_mode": "expanded", "bam_show_coverage": True},
+        "bigwig": {"bw_ranges": "0,1,20"},
+        "patterns": {"*.hifi.bam": {"bam_color_by": "base_modification"}},
+    }
+}
+
+
+class TestPresets(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+        self.presets = self.test_dir / "presets.json"
+        self.presets.write_text(json.dumps(PRESETS))
+
+        self.files = [
+            self.test_dir / "sample.hifi.bam",
+            self.test_dir / "sample.bam",
+            self.test_dir / "sample.bw",
+        ]
+        for path in self.files:
+            path.write_text("test content")
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_resolve(self):
+        preset = compile_preset("longread", PRESETS["longread"])
+        assert preset.resolve("sample.hifi.bam") == {
+            "bam_display_mode": AlignmentDisplayModeOption.EXPANDED,
+            "bam_show_coverage": True,
+            "bam_color_by": AlignmentColorByOption.BASE_MODIFICATION,
+        }
+        assert preset.resolve("sample.cram") == {
+            "bam_display_mode": AlignmentDisplayModeOption.EXPANDED,
+            "bam_show_coverage": True,
+        }
+        assert preset.resolve("sample.vcf.gz") == {}
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            compile_preset("invalid", {"alignment": {"bw_auto_scale": False}})
+        with self.assertRaises(ValueError):
+            compile_preset("invalid", {"alignment": {"bam_color_by": "unknown"}})
+        with self.assertRaises(ValueError):
+            compile_preset("invalid", {"bed": {}})
+
+    def test_cache(self):
+        presets = read_presets(self.presets)
+        assert read_presets(self.presets) is presets
+        # Compiled presets are not written to the cache directory
+        assert not (self.test_dir / "cache" / "presets").exists()
+
+        # Changed files are compiled again
+        self.presets.write_text(json.dumps({"other": {}}))
+        os.utime(self.presets, ns=(0, 0))
+        assert list(read_presets(self.presets)) == ["other"]
+
+        with self.assertRaises(ValueError):
+            get_preset("longread", [self.presets])
+
+    def test_apply(self):
+        preset = get_preset("longread", [self.presets])
+        options = apply_preset(
+            preset,
+            self.files,
+            {**DEFAULT_TRACK_OPTIONS, "bam_show_coverage": [False, False]},
+            ["bam_color_by", "bam_display_mode"],
+        )
+        assert options["bam_color_by"] == [
+            AlignmentColorByOption.BASE_MODIFICATION,
+            AlignmentColorByOption.NONE,
+        ]
+        assert options["bam_show_coverage"] == [False, False]
+
+        options = apply_preset(preset, self.files, DEFAULT_TRACK_OPTIONS)
+        tracks = create_tracks(self.files, **options)
+        assert [track.show_coverage for track in tracks[:2]] == [True, True]
+        assert tracks[2].range.maximum == 20
+
+    def test_app_preset(self):
+        output = self.test_dir / "session.xml"
+        arguments = ["--output", str(output), "--preset", "longread"]
+        arguments += ["--preset-file", str(self.presets)]
+        for path in self.files:
+            arguments += ["--file", str(path)]
+
+        result = self.runner.invoke(
+            app, [*arguments, "--bam-display-mode", "squished"]
+        )
+        assert result.exit_code == 0, result.output
+        session = output.read_text()
+        assert session.count('colorOption="BASE_MODIFICATION"') == 1
+        assert 'displayMode="EXPANDED"' not in session
+
+        result = self.runner.invoke(app, [*arguments, "--preset", "missing"])
+        assert result.exit_code != 0
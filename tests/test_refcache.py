@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.refcache import (
+    get_fasta_md5,
+    get_ref_cache_path,
+    iter_fasta_md5,
+    resolve_cram_references,
+)
+from tests.test_headers import write_cram
+
+CHR1_MD5 = hashlib.md5(b"ACGTACGTAC").hexdigest()
+CHR2_MD5 = hashlib.md5(b"NNNN").hexdigest()
+OTHER_MD5 = hashlib.md5(b"ACGT").hexdigest()
+
+
+class TestRefCache(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+        self.fasta = self.test_dir / "genome.fasta"
+        self.fasta.write_text(">chr1 first\nACGTacgt\nAC\n>chr2\nNNNN\n")
+        self.fasta.with_name("genome.fasta.fai").write_text(
+            "chr1\t10\t12\t8\t9\nchr2\t4\t30\t4\t5\n"
+        )
+        self.ref_cache = self.test_dir / "ref_cache"
+
+        self.cram = self.test_dir / "sample.cram"
+        write_cram(
+            self.cram,
+            f"@HD\tVN:1.6\n@SQ\tSN:chr1\tLN:10\tM5:{CHR1_MD5}\n"
+            f"@SQ\tSN:chr2\tLN:4\tM5:{OTHER_MD5}\n@SQ\tSN:chr3\tLN:4\tM5:{'0' * 32}\n",
+        )
+
+    def tearDown(self):
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_fasta_md5(self):
+        md5 = get_fasta_md5(self.fasta, self.ref_cache)
+        assert md5 == {"chr1": CHR1_MD5, "chr2": CHR2_MD5}
+        assert dict(iter_fasta_md5(self.fasta, None)) == md5
+        chr1_path = get_ref_cache_path(self.ref_cache, CHR1_MD5)
+        assert chr1_path.read_bytes() == b"ACGTACGTAC"
+        cached = {CHR1_MD5[:2], CHR2_MD5[:2]}
+        assert sorted(os.listdir(self.ref_cache)) == sorted(cached)
+
+        # Only sequences missing from the cache are read again
+        chr1_path.unlink()
+        assert get_fasta_md5(self.fasta, self.ref_cache) == md5
+        assert chr1_path.exists()
+
+    def test_gzipped_fasta(self):
+        fasta_gz = self.test_dir / "genome.fasta.gz"
+        with gzip.open(fasta_gz, "wb") as f:
+            f.write(self.fasta.read_bytes())
+        # The index of the uncompressed file must not be used for seeking
+        fasta_gz.with_name("genome.fasta.gz.fai").write_text(
+            "chr1\t10\t12\t8\t9\nchr2\t4\t30\t4\t5\n"
+        )
+        md5 = {"chr1": CHR1_MD5, "chr2": CHR2_MD5}
+        assert get_fasta_md5(fasta_gz, self.ref_cache) == md5
+        assert get_ref_cache_path(self.ref_cache, CHR1_MD5).read_bytes() == b"ACGTACGTAC"
+
+    def test_resolve(self):
+        problems = resolve_cram_references([self.cram], self.fasta, self.ref_cache)
+        assert problems == [
+            f"{self.cram}: chr2 (M5 {OTHER_MD5}) differs from chr2 in {self.fasta}",
+            f"{self.cram}: chr3 (M5 {'0' * 32}) can not be resolved",
+        ]
+
+        # Sequences in the reference cache are resolved without FASTA
+        other = self.test_dir / "other.cram"
+        write_cram(other, f"@SQ\tSN:1\tLN:10\tM5:{CHR1_MD5}\n")
+        assert resolve_cram_references([other], None, self.ref_cache) == []
+        assert resolve_cram_references([other], None, None) != []
+
+    def test_app_cram_references(self):
+        output = self.test_dir / "session.xml"
+        arguments = ["--output", str(output), "--file", str(self.cram)]
+        arguments += ["--genome", "custom", "--genome-path", str(self.fasta)]
+        arguments += ["--ref-cache", str(self.ref_cache)]
+
+        result = self.runner.invoke(app, arguments)
+        assert result.exit_code != 0
+        assert "chr3" in str(result.exception)
+
+        write_cram(self.cram, f"@SQ\tSN:chr1\tLN:10\tM5:{CHR1_MD5}\n")
+        result = self.runner.invoke(app, arguments)
+        assert result.exit_code == 0, result.output
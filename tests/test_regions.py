@@ -0,0 +1,107 @@
+import gzip
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.create_igv_session import generate_xml, iter_session_xml
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from sessionizer.regions import Region, merge_regions, read_regions
+
+
+class TestRegions(unittest.TestCase):
+    def test_merge_regions(self):
+        regions = [
+            Region("chr1", 50, 60, "b"),
+            Region("chr1", 1, 10, "a"),
+            Region("chr1", 5, 20, "c"),
+            Region("chr2", 5, 20, "d"),
+            Region("chr1", 55, 58, "e"),
+        ]
+        assert list(merge_regions(regions)) == [
+            Region("chr1", 1, 20, "a"),
+            Region("chr1", 50, 60, "b"),
+            Region("chr2", 5, 20, "d"),
+        ]
+
+    def test_read_regions_bed_gz(self):
+        with TemporaryDirectory() as temp_dir:
+            bed = Path(temp_dir) / "regions.bed.gz"
+            with gzip.open(bed, "wt") as f:
+                f.write("chr1\t0\t100\tgene_a\nchr2\t9\t10\n")
+
+            assert list(read_regions(bed)) == [
+                Region("chr1", 1, 100, "gene_a"),
+                Region("chr2", 10, 10, ""),
+            ]
+
+    def test_iter_session_xml(self):
+        # Without regions the output is identical to generate_xml
+        assert "".join(iter_session_xml(GENOME.HG38, Path(""), [])) == generate_xml(
+            GENOME.HG38, Path(""), []
+        )
+
+        xml_str = "".join(
+            iter_session_xml(
+                GENOME.HG38, Path(""), [], regions=iter([Region("chr1", 1, 100, "a&b")])
+            )
+        )
+        assert (
+            '<Region chromosome="chr1" start="0" end="100" description="a&amp;b"/>'
+            in xml_str
+        )
+        assert xml_str.rstrip().endswith("</Regions>\n</Session>")
+
+
+class TestAppRoi(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.input_bam = self.test_dir / "input.bam"
+        self.input_bam.write_text("test content")
+
+        self.bed = self.test_dir / "roi.bed"
+        self.bed.write_text("chr1\t0\t100\nchr1\t50\t150\nchr2\t0\t10\nchr3\t0\t10\n")
+
+        self.output = self.test_dir / "output.xml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_app_roi_merge_and_max(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.input_bam),
+                "--roi",
+                str(self.bed),
+                "--roi-merge",
+                "--roi-max",
+                "2",
+                "--output",
+                str(self.output),
+            ],
+        )
+        assert result.exit_code == 0
+
+        xml_str = self.output.read_text()
+        assert '<Region chromosome="chr1" start="0" end="150"' in xml_str
+        assert '<Region chromosome="chr2" start="0" end="10"' in xml_str
+        assert 'chromosome="chr3"' not in xml_str
+
+        # Excess regions are moved to an indexed BED track
+        roi_track = self.test_dir / "output_roi.bed.gz"
+        assert roi_track.with_name("output_roi.bed.gz.tbi").exists()
+        with gzip.open(roi_track, "rt") as f:
+            assert f.read() == "chr3\t0\t10\n"
+        assert f'id="{roi_track}"' in xml_str
+
+
+if __name__ == "__main__":
+    unittest.main()
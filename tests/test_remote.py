@@ -0,0 +1,126 @@
+import os
+import threading
+import unittest
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.remote import RemotePath, UrlChecker, check_remote_inputs
+
+
+class StubHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.server.requests.append((self.client_address, self.path))
+        if self.path.startswith("/nohead/"):
+            self.send_error(405)
+            return
+        super().do_HEAD()
+
+    def do_GET(self):
+        self.server.requests.append((self.client_address, self.path))
+        self.path = self.path.replace("/nohead/", "/", 1)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRemote(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.env = patch.dict(
+            os.environ, {"SESSIONIZER_CACHE_DIR": str(self.test_dir / "cache")}
+        )
+        self.env.start()
+
+        self.data_dir = self.test_dir / "data"
+        self.data_dir.mkdir()
+        for name in ["sample.bam", "sample.bam.bai", "old.bam", "old.bam.bai", "x.bw"]:
+            (self.data_dir / name).write_text("test content")
+        (self.data_dir / "empty.vcf").write_text("")
+        os.utime(self.data_dir / "old.bam.bai", (0, 0))
+
+        handler = partial(StubHandler, directory=str(self.data_dir))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.env.stop()
+        self.temp_dir.cleanup()
+
+    def test_remote_path(self):
+        path = RemotePath("https://example.org/data/a%20b.vcf.gz?token=1")
+        assert path.name == "a b.vcf.gz"
+        assert path.suffix == ".gz"
+        assert str(path.with_name("c.vcf.gz.tbi")) == (
+            "https://example.org/data/c.vcf.gz.tbi?token=1"
+        )
+
+    def test_check(self):
+        paths = [
+            RemotePath(f"{self.base_url}/{name}")
+            for name in ["sample.bam", "x.bw", "old.bam", "missing.bam", "empty.vcf"]
+        ]
+        checker = UrlChecker(threads=1)
+        with checker:
+            problems = check_remote_inputs(paths, checker)
+        assert problems == [
+            f"{self.base_url}/old.bam.bai is older than old.bam",
+            f"{self.base_url}/missing.bam returned HTTP 404",
+            f"{self.base_url}/empty.vcf is empty",
+        ]
+        # Connections are reused until the server closes them after an error
+        assert len(self.server.requests) == 8
+        assert len({address for address, _ in self.server.requests}) == 3
+
+        # HEAD is not supported, the first byte is requested instead
+        with UrlChecker() as checker:
+            result = checker.check(f"{self.base_url}/nohead/sample.bam")
+        assert result.ok and result.size == len("test content")
+
+    def test_cache(self):
+        cache_path = self.test_dir / "cache" / "url_checks.json"
+        url = f"{self.base_url}/sample.bam"
+        with UrlChecker(cache_path) as checker:
+            assert checker.check(url).ok
+        with UrlChecker(cache_path) as checker:
+            assert checker.check(url).ok
+        assert len(self.server.requests) == 1
+
+        with UrlChecker(cache_path, ttl=0) as checker:
+            assert checker.check(url).ok
+        assert len(self.server.requests) == 2
+
+    def test_app_urls(self):
+        output = self.test_dir / "session.xml"
+        arguments = ["--output", str(output), "--check-urls", "--use-relative-paths"]
+        arguments += ["--file", f"{self.base_url}/sample.bam"]
+        arguments += ["--file", str(self.data_dir / "x.bw")]
+
+        result = self.runner.invoke(app, arguments)
+        assert result.exit_code == 0, result.output
+        session = output.read_text()
+        assert f'<Resource path="{self.base_url}/sample.bam"/>' in session
+        assert '<Resource path="data/x.bw"/>' in session
+
+        result = self.runner.invoke(
+            app, [*arguments, "--file", f"{self.base_url}/missing.vcf.gz"]
+        )
+        assert result.exit_code != 0
+        assert "missing.vcf.gz returned HTTP 404" in str(result.exception)
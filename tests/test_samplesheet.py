@@ -0,0 +1,75 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.samplesheet import get_sort_order, join_sample_sheet, read_sample_sheet
+from tests.test_headers import SAM_HEADER, write_bam
+
+
+class TestSampleSheet(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.sheet = self.test_dir / "samples.tsv"
+        self.sheet.write_text(
+            "sample\tpath\tstatus\tage\n"
+            "P1\tdata/p1_tumor.bw\ttumor\t50\n"
+            "P2\t\tnormal\t7\n"
+            "sample1\t\ttumor\t12\n"
+        )
+
+        (self.test_dir / "data").mkdir()
+        self.files = [
+            self.test_dir / "data" / "p1_tumor.bw",
+            self.test_dir / "P2.vcf.gz",
+            self.test_dir / "reads.bam",
+            self.test_dir / "other.bed",
+        ]
+        for path in self.files:
+            path.write_text("test content")
+        write_bam(self.files[2], SAM_HEADER, [("chr1", 1000)])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_join(self):
+        sheet = read_sample_sheet(self.sheet)
+        assert read_sample_sheet(self.sheet) is sheet
+
+        rows = join_sample_sheet(sheet, self.files)
+        assert [row["sample"] if row else None for row in rows] == [
+            "P1",
+            "P2",
+            "sample1",
+            None,
+        ]
+
+        assert get_sort_order(sheet, rows, ["age"]) == [1, 2, 0, 3]
+        assert get_sort_order(sheet, rows, ["status", "age"]) == [1, 2, 0, 3]
+        with self.assertRaises(ValueError):
+            get_sort_order(sheet, rows, ["missing"])
+
+    def test_app_sample_sheet(self):
+        output = self.test_dir / "session.xml"
+        arguments = ["--output", str(output), "--sample-sheet", str(self.sheet)]
+        for path in self.files:
+            arguments += ["--file", str(path)]
+        result = self.runner.invoke(app, [*arguments, "--sample-sort", "age"])
+        assert result.exit_code == 0, result.output
+
+        attribute_file = self.test_dir / "session_sample_info.txt"
+        assert attribute_file.read_text() == (
+            "Track\tsample\tstatus\tage\n"
+            "P2.vcf.gz\tP2\tnormal\t7\n"
+            "reads.bam\tsample1\ttumor\t12\n"
+            "p1_tumor.bw\tP1\ttumor\t50\n"
+        )
+
+        session = output.read_text()
+        assert f'<Resource path="{attribute_file}"/>' in session
+        assert session.index("P2.vcf.gz") < session.index("p1_tumor.bw")
@@ -0,0 +1,125 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.sharding import (
+    TRACK_BASE_COST,
+    estimate_track_cost,
+    get_group_key,
+    shard_tracks,
+)
+from sessionizer.track_elements import DataTrack
+from tests.test_indexes import write_bai
+
+
+def make_tracks(names):
+    return [DataTrack(name=name, path=Path(name), height=0) for name in names]
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_estimate_track_cost(self):
+        # Dense BAM: 16 kb of compressed data per 16 kb window
+        dense = self.test_dir / "dense.bam"
+        dense.write_text("")
+        write_bai(dense.with_name("dense.bam.bai"), [({}, [0, 1 << 30], 0, 0)])
+        sparse = self.test_dir / "sparse.bam"
+        sparse.write_text("")
+        write_bai(sparse.with_name("sparse.bam.bai"), [({}, [0, 1 << 20], 0, 0)])
+        assert estimate_track_cost(dense) > estimate_track_cost(sparse)
+        assert estimate_track_cost(sparse) > TRACK_BASE_COST["alignment"]
+
+        # Feature files without index are loaded completely
+        vcf = self.test_dir / "large.vcf"
+        vcf.write_text("x" * 1_000_000)
+        bigwig = self.test_dir / "large.bw"
+        bigwig.write_text("x" * 1_000_000)
+        assert estimate_track_cost(vcf) > TRACK_BASE_COST["variant"]
+        assert estimate_track_cost(bigwig) == TRACK_BASE_COST["bigwig"]
+
+    def test_group_key(self):
+        assert get_group_key(Path("/data/sample1.bam")) == "sample1"
+        assert get_group_key(Path("sample1.hard-filtered.vcf.gz")) == "sample1"
+
+    def test_shard_tracks_budget(self):
+        tracks = make_tracks(["a.bam", "b.bam", "a.vcf.gz", "c.bw", "d.bw"])
+        costs = [60, 60, 10, 5, 5]
+        shards = shard_tracks(tracks, costs, budget=80)
+
+        # Related tracks stay together and every shard is within the budget
+        assert shards == [[0, 2, 3, 4], [1]]
+        for shard in shards:
+            assert sum(costs[i] for i in shard) <= 80
+
+    def test_shard_tracks_oversized_group(self):
+        tracks = make_tracks(["a.bam", "b.bam"])
+        assert shard_tracks(tracks, [500, 10], budget=100) == [[0], [1]]
+
+    def test_shard_tracks_max_tracks(self):
+        tracks = make_tracks([f"{i}.bw" for i in range(5)])
+        shards = shard_tracks(tracks, [1] * 5, max_tracks=2)
+        assert [len(shard) for shard in shards] == [2, 2, 1]
+
+
+class TestAppSharding(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.files = []
+        for name in ["a.bam", "a.vcf", "b.bam", "c.bam"]:
+            path = self.test_dir / name
+            path.write_text("test content")
+            self.files.append(path)
+
+        self.output = self.test_dir / "output.xml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_app(self, *args):
+        file_args = [arg for f in self.files for arg in ("--file", str(f))]
+        return self.runner.invoke(app, [*file_args, "--output", str(self.output), *args])
+
+    def test_shard_sessions(self):
+        result = self.run_app("--shard-max-tracks", "2")
+        assert result.exit_code == 0
+
+        assert not self.output.exists()
+        shard_1 = self.test_dir / "output_1.xml"
+        assert "a.bam" in shard_1.read_text()
+        assert "a.vcf" in shard_1.read_text()
+        assert "b.bam" not in shard_1.read_text()
+
+        index = (self.test_dir / "output_shards.tsv").read_text().splitlines()
+        assert index[0] == "session\testimated_memory_mb\ttracks"
+        assert [line.split("\t")[0] for line in index[1:]] == [
+            "output_1.xml",
+            "output_2.xml",
+        ]
+
+    def test_single_shard(self):
+        result = self.run_app("--shard-budget", "100000")
+        assert result.exit_code == 0
+        assert self.output.exists()
+        assert not (self.test_dir / "output_shards.tsv").exists()
+
+    def test_shard_panels(self):
+        result = self.run_app("--shard-max-tracks", "2", "--shard-mode", "panels")
+        assert result.exit_code == 0
+
+        xml = self.output.read_text()
+        assert 'name="DataPanel"' in xml
+        assert 'name="DataPanel2"' in xml
+        assert 'dividerFractions="0.40,0.80"' in xml
@@ -0,0 +1,109 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.shortcuts import ShortcutStore
+
+
+class TestShortcutStore(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        self.store_dir = self.test_dir / "store"
+
+        self.bam = self.test_dir / "a.bam"
+        self.bam.write_text("test content")
+        self.bai = self.test_dir / "a.bam.bai"
+        self.bai.write_text("test content")
+        self.bed = self.test_dir / "b.bed"
+        self.bed.write_text("test content")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_link_files(self):
+        store = ShortcutStore(self.store_dir)
+        links = store.link_files([self.bam, self.bed])
+        assert [link.name for link in links] == ["a.bam", "b.bed"]
+        assert links[0].parent != links[1].parent
+        assert os.readlink(links[0]) == str(self.bam)
+        assert os.readlink(links[0].with_name("a.bam.bai")) == str(self.bai)
+
+        # Linked once for all sessions
+        assert store.link_files([self.bam]) == links[:1]
+        store.close()
+
+    def test_gc(self):
+        store = ShortcutStore(self.store_dir)
+        first, second = self.test_dir / "first.xml", self.test_dir / "second.xml"
+        bam_link, bed_link = store.link_files([self.bam, self.bed])
+        store.add_references([first])
+        store.link_files([self.bam])
+        store.add_references([second])
+        first.write_text("")
+        second.write_text("")
+
+        assert store.gc(min_age=0) == {"sessions": 0, "links": 0}
+
+        # The links of b.bed are only used by the first session
+        first.unlink()
+        assert store.gc(min_age=0) == {"sessions": 1, "links": 1}
+        assert not bed_link.parent.exists()
+        assert bam_link.exists()
+
+        second.unlink()
+        assert store.gc(min_age=3600) == {"sessions": 1, "links": 0}
+        assert store.gc(min_age=0) == {"sessions": 0, "links": 2}
+        assert not bam_link.parent.exists()
+        store.close()
+
+    def test_app_shortcut_store(self):
+        for name in ["first", "second"]:
+            result = self.runner.invoke(
+                app,
+                [
+                    "--file",
+                    str(self.bam),
+                    "--output",
+                    str(self.test_dir / f"{name}.xml"),
+                    "--generate-symlinks",
+                    "--shortcut-store",
+                    str(self.store_dir),
+                ],
+            )
+            assert result.exit_code == 0, result.output
+        assert not (self.test_dir / "igv_shortcuts").exists()
+
+        store = ShortcutStore(self.store_dir)
+        link = store.link_files([self.bam])[0]
+        store.close()
+        assert f'<Resource path="{link}"/>' in (self.test_dir / "first.xml").read_text()
+
+        (self.test_dir / "first.xml").unlink()
+        (self.test_dir / "second.xml").unlink()
+        result = self.runner.invoke(app, ["gc", str(self.store_dir), "--min-age", "0"])
+        assert result.exit_code == 0
+        assert result.output == (
+            f"{self.store_dir}: 2 deleted sessions, 2 links removed\n"
+        )
+        assert not link.exists()
+
+    def test_app_shortcut_store_requires_symlinks(self):
+        result = self.runner.invoke(
+            app,
+            [
+                "--file",
+                str(self.bam),
+                "--output",
+                str(self.test_dir / "session.xml"),
+                "--shortcut-store",
+                str(self.store_dir),
+            ],
+        )
+        assert result.exit_code != 0
+        assert "--generate-symlinks" in str(result.exception)
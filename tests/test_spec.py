@@ -0,0 +1,123 @@
+import os
+import unittest
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from sessionizer.spec import (
+    build_spec,
+    check_session,
+    format_spec_comment,
+    read_spec_comment,
+    spec_hash,
+)
+from sessionizer.track_elements import DataTrack
+
+
+class TestSpec(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        self.bed = self.test_dir / "a--b.bed"
+        self.bed.write_text("chr1\t0\t10\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_spec_comment(self):
+        tracks = [DataTrack(name="a", path=self.bed, height=0)]
+        spec = build_spec(GENOME.HG38, Path(""), tracks, [self.bed], locus="chr1")
+        assert spec["inputs"] == {
+            str(self.bed): [self.bed.stat().st_size, self.bed.stat().st_mtime_ns]
+        }
+        assert spec["tracks"][0]["class"] == "DataTrack"
+
+        # The comment is valid XML although the path contains "--"
+        comment = format_spec_comment(spec)
+        session = self.test_dir / "session.xml"
+        session.write_text(f'<?xml version="1.0" ?>\n<!--{comment}-->\n<Session/>\n')
+        ET.parse(session)
+
+        comment = read_spec_comment(session)
+        assert comment["sha256"] == spec_hash(spec)
+        assert spec_hash(comment["spec"]) == spec_hash(spec)
+
+    def test_hash_independent_of_input_order(self):
+        other = self.test_dir / "other.bed"
+        other.write_text("")
+        first = build_spec(GENOME.HG38, Path(""), [], [self.bed, other])
+        second = build_spec(GENOME.HG38, Path(""), [], [other, self.bed])
+        assert spec_hash(first) == spec_hash(second)
+
+    def test_check_session(self):
+        session = self.test_dir / "session.xml"
+        session.write_text('<?xml version="1.0" ?>\n<Session/>\n')
+        assert check_session(session) == [
+            "no spec comment, generate the session with --embed-spec"
+        ]
+
+        spec = build_spec(GENOME.HG38, Path(""), [], [self.bed])
+        session.write_text(
+            f'<?xml version="1.0" ?>\n<!--{format_spec_comment(spec)}-->\n<Session/>\n'
+        )
+        assert check_session(session) == []
+
+        stat = self.bed.stat()
+        os.utime(self.bed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        assert check_session(session) == [f"{self.bed} changed"]
+
+        self.bed.unlink()
+        assert check_session(session) == [f"{self.bed} is missing"]
+
+
+class TestAppSpec(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.bed = self.test_dir / "a.bed"
+        self.bed.write_text("chr1\t0\t10\n")
+        self.bigwig = self.test_dir / "b.bw"
+        self.bigwig.write_text("test content")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_app(self, output: Path, files, *args):
+        arguments = ["--output", str(output)]
+        for path in files:
+            arguments += ["--file", str(path)]
+        result = self.runner.invoke(app, [*arguments, *args])
+        assert result.exit_code == 0, result.output
+
+    def test_canonical(self):
+        first = self.test_dir / "first.xml"
+        second = self.test_dir / "second.xml"
+        self.run_app(first, [self.bed, self.bigwig], "--canonical", "--embed-spec")
+        self.run_app(second, [self.bigwig, self.bed], "--canonical", "--embed-spec")
+        assert first.read_bytes() == second.read_bytes()
+
+        # Without --canonical the argument order is kept
+        self.run_app(second, [self.bigwig, self.bed])
+        assert first.read_bytes() != second.read_bytes()
+
+    def test_check(self):
+        session = self.test_dir / "session.xml"
+        self.run_app(session, [self.bed, self.bigwig], "--embed-spec")
+        assert "<!--sessionizer-spec sha256=" in session.read_text()
+
+        result = self.runner.invoke(app, ["check", str(session)])
+        assert result.exit_code == 0
+        assert result.output == f"{session}: up to date\n"
+
+        self.bed.write_text("chr1\t0\t20\n")
+        result = self.runner.invoke(app, ["check", str(session)])
+        assert result.exit_code == 1
+        assert result.output == (
+            f"{session}: out of date\n  {self.bed.absolute()} changed\n"
+        )
@@ -0,0 +1,54 @@
+import gzip
+import struct
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sessionizer.regions import Region
+from sessionizer.tabix import BGZF_EOF, reg2bin, write_indexed_bed
+
+
+class TestTabix(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reg2bin(self):
+        assert reg2bin(0, 1) == 4681
+        assert reg2bin(0, 1 << 14) == 4681
+        assert reg2bin(0, (1 << 14) + 1) == 585
+        assert reg2bin(0, 1 << 29) == 0
+
+    def test_write_indexed_bed(self):
+        regions = [
+            Region("chr1", i * 100 + 1, i * 100 + 50, f"r{i}") for i in range(5000)
+        ]
+        regions.append(Region("chr2", 1, 10))
+        bed = self.test_dir / "regions.bed.gz"
+
+        index = write_indexed_bed(regions, bed)
+
+        # Data is readable as regular gzip and ends with the BGZF EOF block
+        with gzip.open(bed, "rt") as f:
+            lines = f.read().splitlines()
+        assert len(lines) == len(regions)
+        assert lines[0] == "chr1\t0\t50\tr0"
+        assert lines[-1] == "chr2\t0\t10"
+        assert bed.read_bytes().endswith(BGZF_EOF)
+
+        # Index header lists the sequence names in order
+        with gzip.open(index, "rb") as f:
+            data = f.read()
+        magic, n_ref, file_format = struct.unpack_from("<4s2i", data)
+        assert magic == b"TBI\1"
+        assert n_ref == 2
+        assert file_format == 0x10000
+        (l_nm,) = struct.unpack_from("<i", data, 32)
+        assert data[36 : 36 + l_nm] == b"chr1\0chr2\0"
+
+
+if __name__ == "__main__":
+    unittest.main()
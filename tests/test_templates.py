@@ -0,0 +1,125 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from typer.testing import CliRunner
+
+from sessionizer.create_igv_session import (
+    DEFAULT_TRACK_OPTIONS,
+    create_tracks,
+    generate_xml,
+)
+from sessionizer.genomes import GENOME
+from sessionizer.main import app
+from sessionizer.templates import compile_template, read_instances, read_templates
+from sessionizer.track_elements import AlignmentColorByOption
+from sessionizer.utils import bw_range_parser
+
+TEMPLATES = {
+    "tumor_normal": {
+        "tracks": [
+            {
+                "slot": "tumor",
+                "suffix": ".bam",
+                "options": {"bam_color_by": "tag", "bam_color_by_tag": "HP"},
+            },
+            {"slot": "normal", "suffix": ".cram"},
+            {"slot": "variants", "suffix": ".vcf.gz", "height": 60},
+            {"slot": "cnv", "suffix": ".bw", "options": {"bw_ranges": "0,2,4"}},
+        ]
+    }
+}
+
+
+class TestTemplates(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        self.templates = self.test_dir / "templates.json"
+        self.templates.write_text(json.dumps(TEMPLATES))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def generate_xml(self, paths, names, locus):
+        # Session generated the regular way, for comparison
+        options = {
+            **DEFAULT_TRACK_OPTIONS,
+            "names": names,
+            "heights": [0, 0, 60, 0],
+            "bam_color_by": [AlignmentColorByOption.TAG, AlignmentColorByOption.NONE],
+            "bam_color_by_tag": ["HP", ""],
+            "bw_ranges": [bw_range_parser("0,2,4")],
+        }
+        tracks = create_tracks(files=[Path(path) for path in paths], **options)
+        return generate_xml(GENOME.HG38, Path(""), tracks, locus=locus)
+
+    def test_render_matches_generate_xml(self):
+        template = read_templates(self.templates, GENOME.HG38, Path(""))["tumor_normal"]
+        paths = ["/data/t&1.bam", "/data/n.cram", "/data/v.vcf.gz", '/data/"cnv".bw']
+        slots = ["tumor", "normal", "variants", "cnv"]
+
+        rendered = template.render(dict(zip(slots, paths)))
+        assert rendered == self.generate_xml(paths, [Path(p).name for p in paths], "")
+
+        names = ["Tumor <T>", "Normal", "", "CNV"]
+        rendered = template.render(
+            dict(zip(slots, paths)), dict(zip(slots, names)), "chr1:1-100"
+        )
+        expected_names = [name or Path(path).name for name, path in zip(names, paths)]
+        assert rendered == self.generate_xml(paths, expected_names, "chr1:1-100")
+
+    def test_invalid_templates(self):
+        def compile_track(track: dict):
+            return compile_template("t", {"tracks": [track]}, GENOME.HG38, Path(""))
+
+        with self.assertRaises(ValueError):
+            compile_track({"slot": "a b", "suffix": ".bam"})
+        with self.assertRaises(ValueError):
+            options = {"bam_show_coverage": "no"}
+            compile_track({"slot": "a", "suffix": ".bam", "options": options})
+        with self.assertRaises(ValueError):
+            compile_track({"slot": "a", "suffix": ".bam"}).render({})
+
+    def test_app_template(self):
+        instances = self.test_dir / "instances.tsv"
+        instances.write_text(
+            "session\ttumor\tnormal\tvariants\tcnv\tlocus\n"
+            "P1\tP1_T.bam\tP1_N.cram\tP1.vcf.gz\tP1.bw\tchr1:1-100\n"
+            "P2\tP2_T.bam\tP2_N.cram\tP2.vcf.gz\tP2.bw\t\n"
+        )
+        output_dir = self.test_dir / "sessions"
+        result = self.runner.invoke(
+            app,
+            [
+                "template",
+                str(self.templates),
+                "tumor_normal",
+                str(instances),
+                "--output-dir",
+                str(output_dir),
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        assert result.output == f"{output_dir}: 2 sessions written\n"
+        assert 'locus="chr1:1-100"' in (output_dir / "P1.xml").read_text()
+        assert '<Resource path="P2_T.bam"/>' in (output_dir / "P2.xml").read_text()
+
+    def test_invalid_instances(self):
+        template = read_templates(self.templates, GENOME.HG38, Path(""))["tumor_normal"]
+        instances = self.test_dir / "instances.tsv"
+
+        instances.write_text("name\ttumor\tnormal\tvariants\tcnv\n")
+        with self.assertRaisesRegex(ValueError, "missing the columns session"):
+            list(read_instances(instances, template))
+
+        # Session names can not write outside the output directory
+        for stem in ["../P1", "sub/P1", ""]:
+            instances.write_text(
+                "session\ttumor\tnormal\tvariants\tcnv\n"
+                f"{stem}\tP1_T.bam\tP1_N.cram\tP1.vcf.gz\tP1.bw\n"
+            )
+            with self.assertRaisesRegex(ValueError, "invalid session name"):
+                list(read_instances(instances, template))
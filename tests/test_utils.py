@@ -1,9 +1,13 @@
+import os
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
+from typer.testing import CliRunner
+
+from sessionizer.main import app
 from sessionizer.track_elements import BigWigRangeOption
-from sessionizer.utils import bw_range_parser, generate_symlink
+from sessionizer.utils import RelativePathResolver, bw_range_parser, generate_symlink
 
 
 class TestGenerateSymlink(unittest.TestCase):
@@ -100,5 +104,50 @@ class TestBigWigRangeParser(unittest.TestCase):
         assert result.maximum == 7
 
 
+class TestRelativePathResolver(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(os.path.realpath(self.temp_dir.name))
+        (self.test_dir / "sessions").mkdir()
+        (self.test_dir / "data" / "nested").mkdir(parents=True)
+        (self.test_dir / "link").symlink_to(self.test_dir / "data")
+        (self.test_dir / "data" / "a.bam").symlink_to(self.test_dir / "data" / "nested")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_relative(self):
+        resolver = RelativePathResolver(self.test_dir / "sessions")
+        paths = resolver.relative_all(
+            [
+                self.test_dir / "data" / "a.bam",
+                self.test_dir / "link" / "nested" / "b.bam",
+                self.test_dir / "sessions" / "c.bam",
+            ]
+        )
+        # Symlinked directories are resolved, the a.bam symlink is not
+        assert paths == [
+            Path("../data/a.bam"),
+            Path("../data/nested/b.bam"),
+            Path("c.bam"),
+        ]
+        # Each parent directory is looked up once
+        assert set(resolver.directories) == {
+            str(self.test_dir / "sessions"),
+            str(self.test_dir / "data"),
+            str(self.test_dir / "link" / "nested"),
+        }
+
+    def test_app_relative_paths(self):
+        bam = self.test_dir / "data" / "nested" / "b.bam"
+        bam.write_text("test content")
+        output = self.test_dir / "sessions" / "session.xml"
+        result = CliRunner().invoke(
+            app, ["--file", str(bam), "--output", str(output), "--use-relative-paths"]
+        )
+        assert result.exit_code == 0, result.output
+        assert '<Resource path="../data/nested/b.bam"/>' in output.read_text()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+import os
+import threading
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from sessionizer.main import app
+from sessionizer.validation import validate_inputs
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.bam = self.test_dir / "a.bam"
+        self.bam.write_text("test content")
+        self.empty = self.test_dir / "b.bw"
+        self.empty.write_text("")
+        self.missing = self.test_dir / "c.vcf.gz"
+
+        # Index older than its data file
+        self.cram = self.test_dir / "d.cram"
+        self.cram.write_text("test content")
+        self.crai = self.test_dir / "d.cram.crai"
+        self.crai.write_text("test content")
+        stat = self.cram.stat()
+        os.utime(self.crai, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+        self.output = self.test_dir / "session.xml"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_validate_inputs(self):
+        problems = validate_inputs([self.bam, self.empty, self.missing, self.cram])
+        assert problems == [
+            f"{self.empty} is empty",
+            f"{self.missing} does not exist",
+            f"{self.crai} is older than d.cram",
+        ]
+        assert validate_inputs([self.test_dir]) == [f"{self.test_dir} is a directory"]
+
+    def test_old_unreadable_index(self):
+        # Both problems of the index are reported; root can read any file
+        with patch(
+            "sessionizer.validation.is_readable", lambda path: path != self.crai
+        ):
+            problems = validate_inputs([self.cram])
+        assert problems == [
+            f"{self.crai} is older than d.cram",
+            f"{self.crai} is not readable",
+        ]
+
+    def test_lazy_inputs(self):
+        # Files are checked while later files are still produced
+        checked = threading.Event()
+
+        def check_input(path):
+            checked.set()
+            return []
+
+        def paths():
+            yield self.bam
+            assert checked.wait(5)
+            yield self.cram
+
+        with patch("sessionizer.validation.check_input", check_input):
+            assert validate_inputs(paths()) == []
+
+    def test_app_report(self):
+        arguments = ["--output", str(self.output)]
+        for path in [self.bam, self.empty, self.missing]:
+            arguments += ["--file", str(path)]
+
+        result = self.runner.invoke(app, arguments)
+        assert result.exit_code != 0
+        assert str(result.exception) == (
+            f"Invalid input files:\n{self.empty} is empty\n{self.missing} does not exist"
+        )
+        assert not self.output.exists()
+
+        result = self.runner.invoke(app, [*arguments, "--warn-invalid-inputs"])
+        assert result.exit_code == 0
+        assert self.output.exists()
@@ -0,0 +1,145 @@
+import os
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sessionizer.catalog import Catalog
+from sessionizer.genomes import GENOME
+from sessionizer.watch import InotifyWatcher, PollingWatcher, SessionWatcher
+from tests.test_headers import SAM_HEADER, write_bam
+
+
+def set_mtime(path: Path, seconds_ago: float):
+    mtime = time.time() - seconds_ago
+    os.utime(path, (mtime, mtime))
+
+
+class TestSessionWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+
+        self.data_dir = self.test_dir / "data"
+        self.data_dir.mkdir()
+        self.output_dir = self.test_dir / "sessions"
+
+        self.catalog = Catalog(self.test_dir / "catalog.sqlite")
+        self.watcher = SessionWatcher(
+            self.catalog, self.output_dir, GENOME.HG38, Path(""), debounce=10
+        )
+
+    def tearDown(self):
+        self.watcher.close()
+        self.catalog.close()
+        self.temp_dir.cleanup()
+
+    def write_bam(self, name: str, sample: str, seconds_ago: float = 60) -> Path:
+        bam = self.data_dir / name
+        write_bam(bam, SAM_HEADER.replace("sample1", sample), [("chr1", 1000)])
+        set_mtime(bam, seconds_ago)
+        return bam
+
+    def write_index(self, bam: Path, seconds_ago: float = 60) -> Path:
+        index = bam.with_name(bam.name + ".bai")
+        index.write_bytes(b"BAI\1")
+        set_mtime(index, seconds_ago)
+        return index
+
+    def test_start(self):
+        self.write_index(self.write_bam("a.bam", "sample1"))
+        (self.data_dir / "b.bw").write_text("")
+        set_mtime(self.data_dir / "b.bw", 60)
+
+        written = self.watcher.start([str(self.data_dir)])
+        assert sorted(p.name for p in written) == ["b.xml", "sample1.xml"]
+        assert "a.bam" in (self.output_dir / "sample1.xml").read_text()
+
+    def test_debounce(self):
+        self.watcher.start([str(self.data_dir)])
+        self.write_index(self.write_bam("a.bam", "sample1"))
+
+        assert self.watcher.process([str(self.data_dir)], now=100) == []
+        assert self.watcher.process([], now=105) == []
+        written = self.watcher.process([], now=110)
+        assert written == [self.output_dir / "sample1.xml"]
+        assert self.watcher.pending == {}
+
+    def test_incomplete_files(self):
+        self.watcher.start([str(self.data_dir)])
+
+        # Index missing
+        bam = self.write_bam("a.bam", "sample1")
+        assert self.watcher.process([str(self.data_dir)], now=0) == []
+        assert self.watcher.process([], now=10) == []
+
+        # Index older than the data
+        index = self.write_index(bam, seconds_ago=120)
+        assert self.watcher.process([str(self.data_dir)], now=20) == []
+        assert self.watcher.process([], now=30) == []
+
+        # Data still being written
+        bam = self.write_bam("a.bam", "sample1", seconds_ago=0)
+        self.write_index(bam, seconds_ago=0)
+        assert self.watcher.process([str(self.data_dir)], now=40) == []
+        assert self.watcher.process([], now=50) == []
+        assert str(self.data_dir) in self.watcher.pending
+
+        set_mtime(bam, 60)
+        set_mtime(index, 30)
+        written = self.watcher.process([], now=60)
+        assert written == [self.output_dir / "sample1.xml"]
+
+    def test_only_affected_sessions(self):
+        self.write_index(self.write_bam("a.bam", "sample1"))
+        self.write_index(self.write_bam("b.bam", "sample2"))
+        self.watcher.start([str(self.data_dir)])
+
+        # Rename the sample of b.bam
+        bam = self.write_bam("b.bam", "sample3", seconds_ago=30)
+        self.write_index(bam, seconds_ago=20)
+        self.watcher.process([str(self.data_dir)], now=0)
+        written = self.watcher.process([], now=10)
+
+        assert written == [self.output_dir / "sample3.xml"]
+        assert not (self.output_dir / "sample2.xml").exists()
+        assert (self.output_dir / "sample1.xml").exists()
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.test_dir = Path(self.temp_dir.name)
+        (self.test_dir / "nested").mkdir()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def check_watcher(self, watcher):
+        try:
+            assert watcher.directories == {
+                str(self.test_dir),
+                str(self.test_dir / "nested"),
+            }
+
+            (self.test_dir / "nested" / "a.bam").write_text("")
+            time.sleep(0.01)
+            assert watcher.wait(1) == {str(self.test_dir / "nested")}
+
+            (self.test_dir / "new").mkdir()
+            (self.test_dir / "new" / "deep").mkdir()
+            changed = watcher.wait(1)
+            assert str(self.test_dir / "new" / "deep") in changed
+            assert str(self.test_dir / "new" / "deep") in watcher.directories
+        finally:
+            watcher.close()
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([str(self.test_dir)])
+        except (OSError, AttributeError):
+            self.skipTest("inotify is not available")
+        self.check_watcher(watcher)
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([str(self.test_dir)], interval=0.05))